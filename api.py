@@ -0,0 +1,456 @@
+"""
+واجهة HTTP (ASGI) لنفس خط المعالجة بجانب واجهة Streamlit، للأدوات الداخلية
+- POST /solve-image: صورة أو PDF (جسم الطلب خاماً أو multipart بحقل file) -> JSON
+  (?size=6/12/16... للوحات غير 9×9)
+- POST /solve-board: {"board": [[...]]} -> JSON (أي حجم في BOX_SHAPES)
+- POST /solve-batch: {"images": [base64...], "boards": [[[...]]...]} -> نتائج بنفس الترتيب
+  (اللوحات تُحل معاً بانتشار القيود الدفعي solve_batch بمهلة خدمة الحل نفسها،
+  وحتى SUDOKU_API_MAX_BATCH عنصراً في الطلب)
+- حجم جسم الطلب (وكل صورة في الطلب الدفعي) حتى SUDOKU_API_MAX_UPLOAD_MB، وما يتجاوزه يُرفض
+  بـ 413 قبل قراءته كاملاً
+- كل لوحة محلولة تحمل difficulty (الدرجة، المستوى، أصعب تقنية) لفرز النتائج أو تصفيتها
+- GET /health: إحصائيات النموذج والذاكرة المؤقتة
+- المراحل الثقيلة على المعالج تعمل في مجمّع خيوط فلا تُحجب حلقة الأحداث
+- التعرف بطبقتين: مطابقة قوالب سريعة ثم CNN للخلايا غير المؤكدة فقط (SUDOKU_CASCADE=0 لتعطيلها)،
+  وكل شبكة تحمل tiers (عدد خلايا كل طبقة)
+- نموذج واحد و BatchingPredictor وخدمة حل وذاكرة نتائج مشتركة بين كل الطلبات
+
+التشغيل (الاعتماديات الإضافية في requirements-api.txt: starlette و uvicorn و python-multipart
+لطلبات multipart، فتبقى requirements.txt لنشر Streamlit وحده):
+    pip install -r requirements-api.txt
+    uvicorn api:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import runtime_config
+runtime_config.configure()  # يجب أن يسبق استيراد TensorFlow
+import numpy as np
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from pipeline import (
+    PipelineContext,
+    resize_if_needed,
+    decode_image,
+    render_pdf_grids,
+    find_board_robust,
+    find_boards_robust,
+    grid_size,
+    warp_image,
+    extract_digits_multi,
+)
+from inference_server import BatchingPredictor, load_model
+from template_matcher import TemplateMatcher
+from solver import validate_board, SolveService, BOX_SHAPES, PROPAGATED, SEARCHED, TIMEOUT, CANCELLED
+from solver import solve_batch as solve_many
+
+# أقصى حجم لجسم الطلب (بالميغابايت)
+MAX_UPLOAD_MB = float(os.environ.get('SUDOKU_API_MAX_UPLOAD_MB', 20))
+# أقصى عدد لوحات وصور في طلب /solve-batch واحد
+MAX_BATCH_ITEMS = int(os.environ.get('SUDOKU_API_MAX_BATCH', 256))
+
+
+class ResultCache:
+    """ذاكرة نتائج LRU آمنة للخيوط: نفس الصورة/اللوحة بنفس المعاملات لا تُعالج مرتين"""
+
+    def __init__(self, size=256):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'items': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+class Engine:
+    """الموارد المشتركة لكل الطلبات: النموذج وخدمة التنبؤ وخدمة الحل والذاكرة المؤقتة"""
+
+    def __init__(self, model, workers=None, cache_size=256, cascade=True):
+        self.model = model
+        self.predictor = BatchingPredictor.from_env(model)
+        # المصنّف السريع قبل CNN (None: كل الخلايا إلى النموذج)
+        self.cascade = TemplateMatcher.from_env() if cascade else None
+        self.solver = SolveService.from_env()
+        self.cache = ResultCache(cache_size)
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            thread_name_prefix="sudoku-api"
+        )
+
+    @classmethod
+    def from_env(cls):
+        model = load_model()
+        if model is None:
+            raise RuntimeError("model.h5 is missing or invalid")
+        return cls(
+            model,
+            workers=int(os.environ.get('SUDOKU_API_WORKERS', 0)) or None,
+            cache_size=int(os.environ.get('SUDOKU_API_CACHE_SIZE', 256)),
+            cascade=os.environ.get('SUDOKU_CASCADE', '1').lower() not in ('0', 'false', 'no', 'off'),
+        )
+
+    async def run(self, fn, *args):
+        """تشغيل مرحلة ثقيلة على المعالج في مجمّع الخيوط"""
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = Engine.from_env()
+        return _engine
+
+# ==========================================
+# 1. مراحل المعالجة (متزامنة، تعمل داخل المجمّع)
+# ==========================================
+def load_grids(data, multi=False):
+    """فك صورة أو PDF وإيجاد الشبكات، يعيد قائمة (الصورة, النقاط)"""
+    if data[:5] == b'%PDF-':
+        _, images = render_pdf_grids(data, max_boards=6 if multi else 1)
+    else:
+        img = decode_image(data)
+        if img is None:
+            raise ValueError("could not decode image")
+        images = [img]
+    images = [resize_if_needed(img) for img in images]
+    # صور PDF مقصوصة مسبقاً لشبكة واحدة لكل صورة
+    per_image = 6 if multi and len(images) == 1 else 1
+    sources = []
+    for img in images:
+        ctx = PipelineContext(color=img)
+        if per_image > 1:
+            sources.extend((img, pts) for pts in find_boards_robust(ctx, max_boards=per_image))
+        else:
+            pts, _ = find_board_robust(ctx)
+            if pts is not None:
+                sources.append((img, pts))
+    return sources
+
+def read_grids(engine, grids_per_image, use_tta, conf_threshold, n=9):
+    """قص كل الشبكات n×n من كل الصور وتصنيف خلاياها بدفعة واحدة
+    يعيد (الألواح، الثقة، عدد خلايا كل طبقة تعرّف لكل شبكة)"""
+    warps = [
+        warp_image(img, pts, grid_size(n))[0]
+        for sources in grids_per_image for img, pts in sources
+    ]
+    if not warps:
+        return [], [], []
+    tiers = []
+    boards, confidences, _ = extract_digits_multi(
+        warps,
+        engine.predictor,
+        use_tta=use_tta,
+        conf_threshold=conf_threshold,
+        n=n,
+        cascade=engine.cascade,
+        tiers=tiers
+    )
+    return boards, confidences, tiers
+
+async def solve_boards(engine, boards):
+    """حل عدة لوحات في خدمة الحل دون حجب حلقة الأحداث"""
+    jobs, results = {}, [None] * len(boards)
+    for idx, board in enumerate(boards):
+        ok, msg = validate_board(board)
+        if ok:
+            jobs[idx] = engine.solver.submit(board)
+        else:
+            results[idx] = {'status': 'invalid', 'error': msg}
+    try:
+        while not all(job.done() for job in jobs.values()):
+            await asyncio.sleep(0.005)
+    finally:
+        # انقطاع العميل يلغي المهام المتبقية
+        for job in jobs.values():
+            if not job.done():
+                job.cancel()
+    for idx, job in jobs.items():
+        results[idx] = {
+            'status': job.status,
+            'solution': job.board.tolist() if job.status == 'solved' else None,
+            'nodes': job.nodes,
+            'elapsed': round(job.elapsed, 4),
+            'difficulty': grade(job.stats) if job.status == 'solved' else None,
+        }
+    return results
+
+def solve_boards_batched(boards, time_budget=None, should_stop=None):
+    """لوحات الطلب الدفعي: انتشار القيود لكل اللوحات معاً ثم بحث للمتبقية (solve_batch)
+    time_budget: مهلة البحث لكل الدفعة، should_stop: إلغاء البحث المتبقي (انقطاع العميل)"""
+    results, valid = [None] * len(boards), []
+    for idx, board in enumerate(boards):
+        ok, msg = validate_board(board)
+        if ok:
+            valid.append(idx)
+        else:
+            results[idx] = {'status': 'invalid', 'error': msg}
+    if valid:
+        stats = []
+        solutions, status = solve_many(
+            np.stack([boards[i] for i in valid]), stats=stats,
+            time_budget=time_budget, should_stop=should_stop
+        )
+        names = {PROPAGATED: 'solved', SEARCHED: 'solved', TIMEOUT: 'timeout', CANCELLED: 'cancelled'}
+        for k, idx in enumerate(valid):
+            solved = status[k] in (PROPAGATED, SEARCHED)
+            results[idx] = {
+                'status': names.get(int(status[k]), 'unsolvable'),
+                'solution': solutions[k].tolist() if solved else None,
+                'method': ('propagation' if status[k] == PROPAGATED else 'search') if solved else None,
+                'difficulty': grade(stats[k]) if solved else None,
+            }
+    return results
+
+def grade(stats):
+    """حقول الصعوبة في النتيجة (للفرز والتصفية في الطلبات الدفعية)"""
+    return {key: stats[key] for key in ('score', 'level', 'technique', 'guesses', 'backtracks')}
+
+# ==========================================
+# 2. منطق الطلبات
+# ==========================================
+def board_key(board):
+    board = np.asarray(board, dtype=np.int8)
+    return f'board:{len(board)}:' + hashlib.sha1(board.tobytes()).hexdigest()
+
+def image_key(data, multi, use_tta, conf_threshold, size=9):
+    digest = hashlib.sha1(data).hexdigest()
+    return f"image:{digest}:{int(multi)}:{int(use_tta)}:{conf_threshold:.2f}:{size}"
+
+def parse_board(value):
+    board = np.asarray(value, dtype=int)
+    n = len(board)
+    if n not in BOX_SHAPES or board.shape != (n, n) or board.min() < 0 or board.max() > n:
+        sizes = ', '.join(f"{k}x{k}" for k in BOX_SHAPES)
+        raise ValueError(f"board must be one of {sizes} with values 0..N")
+    return board
+
+async def handle_boards(engine, boards, batched=False):
+    """حل لوحات جاهزة مع الذاكرة المؤقتة
+    batched: حل كل اللوحات معاً بالمصفوفات بدل مهمة لكل لوحة في خدمة الحل"""
+    results = [engine.cache.get(board_key(b)) for b in boards]
+    todo = [i for i, r in enumerate(results) if r is None]
+    # الحل الدفعي بالمصفوفات للوحات 9×9 فقط، والأحجام الأخرى في خدمة الحل
+    many = [i for i in todo if batched and len(boards[i]) == 9]
+    single = [i for i in todo if i not in many]
+    # نفس مهلة خدمة الحل، وانقطاع العميل يوقف البحث الدفعي الجاري في المجمّع
+    cancelled = threading.Event()
+    try:
+        solved_many, solved_single = await asyncio.gather(
+            engine.run(solve_boards_batched, [boards[i] for i in many],
+                       engine.solver.time_budget, cancelled.is_set),
+            solve_boards(engine, [boards[i] for i in single]),
+        )
+    finally:
+        cancelled.set()
+    for i, result in zip(many + single, solved_many + solved_single):
+        result = dict(result, board=boards[i].tolist())
+        # المهلة أو الإلغاء ليست نتيجة نهائية للوحة
+        if result['status'] not in ('timeout', 'cancelled', 'error'):
+            engine.cache.put(board_key(boards[i]), result)
+        results[i] = result
+    return results
+
+async def handle_images(engine, images, multi=False, use_tta=True, conf_threshold=0.7, size=9):
+    """كل الصور في دفعة واحدة: اكتشاف متوازٍ، تنبؤ مشترك لكل الشبكات، ثم الحل
+    size: حجم اللوحات في الصور (9 أو أي حجم في BOX_SHAPES)"""
+    keys = [image_key(data, multi, use_tta, conf_threshold, size) for data in images]
+    results = [engine.cache.get(k) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    if not todo:
+        return results
+
+    loaded = await asyncio.gather(
+        *(engine.run(load_grids, images[i], multi) for i in todo),
+        return_exceptions=True
+    )
+    grids_per_image = [g if not isinstance(g, Exception) else [] for g in loaded]
+    boards, confidences, tiers = await engine.run(
+        read_grids, engine, grids_per_image, use_tta, conf_threshold, size
+    )
+    solved = await solve_boards(engine, boards)
+
+    offset = 0
+    for i, grids in zip(todo, loaded):
+        if isinstance(grids, Exception):
+            results[i] = {'error': str(grids), 'grids': []}
+            continue
+        entries = []
+        for img, pts in grids:
+            entry = dict(
+                solved[offset],
+                board=boards[offset].tolist(),
+                confidences=np.round(confidences[offset], 3).tolist(),
+                corners=np.asarray(pts).reshape(4, 2).tolist(),
+                tiers=tiers[offset],
+            )
+            entries.append(entry)
+            offset += 1
+        results[i] = {'grids': entries}
+        if not entries:
+            results[i]['error'] = "no sudoku grid found"
+        if all(e['status'] not in ('timeout', 'cancelled', 'error') for e in entries):
+            engine.cache.put(keys[i], results[i])
+    return results
+
+def query_flag(request, name, default):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+def query_size(request):
+    size = int(request.query_params.get('size', 9))
+    if size not in BOX_SHAPES:
+        raise ValueError(f"unsupported board size {size}")
+    return size
+
+def query_options(request):
+    return {
+        'multi': query_flag(request, 'multi', False),
+        'use_tta': query_flag(request, 'tta', True),
+        'conf_threshold': float(request.query_params.get('conf', 0.7)),
+        'size': query_size(request),
+    }
+
+class UploadTooLarge(ValueError):
+    """جسم الطلب أو إحدى صوره أكبر من MAX_UPLOAD_MB (413)"""
+
+def check_upload_size(data):
+    if len(data) > MAX_UPLOAD_MB * 1024 * 1024:
+        raise UploadTooLarge(f"upload larger than {MAX_UPLOAD_MB:g} MB")
+    return data
+
+async def read_body(request):
+    """جسم الطلب خاماً حتى MAX_UPLOAD_MB: الرفض من Content-Length قبل القراءة،
+    أو أثناء القراءة على دفعات فور تجاوز الحد (بلا Content-Length أو بقيمة خاطئة)"""
+    limit = MAX_UPLOAD_MB * 1024 * 1024
+    length = request.headers.get('content-length')
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise UploadTooLarge(f"upload larger than {MAX_UPLOAD_MB:g} MB")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge(f"upload larger than {MAX_UPLOAD_MB:g} MB")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+async def read_json(request):
+    """JSON الطلب بعد read_body (بدل request.json() الذي يقرأ أي حجم)"""
+    return json.loads(await read_body(request))
+
+async def read_upload(request):
+    """جسم الطلب خاماً، أو الحقل file في multipart/form-data"""
+    body = await read_body(request)
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        # تحليل الجسم المقروء (المحدود) بطلب جديد يعيد نفس البايتات
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        async with Request(request.scope, receive).form(max_part_size=len(body) + 1) as form:
+            upload = form.get('file')
+            data = await upload.read() if upload is not None else b''
+    else:
+        data = body
+    if not data:
+        raise ValueError("empty request body")
+    return data
+
+def error_status(e):
+    return 413 if isinstance(e, UploadTooLarge) else 400
+
+# ==========================================
+# 3. نقاط النهاية
+# ==========================================
+async def solve_image(request):
+    try:
+        data = await read_upload(request)
+        options = query_options(request)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=error_status(e))
+    result, = await handle_images(get_engine(), [data], **options)
+    return JSONResponse(result, status_code=422 if 'error' in result else 200)
+
+async def solve_board(request):
+    try:
+        payload = await read_json(request)
+        board = parse_board(payload['board'])
+    except (ValueError, KeyError, TypeError) as e:
+        return JSONResponse({'error': f"invalid request: {e}"}, status_code=error_status(e))
+    result, = await handle_boards(get_engine(), [board])
+    return JSONResponse(result)
+
+async def solve_batch(request):
+    try:
+        payload = await read_json(request)
+        count = len(payload.get('images', [])) + len(payload.get('boards', []))
+        if count > MAX_BATCH_ITEMS:
+            raise ValueError(f"at most {MAX_BATCH_ITEMS} images and boards per request, got {count}")
+        images = [check_upload_size(base64.b64decode(item)) for item in payload.get('images', [])]
+        boards = [parse_board(item) for item in payload.get('boards', [])]
+        options = query_options(request)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({'error': f"invalid request: {e}"}, status_code=error_status(e))
+    engine = get_engine()
+    image_results, board_results = await asyncio.gather(
+        handle_images(engine, images, **options),
+        handle_boards(engine, boards, batched=True),
+    )
+    return JSONResponse({'images': image_results, 'boards': board_results})
+
+async def health(request):
+    engine = get_engine()
+    return JSONResponse({
+        'status': 'ok',
+        'predictor': engine.predictor.stats(),
+        'cache': engine.cache.stats(),
+    })
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # تحميل النموذج عند بدء الخادم بدل أول طلب
+    get_engine()
+    yield
+
+app = Starlette(
+    routes=[
+        Route('/solve-image', solve_image, methods=['POST']),
+        Route('/solve-board', solve_board, methods=['POST']),
+        Route('/solve-batch', solve_batch, methods=['POST']),
+        Route('/health', health, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
@@ -2,11 +2,54 @@ import streamlit as st
 import cv2
 import numpy as np
 import pandas as pd
-import fitz  # PyMuPDF
+import os
 import time
-import tensorflow as tf
+import uuid
 import hashlib
+import functools
+import runtime_config
+runtime_config.configure()  # يجب أن يسبق استيراد TensorFlow
 from io import BytesIO
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from pipeline import (
+    PipelineContext,
+    resize_if_needed,
+    decode_image,
+    render_pdf_grids,
+    find_board_robust,
+    find_boards_robust,
+    grid_size,
+    warp_image,
+    extract_digits_multi,
+    draw_solution_on_warped,
+    candidate_layer,
+    draw_hint_on_warped,
+    overlay_solution_on_original,
+)
+from session_store import SessionImageStore, SessionReaper, MB
+from inference_server import BatchingPredictor, load_model
+from template_matcher import TemplateMatcher
+from solver import validate_board, box_shape, candidate_grid, BOX_SHAPES, SolveService, SolveTimeout
+from live_tracker import GridTracker
+from hints import solve_steps
+
+# وضع البث المباشر اختياري: يحتاج الحزمة streamlit-webrtc
+try:
+    import av
+    from streamlit_webrtc import webrtc_streamer
+except ImportError:
+    webrtc_streamer = None
+
+# أقصى عدد ألغاز يُحتفظ بها في سجل كل جلسة
+HISTORY_LIMIT = int(os.environ.get('SUDOKU_HISTORY_LIMIT', 50))
+
+# المصنّف السريع (قوالب) قبل CNN مفعّل افتراضياً: SUDOKU_CASCADE=0 لتعطيله
+CASCADE_DEFAULT = os.environ.get('SUDOKU_CASCADE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# أسماء مستويات الصعوبة (solver.DIFFICULTY_LEVELS)
+DIFFICULTY_LABELS = {'easy': "سهل", 'medium': "متوسط", 'hard': "صعب", 'expert': "خبير"}
 
 # ==========================================
 # إعدادات الصفحة
@@ -20,471 +63,185 @@ st.set_page_config(
 # ==========================================
 # تهيئة Session State
 # ==========================================
+# الصور لا تُحفظ هنا: تُخزَّن مضغوطة في SessionImageStore المشترك
 defaults = {
     'img_hash': None,
     'board_extracted': False,
     'extracted_board': None,
     'confidences': None,
-    'solved_img': None,
     'solved_board': None,
-    'debug_clean': None,
-    'warped_img': None,
-    'original_img': None,
+    'solved_from': None,
     'pts': None,
+    'multi_results': None,
     'history': [],
+    # التلميحات: مولّد الخطوات للوحة المعدّلة الحالية وآخر خطوة
+    'hint_key': None,
+    'hint_steps': None,
+    'hint_step': None,
+    'hint_board': None,
+    'hint_before': None,
+    'ocr_tiers': None,
 }
 
 for key, default in defaults.items():
     if key not in st.session_state:
         st.session_state[key] = default
+if 'sid' not in st.session_state:
+    st.session_state.sid = uuid.uuid4().hex
 
 # ==========================================
 # 0. تحميل النموذج
 # ==========================================
 @st.cache_resource
 def load_digit_model():
-    try:
-        model = tf.keras.models.load_model('model.h5')
-        return model
-    except Exception as e:
-        return None
+    return load_model()
 
-# ==========================================
-# 1. دوال معالجة الصور
-# ==========================================
-def resize_if_needed(img, max_size=1500, min_size=300):
-    """ضبط حجم الصورة تلقائياً"""
-    h, w = img.shape[:2]
-    if max(h, w) > max_size:
-        scale = max_size / max(h, w)
-        img = cv2.resize(img, None, fx=scale, fy=scale)
-    elif max(h, w) < min_size:
-        scale = 600 / max(h, w)
-        img = cv2.resize(img, None, fx=scale, fy=scale)
-    return img
-
-def preprocess_image(img, clip_limit=2.0, block_size=11, c_val=2):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
-    enhanced = clahe.apply(gray)
-    blur = cv2.GaussianBlur(enhanced, (5, 5), 1)
-    return cv2.adaptiveThreshold(
-        blur,
-        255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV,
-        block_size,
-        c_val
-    )
+@st.cache_resource
+def get_predictor(_model):
+    """خدمة تنبؤ مشتركة تجمع خلايا الجلسات المتزامنة في دفعة واحدة"""
+    return BatchingPredictor.from_env(_model)
 
-def find_board(thresh_img):
-    contours, _ = cv2.findContours(
-        thresh_img,
-        cv2.RETR_EXTERNAL,
-        cv2.CHAIN_APPROX_SIMPLE
-    )
-    best = None
-    max_area = 0
-    for c in contours:
-        area = cv2.contourArea(c)
-        if area > 25000:
-            peri = cv2.arcLength(c, True)
-            approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-            if len(approx) == 4 and area > max_area:
-                max_area = area
-                best = approx
-    return best
-
-def find_board_hough(img):
-    """اكتشاف الشبكة عبر خطوط Hough كخطة بديلة"""
-    try:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-        lines = cv2.HoughLinesP(
-            edges,
-            1,
-            np.pi / 180,
-            threshold=100,
-            minLineLength=100,
-            maxLineGap=10
-        )
-        if lines is None:
-            return None
-        horizontal, vertical = [], []
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            angle = np.degrees(np.arctan2(abs(y2 - y1), abs(x2 - x1)))
-            length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-            if angle < 15 and length > 80:
-                horizontal.append(line[0])
-            elif angle > 75 and length > 80:
-                vertical.append(line[0])
-        if len(horizontal) < 2 or len(vertical) < 2:
-            return None
-        h_arr = np.array(horizontal)
-        v_arr = np.array(vertical)
-        min_y = min(h_arr[:, 1].min(), h_arr[:, 3].min())
-        max_y = max(h_arr[:, 1].max(), h_arr[:, 3].max())
-        min_x = min(v_arr[:, 0].min(), v_arr[:, 2].min())
-        max_x = max(v_arr[:, 0].max(), v_arr[:, 2].max())
-        if (max_y - min_y) < 100 or (max_x - min_x) < 100:
-            return None
-        pts = np.array([
-            [[min_x, min_y]],
-            [[max_x, min_y]],
-            [[max_x, max_y]],
-            [[min_x, max_y]]
-        ], dtype=np.float32)
-        return pts
-    except:
-        return None
+@st.cache_resource
+def get_cascade():
+    """الطبقة الأولى في التعرف: قوالب الأرقام تُبنى مرة واحدة لكل العملية"""
+    return TemplateMatcher.from_env()
 
-def find_board_robust(img):
-    """محاولات متعددة بمعاملات مختلفة لإيجاد الشبكة"""
-    params = [
-        (2.0, 11, 2),
-        (3.0, 11, 2),
-        (2.0, 15, 3),
-        (4.0, 11, 4),
-        (2.0, 7, 2),
-        (3.0, 15, 4),
-        (5.0, 11, 2),
-    ]
-    for clip, block, c in params:
-        thresh = preprocess_image(img, clip, block, c)
-        pts = find_board(thresh)
-        if pts is not None:
-            return pts, thresh
-    # خطة بديلة: Hough Lines
-    pts = find_board_hough(img)
-    if pts is not None:
-        thresh = preprocess_image(img)
-        return pts, thresh
-    return None, None
-
-def order_points(pts):
-    pts = pts.reshape((4, 2)).astype(np.float32)
-    rect = np.zeros((4, 2), dtype=np.float32)
-    s = pts.sum(axis=1)
-    rect[0] = pts[np.argmin(s)]
-    rect[2] = pts[np.argmax(s)]
-    d = np.diff(pts, axis=1)
-    rect[1] = pts[np.argmin(d)]
-    rect[3] = pts[np.argmax(d)]
-    return rect
-
-def warp_image(img, pts, size=450):
-    src = order_points(pts)
-    dst = np.float32([
-        [0, 0],
-        [size - 1, 0],
-        [size - 1, size - 1],
-        [0, size - 1]
-    ])
-    M = cv2.getPerspectiveTransform(src, dst)
-    return cv2.warpPerspective(img, M, (size, size)), M
+@st.cache_resource
+def get_image_store():
+    """مخزن صور مضغوطة مشترك بين كل الجلسات بميزانية محدودة"""
+    return SessionImageStore.from_env()
+
+store = get_image_store()
 
 # ==========================================
-# 2. استخراج الأرقام (تم التحديث لإزالة التشويش)
+# 1. استخراج الأرقام مع شريط التقدم
 # ==========================================
-def prepare_cell(cell):
-    """استخراج الرقم من الخلية وتصفيته وتجهيزه بمقاس 28×28"""
-    if cell is None or cell.size == 0:
-        return None
-        
-    # 1. إزالة التشويش النقطي الصغير باستخدام Morphological Opening
-    kernel = np.ones((2, 2), np.uint8)
-    cell = cv2.morphologyEx(cell, cv2.MORPH_OPEN, kernel)
-    
-    contours, _ = cv2.findContours(
-        cell,
-        cv2.RETR_EXTERNAL,
-        cv2.CHAIN_APPROX_SIMPLE
-    )
-    if not contours:
-        return None
-        
-    valid_contours = []
-    h_cell, w_cell = cell.shape
-    
-    # 2. فلترة الكنتورات بذكاء
-    for c in contours:
-        area = cv2.contourArea(c)
-        x, y, w, h = cv2.boundingRect(c)
-        
-        # استبعاد النقاط الصغيرة جداً (التشويش) والضخمة جداً
-        if area < 40 or area > (h_cell * w_cell * 0.8):
-            continue
-            
-        # استبعاد الكنتورات التي تلامس حواف الخلية (بقايا خطوط الشبكة)
-        if x < 2 or y < 2 or (x + w) > w_cell - 2 or (y + h) > h_cell - 2:
-            continue
-            
-        # التأكد من أن الأبعاد منطقية للرقم
-        aspect_ratio = w / float(h)
-        if 0.1 < aspect_ratio < 1.5: 
-            valid_contours.append(c)
-
-    if not valid_contours:
-        return None
-        
-    # اختيار الكنتور الأكبر مساحة من بين الصالحة
-    best_c = max(valid_contours, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(best_c)
-    
-    if w < 3 or h < 3:
-        return None
-        
-    digit = cell[y:y + h, x:x + w]
-    if digit.size == 0:
-        return None
-        
-    # 3. توسيط الرقم في قماش 28x28
-    canvas = np.zeros((28, 28), dtype=np.uint8)
-    scale = 20.0 / max(w, h)
-    nw = max(int(w * scale), 1)
-    nh = max(int(h * scale), 1)
-    res = cv2.resize(digit, (nw, nh), interpolation=cv2.INTER_AREA)
-    
-    # تحسين وضوح الرقم بعد تغيير حجمه
-    _, res = cv2.threshold(res, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-    
-    oy = (28 - nh) // 2
-    ox = (28 - nw) // 2
-    canvas[oy:oy + nh, ox:ox + nw] = res
-    return canvas
-
-def get_cell_multi_threshold(gray_cell):
-    """إنشاء نسخ متعددة بطرق threshold مختلفة"""
-    cells = []
-    try:
-        _, t1 = cv2.threshold(
-            gray_cell,
-            0,
-            255,
-            cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU
-        )
-        cells.append(t1)
-    except:
-        pass
-    try:
-        t2 = cv2.adaptiveThreshold(
-            gray_cell,
-            255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY_INV,
-            11,
-            2
-        )
-        cells.append(t2)
-    except:
-        pass
-    try:
-        t3 = cv2.adaptiveThreshold(
-            gray_cell,
-            255,
-            cv2.ADAPTIVE_THRESH_MEAN_C,
-            cv2.THRESH_BINARY_INV,
-            11,
-            2
-        )
-        cells.append(t3)
-    except:
-        pass
-    return cells
-
-def augment_canvas(canvas):
-    """إنشاء نسخ معدّلة (TTA) من صورة 28×28"""
-    versions = [canvas]
-    # تدوير بسيط
-    for angle in [-5, 5]:
-        M = cv2.getRotationMatrix2D((14, 14), angle, 1.0)
-        rotated = cv2.warpAffine(canvas, M, (28, 28))
-        versions.append(rotated)
-    # إزاحة بسيطة
-    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-        M_s = np.float32([[1, 0, dx], [0, 1, dy]])
-        shifted = cv2.warpAffine(canvas, M_s, (28, 28))
-        versions.append(shifted)
-    return versions
-
-def extract_digits_batch(warped_img, model, use_tta=True, conf_threshold=0.7):
-    """استخراج الأرقام بدفعة واحدة"""
-    board = np.zeros((9, 9), dtype=int)
-    confidences = np.zeros((9, 9), dtype=float)
-    gray = cv2.cvtColor(warped_img, cv2.COLOR_BGR2GRAY)
-    debug_montage = np.zeros((9 * 28, 9 * 28), dtype=np.uint8)
-    cell_size = 450 // 9
-    cell_data = {}
+def extract_digits_with_progress(warped_imgs, model, use_tta=True, conf_threshold=0.7, n=9,
+                                 cascade=None, tiers=None):
+    """تشغيل استخراج الأرقام لعدة شبكات n×n مع عرض التقدم
+    cascade / tiers: المصنّف السريع وعدد خلايا كل طبقة (pipeline.predict_cell_canvases)"""
     progress = st.progress(0, text="🤖 تحليل الخلايا...")
-
-    # ────── المرحلة 1: جمع جميع الخلايا ──────
-    for i in range(9):
-        for j in range(9):
-            # تم التحديث هنا إلى 15% لتجاوز خطوط الشبكة السميكة
-            m = int(cell_size * 0.15)
-            y1, y2 = i * cell_size + m, (i + 1) * cell_size - m
-            x1, x2 = j * cell_size + m, (j + 1) * cell_size - m
-            gray_cell = gray[y1:y2, x1:x2]
-            if gray_cell.size == 0:
-                continue
-
-            # Multi-threshold
-            thresh_versions = get_cell_multi_threshold(gray_cell)
-            canvases = []
-            first_canvas = None
-            for tv in thresh_versions:
-                c = prepare_cell(tv)
-                if c is not None:
-                    if first_canvas is None:
-                        first_canvas = c
-                    canvases.append(c)
-
-            if canvases and first_canvas is not None:
-                debug_montage[i * 28:(i + 1) * 28, j * 28:(j + 1) * 28] = first_canvas
-
-                # TTA
-                if use_tta:
-                    augmented = augment_canvas(first_canvas)
-                    canvases.extend(augmented[1:])
-
-                cell_data[(i, j)] = canvases
-            progress.progress(((i * 9 + j) + 1) / 81)
+    with st.spinner(f"⚡ تنبؤ دفعة واحدة ({len(warped_imgs)} شبكة)..."):
+        result = extract_digits_multi(
+            warped_imgs,
+            model,
+            use_tta=use_tta,
+            conf_threshold=conf_threshold,
+            on_progress=progress.progress,
+            n=n,
+            cascade=cascade,
+            tiers=tiers
+        )
     progress.empty()
+    return result
 
-    # ────── المرحلة 2: تنبؤ بدفعة واحدة ⚡ ──────
-    if cell_data:
-        all_images = []
-        cell_indices = []
-        for (i, j), canvases in cell_data.items():
-            for canvas in canvases:
-                all_images.append(canvas)
-                cell_indices.append((i, j))
-
-        if all_images:
-            batch = np.array(all_images).reshape(
-                -1, 28, 28, 1
-            ).astype('float32') / 255.0
-
-            with st.spinner(f"⚡ تنبؤ دفعة واحدة ({len(all_images)} صورة)..."):
-                predictions = model.predict(batch, verbose=0)
-
-            # تجميع التنبؤات لكل خلية
-            cell_preds = {}
-            for idx, (i, j) in enumerate(cell_indices):
-                if (i, j) not in cell_preds:
-                    cell_preds[(i, j)] = []
-                cell_preds[(i, j)].append(predictions[idx])
-
-            for (i, j), preds in cell_preds.items():
-                avg_pred = np.mean(preds, axis=0)
-                digit = int(np.argmax(avg_pred))
-                conf = float(avg_pred[digit])
-                if conf > conf_threshold and digit != 0:
-                    board[i][j] = digit
-                    confidences[i][j] = conf
-
-    st.session_state.debug_clean = debug_montage
-    return board, confidences
-
-# ==========================================
-# 3. محرك حل السودوكو
-# ==========================================
-def is_valid(b, r, c, n):
-    if n in b[r, :] or n in b[:, c]:
-        return False
-    sr, sc = (r // 3) * 3, (c // 3) * 3
-    if n in b[sr:sr + 3, sc:sc + 3]:
-        return False
-    return True
-
-def solve(b):
-    for r in range(9):
-        for c in range(9):
-            if b[r, c] == 0:
-                for n in range(1, 10):
-                    if is_valid(b, r, c, n):
-                        b[r, c] = n
-                        if solve(b):
-                            return True
-                        b[r, c] = 0
-                return False
-    return True
-
-def validate_board(board):
-    for i in range(9):
-        for j in range(9):
-            v = board[i, j]
-            if v != 0:
-                temp = board.copy()
-                temp[i, j] = 0
-                if not is_valid(temp, i, j, v):
-                    return False, f"تكرار الرقم {v} في الموقع [صف {i+1}, عمود {j+1}]"
-    return True, ""
+def extract_digits_batch(warped_img, model, use_tta=True, conf_threshold=0.7, n=9,
+                         cascade=None):
+    """استخراج الأرقام بدفعة واحدة (مع عدد خلايا كل طبقة وزمن التعرف للمعاينة التقنية)"""
+    tiers = []
+    start = time.perf_counter()
+    boards, confidences, montages = extract_digits_with_progress(
+        [warped_img],
+        model,
+        use_tta=use_tta,
+        conf_threshold=conf_threshold,
+        n=n,
+        cascade=cascade,
+        tiers=tiers
+    )
+    st.session_state.ocr_tiers = dict(tiers[0], ms=(time.perf_counter() - start) * 1000)
+    store.put(st.session_state.sid, 'debug_clean', montages[0])
+    return boards[0], confidences[0]
 
 # ==========================================
-# 4. رسم الحل على الصورة
+# 2. الحل في الخلفية بمهلة زمنية
 # ==========================================
-def draw_solution_on_warped(warped_img, solved, original):
-    result = warped_img.copy()
-    h, w = result.shape[:2]
-    ch, cw = h // 9, w // 9
-    for i in range(9):
-        for j in range(9):
-            if original[i, j] == 0 and solved[i, j] != 0:
-                txt = str(solved[i, j])
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                fs, thick = 1.2, 2
-                sz = cv2.getTextSize(txt, font, fs, thick)[0]
-                tx = j * cw + (cw - sz[0]) // 2
-                ty = i * ch + (ch + sz[1]) // 2
-                pad = 4
-                cv2.rectangle(
-                    result,
-                    (tx - pad, ty - sz[1] - pad),
-                    (tx + sz[0] + pad, ty + pad),
-                    (255, 255, 255),
-                    -1
-                )
-                cv2.putText(
-                    result,
-                    txt,
-                    (tx, ty),
-                    font,
-                    fs,
-                    (0, 0, 255),
-                    thick
-                )
-    return result
+@st.cache_resource
+def get_solve_service():
+    """مجمّع عمال الحل المشترك بين الجلسات"""
+    return SolveService.from_env()
+
+def session_alive_checker():
+    """دالة تعيد False بعد انتهاء الجلسة الحالية (لإيقاف الحل اليتيم)"""
+    ctx = get_script_run_ctx()
+    if ctx is None or not runtime.exists():
+        return None
+    rt = runtime.get_instance()
+    session_id = ctx.session_id
+    return lambda: rt.is_active_session(session_id)
 
-def overlay_solution_on_original(original_img, solved_warped, pts, size=450):
-    src = np.float32([
-        [0, 0],
-        [size - 1, 0],
-        [size - 1, size - 1],
-        [0, size - 1]
-    ])
-    dst = order_points(pts)
-    M_inv = cv2.getPerspectiveTransform(src, dst)
-    h, w = original_img.shape[:2]
-    warped_back = cv2.warpPerspective(solved_warped, M_inv, (w, h))
-    mask = np.zeros((size, size), dtype=np.uint8)
-    mask[:] = 255
-    mask_warped = cv2.warpPerspective(mask, M_inv, (w, h))
-    result = original_img.copy()
-    mask_3ch = cv2.cvtColor(mask_warped, cv2.COLOR_GRAY2BGR)
-    result = np.where(mask_3ch > 0, warped_back, result)
-    return result
+@st.cache_resource
+def get_session_reaper():
+    """موارد الجلسات المنتهية (صورها في المخزن) تُحرَّر عند أول تشغيل لأي جلسة بعدها"""
+    return SessionReaper()
+
+reaper = get_session_reaper()
+_is_alive = session_alive_checker()
+if _is_alive is not None:
+    reaper.register(st.session_state.sid, _is_alive, 'images',
+                    functools.partial(store.drop, st.session_state.sid))
+reaper.sweep()
+
+def wait_for_jobs(jobs):
+    """انتظار مهام الحل مع عرض العقد المستكشفة، وإلغاؤها إذا قوطع السكربت"""
+    status = st.empty()
+    try:
+        while not all(job.wait(0.1) for job in jobs):
+            nodes = sum(job.nodes for job in jobs)
+            status.caption(f"⏳ جاري الحل... {nodes:,} عقدة مستكشفة")
+    finally:
+        # تفاعل جديد يعيد تشغيل السكربت ويقاطع الانتظار: أوقف المهام
+        for job in jobs:
+            if not job.done():
+                job.cancel()
+        status.empty()
+
+def run_solve_job(board):
+    """حل لوحة واحدة في مجمّع العمال"""
+    job = get_solve_service().submit(board, is_alive=session_alive_checker())
+    wait_for_jobs([job])
+    return job
+
+def live_recognise_fn(model, service, use_tta=False, conf_threshold=0.7, cascade=None):
+    """دالة تعرف وحل لإطار مستقر من البث المباشر (تُستدعى في خيط التتبع الخلفي)"""
+    def recognise(warped):
+        boards, _, _ = extract_digits_multi(
+            [warped],
+            model,
+            use_tta=use_tta,
+            conf_threshold=conf_threshold,
+            cascade=cascade
+        )
+        board = boards[0]
+        ok, _ = validate_board(board)
+        if not ok or np.count_nonzero(board) < 17:
+            return board, None
+        job = service.submit(board)
+        job.wait()
+        return board, (job.board if job.status == 'solved' else None)
+    return recognise
+
+def solve_failure_message(job):
+    if job.status == 'timeout':
+        return (
+            f"⏱️ تجاوز الحل المهلة ({get_solve_service().time_budget:.0f} ثانية) "
+            f"بعد {job.nodes:,} عقدة: اللغز صعب جداً أو غالباً غير صالح."
+        )
+    return "❌ لا يمكن حل هذا اللغز! تأكد من صحة الأرقام."
 
 # ==========================================
-# 5. مكونات الواجهة
+# 3. مكونات الواجهة
 # ==========================================
 def show_confidence_board(board, confidences):
     """عرض اللوحة المكتشفة بألوان حسب الثقة"""
+    n = len(board)
+    br_, bc_ = box_shape(n)
+    # الخلايا تصغر مع اللوحات الكبيرة لتبقى الشبكة بعرض ~420 بكسل
+    px = min(46, 420 // n)
     html = """<table style='border-collapse:collapse; margin:auto; font-family:monospace;'>"""
-    for i in range(9):
+    for i in range(n):
         html += "<tr>"
-        for j in range(9):
+        for j in range(n):
             val = board[i][j]
             conf = confidences[i][j]
             if val == 0:
@@ -499,14 +256,14 @@ def show_confidence_board(board, confidences):
             else:
                 bg = "#ffcdd2"
                 text = f"{val}?"
-            # حدود المربعات 3×3
-            bt = "3px solid #000" if i % 3 == 0 else "1px solid #aaa"
-            bl = "3px solid #000" if j % 3 == 0 else "1px solid #aaa"
-            bb = "3px solid #000" if i == 8 else ""
-            br = "3px solid #000" if j == 8 else ""
+            # حدود المربعات حسب شكلها (3×3، 2×3، 4×4...)
+            bt = "3px solid #000" if i % br_ == 0 else "1px solid #aaa"
+            bl = "3px solid #000" if j % bc_ == 0 else "1px solid #aaa"
+            bb = "3px solid #000" if i == n - 1 else ""
+            br = "3px solid #000" if j == n - 1 else ""
             style = (
-                f"width:46px; height:46px; text-align:center; "
-                f"font-size:20px; font-weight:bold; background:{bg}; "
+                f"width:{px}px; height:{px}px; text-align:center; "
+                f"font-size:{min(20, px // 2)}px; font-weight:bold; background:{bg}; "
                 f"border-top:{bt}; border-left:{bl};"
             )
             if bb:
@@ -525,26 +282,39 @@ def show_confidence_board(board, confidences):
     """
     st.markdown(html, unsafe_allow_html=True)
 
-def get_download_button(img, filename="sudoku_solved.png"):
-    """زر تحميل الصورة المحلولة"""
-    success, buffer = cv2.imencode('.png', img)
-    if success:
-        st.download_button(
-            label="📥 تحميل الحل كصورة PNG",
-            data=BytesIO(buffer.tobytes()),
-            file_name=filename,
-            mime="image/png",
-            use_container_width=True
-        )
+def board_frame(board):
+    """اللوحة كجدول بعناوين C1.. و R1.. حسب حجمها"""
+    n = len(board)
+    return pd.DataFrame(
+        board,
+        columns=[f"C{i+1}" for i in range(n)],
+        index=[f"R{i+1}" for i in range(n)]
+    )
+
+def get_download_button(png_bytes, filename="sudoku_solved.png"):
+    """زر تحميل الصورة المحلولة (PNG مضغوطة مسبقاً)"""
+    st.download_button(
+        label="📥 تحميل الحل كصورة PNG",
+        data=BytesIO(png_bytes),
+        file_name=filename,
+        mime="image/png",
+        use_container_width=True
+    )
 
-def save_history(original, solved):
-    """حفظ اللغز في السجل"""
+def encode_png(img):
+    return cv2.imencode('.png', img)[1].tobytes()
+
+def save_history(original, solved, stats=None):
+    """حفظ اللغز في السجل (بحد أقصى HISTORY_LIMIT، الأقدم يُحذف أولاً)
+    stats: عدّادات الحل ودرجة الصعوبة من مهمة الحل (job.stats) إن وُجدت"""
     st.session_state.history.append({
         'time': time.strftime('%Y-%m-%d %H:%M:%S'),
         'clues': int(np.count_nonzero(original)),
-        'original': original.copy(),
-        'solved': solved.copy(),
+        'original': original.astype(np.int8),
+        'solved': solved.astype(np.int8),
+        'difficulty': stats or None,
     })
+    del st.session_state.history[:-HISTORY_LIMIT]
 
 def show_history():
     """عرض سجل الألغاز المحلولة"""
@@ -553,33 +323,224 @@ def show_history():
         return
     for idx, entry in enumerate(reversed(st.session_state.history)):
         num = len(st.session_state.history) - idx
+        grade = entry.get('difficulty')
+        level = (
+            f"، {DIFFICULTY_LABELS[grade['level']]} {grade['score']:.1f}" if grade else ""
+        )
         with st.expander(
             f"🧩 لغز #{num} — {entry['time']} "
-            f"({entry['clues']} أرقام)"
+            f"({entry['clues']} أرقام{level})"
         ):
-            sol_df = pd.DataFrame(
-                entry['solved'],
-                columns=[f"C{i+1}" for i in range(9)],
-                index=[f"R{i+1}" for i in range(9)]
-            )
+            if grade:
+                st.caption(
+                    f"أصعب تقنية: {grade['technique']} — "
+                    f"تخمينات: {grade['guesses']}، تراجعات: {grade['backtracks']}"
+                )
+            sol_df = board_frame(entry['solved'])
             st.dataframe(sol_df, use_container_width=True)
     if st.button("🗑️ مسح السجل"):
         st.session_state.history = []
         st.rerun()
 
+def solve_multi_grids(sources, model, use_tta=True, conf_threshold=0.7, n=9, cascade=None):
+    """قص كل الشبكات وتصنيف خلاياها بدفعة واحدة ثم حل كل شبكة
+    sources: قائمة (الصورة, نقاط الشبكة)
+    الصور الناتجة تُخزَّن في مخزن الجلسة، والنتائج تحمل الألواح فقط"""
+    sid = st.session_state.sid
+    warps = [warp_image(src, pts, grid_size(n))[0] for src, pts in sources]
+    tiers = []
+    boards, confidences, _ = extract_digits_with_progress(
+        warps,
+        model,
+        use_tta=use_tta,
+        conf_threshold=conf_threshold,
+        n=n,
+        cascade=cascade,
+        tiers=tiers
+    )
+    results = []
+    # الصورة المجمّعة متاحة فقط عندما تأتي كل الشبكات من صورة واحدة
+    # (صفحات PDF تُعرض كمقاطع منفصلة لكل شبكة)
+    single_source = all(src is sources[0][0] for src, _ in sources)
+    combined = sources[0][0]
+
+    # إرسال كل الشبكات الصالحة للحل معاً ثم انتظارها
+    service = get_solve_service()
+    is_alive = session_alive_checker()
+    jobs = {}
+    errors = {}
+    for idx, board in enumerate(boards):
+        ok, msg = validate_board(board)
+        if ok:
+            jobs[idx] = service.submit(board, is_alive=is_alive)
+        else:
+            errors[idx] = f"⚠️ {msg}"
+    wait_for_jobs(list(jobs.values()))
+
+    for idx, ((src, pts), warped, board, conf) in enumerate(
+        zip(sources, warps, boards, confidences)
+    ):
+        entry = {
+            'board': board,
+            'confidences': conf,
+            'solved_board': None,
+            'error': errors.get(idx),
+            'tiers': tiers[idx],
+        }
+        shown = warped
+        job = jobs.get(idx)
+        if job is not None:
+            if job.status == 'solved':
+                entry['solved_board'] = job.board
+                shown = draw_solution_on_warped(warped, job.board, board)
+                if single_source:
+                    combined = overlay_solution_on_original(combined, shown, pts)
+                save_history(board, job.board, job.stats)
+            else:
+                entry['error'] = solve_failure_message(job)
+        store.put(sid, f'grid_{idx}', shown)
+        results.append(entry)
+    if single_source and any(r['solved_board'] is not None for r in results):
+        store.put(sid, 'multi_combined', combined)
+    return results
+
+def show_multi_results(results):
+    """عرض نتيجة مستقلة لكل شبكة مع صورة مجمّعة لكل الحلول"""
+    solved_count = sum(r['solved_board'] is not None for r in results)
+    st.info(
+        f"🧩 تم اكتشاف **{len(results)}** شبكة | "
+        f"تم حل **{solved_count}** منها"
+    )
+    sid = st.session_state.sid
+    combined = store.get_bytes(sid, 'multi_combined')
+    if combined is not None:
+        st.subheader("🎯 جميع الحلول")
+        st.image(combined, use_container_width=True)
+        get_download_button(combined)
+
+    for idx, r in enumerate(results):
+        st.markdown("---")
+        st.subheader(f"🔲 الشبكة #{idx + 1}")
+        show_confidence_board(r['board'], r['confidences'])
+        st.caption(tiers_caption(r['tiers']))
+        grid_png = store.get_bytes(sid, f'grid_{idx}')
+        if grid_png is not None:
+            st.image(grid_png, use_container_width=True)
+        else:
+            st.caption("🧮 أُخليت الصورة من الذاكرة (تجاوز الميزانية)")
+        if r['error']:
+            st.warning(r['error'])
+            continue
+        with st.expander("📊 عرض الحل كجدول"):
+            sol_df = board_frame(r['solved_board'])
+            st.dataframe(sol_df, use_container_width=True)
+
+def tiers_caption(tiers):
+    """عدد الخلايا التي حسمها المصنّف السريع وعدد ما صُعّد إلى CNN"""
+    text = f"⚡ المصنّف السريع: {tiers['template']} خلية | 🧠 CNN: {tiers['cnn']} خلية"
+    if 'ms' in tiers:
+        text += f" | ⏱️ {tiers['ms']:.0f} ms"
+    return text
+
+def describe_step(step):
+    """نص التلميح: التقنية ثم الأرقام المثبتة أو المرشحات المحذوفة"""
+    parts = [f"ضع **{v}** في [صف {r+1}, عمود {c+1}]" for r, c, v in step['placements']]
+    removed = step['eliminations']
+    if removed:
+        listed = "، ".join(f"{v} من [صف {r+1}, عمود {c+1}]" for r, c, v in removed[:6])
+        more = f" و{len(removed) - 6} غيرها" if len(removed) > 6 else ""
+        parts.append(f"احذف المرشح {listed}{more}")
+    return f"💡 **{step['name']}**: " + " | ".join(parts)
+
+def known_solution(board):
+    """آخر حل في الجلسة إن كان يوافق كل أرقام اللوحة (فلا تحتاج خطوات 'reveal' بحثاً جديداً)"""
+    solved = st.session_state.solved_board
+    if solved is None or solved.shape != board.shape:
+        return None
+    given = board > 0
+    return solved if (solved[given] == board[given]).all() else None
+
+def next_hint_step(board):
+    """الخطوة التالية للوحة: المولّد يُنشأ مرة لكل لوحة ويتقدم خطوة واحدة مع كل طلب
+    يرفع SolveTimeout إذا احتاجت خطوة 'reveal' بحثاً تجاوز مهلة خدمة الحل"""
+    key = board.tobytes()
+    if st.session_state.hint_key != key:
+        st.session_state.hint_key = key
+        st.session_state.hint_steps = solve_steps(
+            board,
+            solution=known_solution(board),
+            time_budget=get_solve_service().time_budget
+        )
+        st.session_state.hint_board = board.copy()
+    try:
+        step = next(st.session_state.hint_steps, None)
+    except SolveTimeout:
+        # المولّد انتهى: الطلب التالي يبدأ من جديد
+        st.session_state.hint_key = None
+        raise
+    st.session_state.hint_step = step
+    if step is not None:
+        # اللوحة قبل هذه الخطوة (مع أرقام التلميحات السابقة) للرسم
+        st.session_state.hint_before = st.session_state.hint_board.copy()
+        for r, c, v in step['placements']:
+            st.session_state.hint_board[r, c] = v
+    return step
+
+def show_memory_admin():
+    """لوحة إدارة: استهلاك مخزن الصور المشترك"""
+    stats = store.stats()
+    with st.expander("🧮 استهلاك الذاكرة (إدارة)", expanded=True):
+        c1, c2 = st.columns(2)
+        c1.metric(
+            "المخزن العام",
+            f"{stats['total_bytes'] / MB:.1f} MB",
+            f"من {stats['global_budget'] / MB:.0f} MB",
+            delta_color="off"
+        )
+        c2.metric(
+            "هذه الجلسة",
+            f"{stats['sessions'].get(st.session_state.sid, 0) / MB:.2f} MB",
+            f"من {stats['session_budget'] / MB:.0f} MB",
+            delta_color="off"
+        )
+        c3, c4 = st.columns(2)
+        c3.metric("الجلسات النشطة", len(stats['sessions']))
+        c4.metric("عمليات الإخلاء", stats['evictions'])
+        st.caption(
+            f"{stats['items']} صورة مخزنة | "
+            f"سجل الجلسة: {len(st.session_state.history)}/{HISTORY_LIMIT}"
+        )
+    digit_model = load_digit_model()
+    if digit_model is not None:
+        p = get_predictor(digit_model).stats()
+        st.caption(
+            f"⚡ خدمة التنبؤ: {p['requests']} طلب في {p['batches']} دفعة "
+            f"(متوسط {p['avg_requests_per_batch']:.1f} طلب/دفعة)"
+        )
+
+def show_runtime_admin():
+    """لوحة إدارة: إعدادات الخيوط والذاكرة الفعلية لهذه العملية"""
+    with st.expander("⚙️ إعدادات التشغيل (إدارة)"):
+        st.json(runtime_config.effective_settings())
+
 def reset_state():
     """إعادة تعيين الحالة للصورة الجديدة"""
+    store.drop(st.session_state.sid)
     st.session_state.update({
         'img_hash': None,
         'board_extracted': False,
         'extracted_board': None,
         'confidences': None,
-        'solved_img': None,
         'solved_board': None,
-        'debug_clean': None,
-        'warped_img': None,
-        'original_img': None,
+        'solved_from': None,
         'pts': None,
+        'multi_results': None,
+        'hint_key': None,
+        'hint_steps': None,
+        'hint_step': None,
+        'hint_board': None,
+        'hint_before': None,
+        'ocr_tiers': None,
     })
 
 # ==========================================
@@ -606,44 +567,71 @@ with st.sidebar:
         step=0.05,
         help="الأرقام بثقة أقل من هذا الحد تُعتبر فارغة"
     )
+    multi_grid = st.checkbox(
+        "🧩 كشف عدة شبكات",
+        value=False,
+        help="حل جميع ألغاز السودوكو في صفحة جريدة أو كتاب دفعة واحدة"
+    )
+    use_cascade = st.checkbox(
+        "⚡ مصنّف سريع قبل CNN",
+        value=CASCADE_DEFAULT,
+        help="مطابقة قوالب للأرقام المطبوعة الواضحة، ولا يُصعَّد إلى CNN إلا الخلايا غير المؤكدة"
+    )
+    board_size = st.selectbox(
+        "📐 حجم اللوحة",
+        list(BOX_SHAPES),
+        index=list(BOX_SHAPES).index(9),
+        format_func=lambda n: f"{n}×{n} (مربعات {box_shape(n)[0]}×{box_shape(n)[1]})",
+        help="النموذج يتعرف على 1..9 فقط: القيم الأكبر في اللوحات الكبيرة تُدخل في الجدول"
+    )
     st.divider()
     st.header("📜 سجل الألغاز")
     show_history()
+    if st.query_params.get("admin") == "1":
+        st.divider()
+        show_memory_admin()
+        show_runtime_admin()
 
 # ═══════════ تحميل النموذج ═══════════
 model = load_digit_model()
 if model is None:
-    st.error("⚠️ ملف model.h5 مفقود أو تالف!")
+    st.error("⚠️ ملف النموذج مفقود أو تالف!")
     st.info(
-        "ضع ملف `model.h5` (نموذج CNN مدرّب على MNIST) "
-        "في نفس مجلد التطبيق."
+        "ضع ملف `model.h5` (نموذج CNN مدرّب على MNIST) في نفس مجلد التطبيق، "
+        "أو حدّد نموذجاً آخر بالمتغير `SUDOKU_MODEL_PATH` "
+        "(مثل `model_small.h5` المقطَّر للأرقام المطبوعة بـ `python -m distill`، "
+        "أو `model_pruned.h5` المقلَّم بـ `python -m prune`)."
     )
     st.stop()
+predictor = get_predictor(model)
+cascade = get_cascade() if use_cascade else None
 st.success("✅ النموذج جاهز للعمل")
 
 # ═══════════ اختيار طريقة الإدخال ═══════════
 input_mode = st.radio(
     "📥 طريقة الإدخال:",
-    ("📸 كاميرا", "📁 ملف صورة / PDF", "⌨️ إدخال يدوي"),
+    ("📸 كاميرا", "🎥 بث مباشر", "📁 ملف صورة / PDF", "⌨️ إدخال يدوي"),
     horizontal=True
 )
 
+# مغادرة البث المباشر: إيقاف خيط المتتبّع بدل تركه حتى انتهاء الجلسة
+if input_mode != "🎥 بث مباشر" and st.session_state.get('live_tracker') is not None:
+    reaper.unregister(st.session_state.sid, 'live_tracker')
+    st.session_state.live_tracker.close()
+    st.session_state.live_tracker = None
+
 # ╔══════════════════════════════════════════╗
 # ║ الوضع اليدوي ║
 # ╚══════════════════════════════════════════╝
 if input_mode == "⌨️ إدخال يدوي":
     st.subheader("⌨️ أدخل أرقام السودوكو يدوياً")
     st.info("ضع **0** في الخلايا الفارغة")
-    empty_board = np.zeros((9, 9), dtype=int)
-    df = pd.DataFrame(
-        empty_board,
-        columns=[f"C{i+1}" for i in range(9)],
-        index=[f"R{i+1}" for i in range(9)]
-    )
+    empty_board = np.zeros((board_size, board_size), dtype=int)
+    df = board_frame(empty_board)
     edited_df = st.data_editor(
         df,
         use_container_width=True,
-        key="manual_input"
+        key=f"manual_input_{board_size}"
     )
     if st.button(
         "🚀 حل السودوكو",
@@ -656,31 +644,67 @@ if input_mode == "⌨️ إدخال يدوي":
             st.error(f"❌ {msg}")
         else:
             clue_count = np.count_nonzero(final_board)
-            if clue_count < 17:
+            if board_size == 9 and clue_count < 17:
                 st.warning(
                     f"⚠️ عدد الأرقام المُعطاة ({clue_count}) قليل جداً. "
                     f"الحد الأدنى النظري 17."
                 )
-            s_board = final_board.copy()
-            original_board = final_board.copy()
-            with st.spinner("⏳ جاري الحل..."):
-                start = time.time()
-                if solve(s_board):
-                    elapsed = time.time() - start
-                    st.success(f"✅ تم الحل في {elapsed:.2f} ثانية!")
-                    st.balloons()
-                    sol_df = pd.DataFrame(
-                        s_board,
-                        columns=[f"C{i+1}" for i in range(9)],
-                        index=[f"R{i+1}" for i in range(9)]
-                    )
-                    st.dataframe(sol_df, use_container_width=True)
-                    save_history(original_board, s_board)
-                else:
-                    st.error(
-                        "❌ لا يمكن حل هذا اللغز! "
-                        "تأكد من صحة الأرقام."
-                    )
+            job = run_solve_job(final_board)
+            if job.status == 'solved':
+                st.success(f"✅ تم الحل في {job.elapsed:.2f} ثانية!")
+                st.balloons()
+                sol_df = board_frame(job.board)
+                st.dataframe(sol_df, use_container_width=True)
+                save_history(job.original, job.board, job.stats)
+            else:
+                st.error(solve_failure_message(job))
+
+# ╔══════════════════════════════════════════╗
+# ║ وضع البث المباشر ║
+# ╚══════════════════════════════════════════╝
+elif input_mode == "🎥 بث مباشر":
+    if webrtc_streamer is None:
+        st.warning("⚠️ وضع البث المباشر يحتاج الحزمة الاختيارية streamlit-webrtc")
+        st.code("pip install streamlit-webrtc")
+        st.stop()
+    if board_size != 9:
+        st.info("ℹ️ البث المباشر يتعرف على لوحات 9×9 فقط")
+
+    # متتبّع واحد لكل جلسة: الشبكة تُتتبّع بين الإطارات والحل يُرسم فوقها
+    if st.session_state.get('live_tracker') is None:
+        st.session_state.live_tracker = GridTracker.from_env(None)
+        if _is_alive is not None:
+            # انتهاء الجلسة دون مغادرة الوضع: يُغلق عند أول sweep بعدها
+            reaper.register(st.session_state.sid, _is_alive, 'live_tracker',
+                            st.session_state.live_tracker.close)
+    tracker = st.session_state.live_tracker
+    tracker.recognise = live_recognise_fn(
+        predictor,
+        get_solve_service(),
+        use_tta=use_tta,
+        conf_threshold=conf_threshold,
+        cascade=cascade
+    )
+
+    def video_frame_callback(frame):
+        img = frame.to_ndarray(format="bgr24")
+        return av.VideoFrame.from_ndarray(tracker.process(img), format="bgr24")
+
+    st.info("🎯 ثبّت الكاميرا على اللغز لثوانٍ: يظهر الحل فوق الشبكة مباشرة")
+    webrtc_streamer(
+        key="sudoku-live",
+        video_frame_callback=video_frame_callback,
+        media_stream_constraints={"video": True, "audio": False},
+        async_processing=True
+    )
+    if st.button("📋 عرض الحل الحالي", use_container_width=True):
+        entry = tracker.result()
+        if entry is None or entry['solved'] is None:
+            st.warning("⚠️ لم يُحل أي لغز بعد")
+        else:
+            sol_df = board_frame(entry['solved'])
+            st.dataframe(sol_df, use_container_width=True)
+            save_history(entry['board'], entry['solved'])
 
 # ╔══════════════════════════════════════════╗
 # ║ وضع الكاميرا أو الملف ║
@@ -701,18 +725,17 @@ else:
         # ── قراءة الصورة ──
         if filename.endswith('.pdf'):
             try:
-                doc = fitz.open(stream=data, filetype="pdf")
-                pix = doc[0].get_pixmap(dpi=200)
-                img = cv2.imdecode(
-                    np.frombuffer(pix.tobytes("png"), np.uint8),
-                    1
+                preview, grid_images = render_pdf_grids(
+                    data,
+                    max_boards=6 if multi_grid else 1
                 )
-                doc.close()
             except Exception as e:
                 st.error(f"❌ خطأ في قراءة PDF: {e}")
                 st.stop()
+            img = grid_images[0]
         else:
-            img = cv2.imdecode(np.frombuffer(data, np.uint8), 1)
+            img = decode_image(data)
+            preview, grid_images = None, None
 
         if img is None:
             st.error("❌ فشل في قراءة الصورة!")
@@ -720,32 +743,61 @@ else:
 
         # ── ضبط الحجم ──
         img = resize_if_needed(img)
+        if grid_images is None:
+            grid_images = [img]
+        else:
+            grid_images = [img] + [resize_if_needed(g) for g in grid_images[1:]]
 
         # ── عرض الصورة الأصلية ──
         st.subheader("📷 الصورة الأصلية")
-        st.image(img, channels="BGR", use_container_width=True)
+        st.image(
+            preview if preview is not None else img,
+            channels="BGR",
+            use_container_width=True
+        )
+
+        # ── سياق مشترك: تحويل رمادي واحد لكل مراحل الطلب ──
+        ctx = PipelineContext(color=img)
 
         # ── التحقق من تغيير الصورة ──
-        h_val = hashlib.md5(img.tobytes()[:5000]).hexdigest()
+        h_val = hashlib.md5(img.reshape(-1)[:5000].tobytes()).hexdigest() + f":{board_size}"
         if st.session_state.img_hash != h_val:
-            st.session_state.update({
-                'img_hash': h_val,
-                'board_extracted': False,
-                'extracted_board': None,
-                'confidences': None,
-                'solved_img': None,
-                'solved_board': None,
-                'debug_clean': None,
-                'warped_img': None,
-                'original_img': img.copy(),
-                'pts': None,
-            })
+            reset_state()
+            st.session_state.img_hash = h_val
+
+        # ══════════════════════════════════════
+        # وضع الشبكات المتعددة
+        # ══════════════════════════════════════
+        if multi_grid:
+            if st.session_state.multi_results is None:
+                # صور PDF مقصوصة مسبقاً لشبكة واحدة لكل صورة
+                per_image = 6 if len(grid_images) == 1 else 1
+                contexts = [ctx] + [PipelineContext(color=g) for g in grid_images[1:]]
+                with st.spinner("🔍 البحث عن جميع الشبكات في الصفحة..."):
+                    sources = [
+                        (c.color, pts)
+                        for c in contexts
+                        for pts in find_boards_robust(c, max_boards=per_image)
+                    ]
+                if not sources:
+                    st.error("❌ لم يتم العثور على أي شبكة سودوكو!")
+                    st.stop()
+                st.session_state.multi_results = solve_multi_grids(
+                    sources,
+                    predictor,
+                    use_tta=use_tta,
+                    conf_threshold=conf_threshold,
+                    n=board_size,
+                    cascade=cascade
+                )
+            show_multi_results(st.session_state.multi_results)
+            st.stop()
 
         # ══════════════════════════════════════
         # اكتشاف الشبكة
         # ══════════════════════════════════════
         with st.spinner("🔍 البحث عن شبكة السودوكو..."):
-            pts, thresh = find_board_robust(img)
+            pts, thresh = find_board_robust(ctx)
 
         if pts is None:
             st.error("❌ لم يتم العثور على شبكة سودوكو!")
@@ -758,8 +810,7 @@ else:
             st.stop()
 
         st.session_state.pts = pts
-        warped, M = warp_image(img, pts)
-        st.session_state.warped_img = warped.copy()
+        warped, M = warp_image(img, pts, grid_size(board_size))
         st.subheader("🔲 الشبكة المكتشفة")
         st.image(warped, channels="BGR", use_container_width=True)
 
@@ -769,9 +820,11 @@ else:
         if not st.session_state.board_extracted:
             board, confidences = extract_digits_batch(
                 warped,
-                model,
+                predictor,
                 use_tta=use_tta,
-                conf_threshold=conf_threshold
+                conf_threshold=conf_threshold,
+                n=board_size,
+                cascade=cascade
             )
             st.session_state.extracted_board = board.copy()
             st.session_state.confidences = confidences.copy()
@@ -806,15 +859,11 @@ else:
 
             # ── جدول قابل للتعديل ──
             st.subheader("✏️ تعديل الأرقام (اختياري)")
-            df = pd.DataFrame(
-                b,
-                columns=[f"C{i+1}" for i in range(9)],
-                index=[f"R{i+1}" for i in range(9)]
-            )
+            df = board_frame(b)
             edited_df = st.data_editor(
                 df,
                 use_container_width=True,
-                key="board_editor"
+                key=f"board_editor_{board_size}"
             )
 
             # ── زر الحل ──
@@ -829,49 +878,90 @@ else:
                     st.error(f"❌ {msg2}")
                 else:
                     clue_count = np.count_nonzero(final_board)
-                    if clue_count < 17:
+                    if board_size == 9 and clue_count < 17:
                         st.warning(
                             f"⚠️ عدد الأرقام ({clue_count}) قليل جداً"
                         )
-                    s_board = final_board.copy()
-                    original_board = final_board.copy()
-                    with st.spinner("⏳ جاري الحل..."):
-                        start_t = time.time()
-                        solved = solve(s_board)
-                        elapsed_t = time.time() - start_t
-                        if solved:
-                            st.success(
-                                f"✅ تم الحل بنجاح في {elapsed_t:.2f} ثانية!"
-                            )
-                            st.balloons()
-                            st.session_state.solved_board = s_board.copy()
-
-                            # رسم الحل
-                            solved_warped = draw_solution_on_warped(
-                                st.session_state.warped_img.copy(),
-                                s_board,
-                                original_board
-                            )
-                            result = overlay_solution_on_original(
-                                img,
-                                solved_warped,
-                                st.session_state.pts
-                            )
-                            st.session_state.solved_img = result
-                            save_history(original_board, s_board)
-                        else:
-                            st.error(
-                                "❌ لا يمكن حل هذا اللغز! "
-                                "تأكد من صحة الأرقام المدخلة."
-                            )
+                    job = run_solve_job(final_board)
+                    if job.status == 'solved':
+                        st.success(
+                            f"✅ تم الحل بنجاح في {job.elapsed:.2f} ثانية!"
+                        )
+                        st.balloons()
+                        st.session_state.solved_board = job.board
+                        st.session_state.solved_from = job.original
+                        store.drop(st.session_state.sid, 'solved_img')
+                        save_history(job.original, job.board, job.stats)
+                    else:
+                        st.error(solve_failure_message(job))
+
+            # ── تلميح: الخطوة المنطقية التالية فقط بدل الحل كاملاً ──
+            if st.button("💡 تلميح (الخطوة التالية)", use_container_width=True):
+                hint_board = edited_df.to_numpy().astype(int)
+                ok3, msg3 = validate_board(hint_board)
+                if not ok3:
+                    st.error(f"❌ {msg3}")
+                else:
+                    try:
+                        if next_hint_step(hint_board) is None:
+                            st.info("✅ لا توجد خطوات أخرى: اللوحة مكتملة أو بلا حل")
+                    except SolveTimeout:
+                        st.warning(
+                            f"⏱️ لا تقنية منطقية مناسبة، وتجاوز البحث عن الحل المهلة "
+                            f"({get_solve_service().time_budget:.0f} ثانية): اللغز غالباً غير صالح."
+                        )
+            step = st.session_state.hint_step
+            if step is not None and st.session_state.hint_key == edited_df.to_numpy().astype(int).tobytes():
+                st.markdown(describe_step(step))
+                st.image(
+                    draw_hint_on_warped(
+                        warped,
+                        edited_df.to_numpy().astype(int),
+                        step,
+                        placed=st.session_state.hint_before
+                    ),
+                    channels="BGR",
+                    use_container_width=True
+                )
+
+            # ── المرشحات: كل الأرقام الممكنة في كل خلية فارغة بدل الحل ──
+            if st.checkbox("✏️ عرض المرشحات (أقلام الرصاص)", key="show_candidates"):
+                pencil_board = edited_df.to_numpy().astype(int)
+                ok4, msg4 = validate_board(pencil_board)
+                if not ok4:
+                    st.error(f"❌ {msg4}")
+                else:
+                    h, w = warped.shape[:2]
+                    layer, mask = candidate_layer(candidate_grid(pencil_board), h, w)
+                    st.image(
+                        overlay_solution_on_original(img, layer, st.session_state.pts, mask=mask),
+                        channels="BGR",
+                        caption="✏️ المرشحات المتبقية لكل خلية فارغة",
+                        use_container_width=True
+                    )
 
             # ══════════════════════════════════════
             # عرض النتيجة النهائية
             # ══════════════════════════════════════
-            if st.session_state.solved_img is not None:
+            if st.session_state.solved_board is not None:
                 st.markdown("---")
                 st.subheader("🎯 النتيجة النهائية")
 
+                # الصورة المحلولة من المخزن، أو إعادة رسمها إذا أُخليت
+                solved_png = store.get_bytes(st.session_state.sid, 'solved_img')
+                if solved_png is None:
+                    solved_warped = draw_solution_on_warped(
+                        warped,
+                        st.session_state.solved_board,
+                        st.session_state.solved_from
+                    )
+                    solved_png = encode_png(overlay_solution_on_original(
+                        img,
+                        solved_warped,
+                        st.session_state.pts
+                    ))
+                    store.put_bytes(st.session_state.sid, 'solved_img', solved_png)
+
                 # مقارنة قبل / بعد
                 col1, col2 = st.columns(2)
                 with col1:
@@ -883,35 +973,32 @@ else:
                     )
                 with col2:
                     st.image(
-                        st.session_state.solved_img,
-                        channels="BGR",
+                        solved_png,
                         caption="✅ بعد الحل",
                         use_container_width=True
                     )
 
                 # زر التحميل
-                get_download_button(st.session_state.solved_img)
+                get_download_button(solved_png)
 
                 # الحل كجدول
-                if st.session_state.solved_board is not None:
-                    with st.expander("📊 عرض الحل كجدول"):
-                        sol_df = pd.DataFrame(
-                            st.session_state.solved_board,
-                            columns=[f"C{i+1}" for i in range(9)],
-                            index=[f"R{i+1}" for i in range(9)]
-                        )
-                        st.dataframe(sol_df, use_container_width=True)
+                with st.expander("📊 عرض الحل كجدول"):
+                    sol_df = board_frame(st.session_state.solved_board)
+                    st.dataframe(sol_df, use_container_width=True)
 
             # ══════════════════════════════════════
             # المعاينة التقنية
             # ══════════════════════════════════════
-            if st.session_state.debug_clean is not None:
+            debug_png = store.get_bytes(st.session_state.sid, 'debug_clean')
+            if debug_png is not None:
                 with st.expander("🛠️ المعاينة التقنية (Debug) - مصفاة من التشويش"):
                     st.image(
-                        st.session_state.debug_clean,
+                        debug_png,
                         caption="الأرقام الصافية كما رآها الذكاء الاصطناعي (28×28)",
                         use_container_width=True
                     )
+                    if st.session_state.ocr_tiers is not None:
+                        st.caption(tiers_caption(st.session_state.ocr_tiers))
                     if st.session_state.confidences is not None:
                         conf = st.session_state.confidences
                         non_zero = conf[conf > 0]
@@ -0,0 +1,77 @@
+"""
+إنتاجية الحل (لوحة/ثانية): solve_batch (انتشار القيود على N لوحة معاً) مقابل حلقة solve()
+على نسخ مكافئة من ألغاز بصعوبات مختلفة، مع التحقق من أن كل الحلول صحيحة.
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_batch_solver --boards 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, puzzle_variants
+from solver import PROPAGATED, SEARCHED, SolveTimeout, solve_batch, solve_with_budget
+
+PUZZLES = {
+    'easy': SAMPLE_PUZZLE,
+    'medium': "000260701680070090190004500820100040004602900050003028009300074040050036703018000",
+    'hard': "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+}
+
+
+def parse(puzzle):
+    if isinstance(puzzle, str):
+        return np.array([int(c) for c in puzzle]).reshape(9, 9)
+    return np.asarray(puzzle)
+
+
+def is_solution(board, puzzle):
+    full = set(range(1, 10))
+    return (
+        (board[puzzle > 0] == puzzle[puzzle > 0]).all()
+        and all(set(board[i]) == full and set(board[:, i]) == full for i in range(9))
+        and all(set(board[r:r + 3, c:c + 3].ravel()) == full for r in (0, 3, 6) for c in (0, 3, 6))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=2000)
+    parser.add_argument('--loop-boards', type=int, default=10,
+                        help='عدد اللوحات لحلقة solve() (بطيئة)')
+    parser.add_argument('--loop-budget', type=float, default=10.0,
+                        help='مهلة solve() لكل لوحة بالثواني')
+    args = parser.parse_args()
+
+    print(f"{'puzzle':>7s} {'loop boards/s':>14s} {'batch boards/s':>15s} {'speedup':>8s} "
+          f"{'propagated':>10s} {'searched':>8s} {'valid':>6s}")
+    for name, puzzle in PUZZLES.items():
+        puzzle = parse(puzzle)
+        boards = puzzle_variants(puzzle, args.boards)
+
+        start = time.perf_counter()
+        solutions, status = solve_batch(boards)
+        batch_rate = len(boards) / (time.perf_counter() - start)
+        valid = all(is_solution(s, b) for s, b in zip(solutions, boards))
+
+        elapsed, done, timeouts = 0.0, 0, 0
+        for board in boards[:args.loop_boards]:
+            b = board.copy()
+            start = time.perf_counter()
+            try:
+                solve_with_budget(b, time_budget=args.loop_budget)
+                done += 1
+            except SolveTimeout:
+                timeouts += 1
+            elapsed += time.perf_counter() - start
+        loop_rate = done / elapsed if done else 0.0
+        loop_text = f"{loop_rate:8.2f}" + (f" ({timeouts} t/o)" if timeouts else "")
+
+        print(f"{name:>7s} {loop_text:>14s} {batch_rate:15.1f} "
+              f"{batch_rate / loop_rate if loop_rate else float('inf'):7.0f}x "
+              f"{int((status == PROPAGATED).sum()):10d} {int((status == SEARCHED).sum()):8d} {str(valid):>6s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+التعرف بطبقتين (قوالب ثم CNN للخلايا غير المؤكدة) مقابل النموذج وحده لكل الخلايا:
+زمن extract_digits_multi للوحة كاملة، وزمن مرحلة التنبؤ وحدها (predict_cell_canvases)،
+وعدد خلايا كل طبقة لكل لوحة، ودقة الخلايا مقابل اللغز المرسوم.
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_cascade --boards 20 --noise
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, puzzle_variants, render_grid
+from inference_server import BatchingPredictor, load_model
+from pipeline import (
+    PipelineContext, collect_cell_canvases, extract_digits_multi, find_board_robust,
+    predict_cell_canvases, warp_image,
+)
+from template_matcher import TemplateMatcher
+
+
+def degrade(img, rng):
+    """تمويه وضوضاء وضغط JPEG كصورة كاميرا متوسطة الجودة"""
+    img = cv2.GaussianBlur(img, (3, 3), rng.uniform(0.3, 1.2))
+    img = np.clip(img + rng.normal(0, rng.uniform(2, 12), img.shape), 0, 255).astype(np.uint8)
+    quality = int(rng.uniform(40, 90))
+    return cv2.imdecode(cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=20)
+    parser.add_argument('--noise', action='store_true', help='تمويه وضوضاء وضغط JPEG')
+    parser.add_argument('--no-tta', action='store_true')
+    args = parser.parse_args()
+
+    model = load_model()
+    if model is None:
+        print("لا يوجد نموذج (model.h5 أو SUDOKU_MODEL_PATH)")
+        return
+    # نفس مسار التطبيق: خدمة التنبؤ المشتركة فوق النموذج
+    model = BatchingPredictor.from_env(model)
+    cascade = TemplateMatcher.from_env()
+    use_tta = not args.no_tta
+    rng = np.random.default_rng(0)
+    puzzles = puzzle_variants(SAMPLE_PUZZLE, args.boards)
+    warps = []
+    for puzzle in puzzles:
+        img = render_grid(puzzle, margin=30)
+        if args.noise:
+            img = degrade(img, rng)
+        pts, _ = find_board_robust(PipelineContext(color=img))
+        warps.append(warp_image(img, pts)[0])
+    cell_data = [collect_cell_canvases(w, use_tta=use_tta)[0] for w in warps]
+    # تهيئة النموذج قبل القياس
+    model.predict(np.zeros((1, 28, 28, 1), dtype=np.float32))
+
+    print(f"{'mode':8s} {'board ms':>9s} {'predict ms':>10s} {'template':>9s} {'cnn':>6s} {'cell acc':>9s}")
+    for name, tier in (('single', None), ('cascade', cascade)):
+        total, stage, tiers, correct = [], [], [], 0
+        for puzzle, warped, cells in zip(puzzles, warps, cell_data):
+            t0 = time.perf_counter()
+            boards, _, _ = extract_digits_multi([warped], model, use_tta=use_tta, cascade=tier)
+            total.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            predict_cell_canvases([cells], model, cascade=tier, tiers=tiers)
+            stage.append(time.perf_counter() - t0)
+            correct += int((boards[0] == puzzle).sum())
+        template = np.mean([t['template'] for t in tiers])
+        cnn = np.mean([t['cnn'] for t in tiers])
+        print(
+            f"{name:8s} {np.median(total) * 1000:9.1f} {np.median(stage) * 1000:10.1f} "
+            f"{template:9.1f} {cnn:6.1f} {correct / puzzles.size:9.4f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
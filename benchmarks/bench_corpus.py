@@ -0,0 +1,87 @@
+"""
+مجموعة ألغاز مولّدة (generator.py) كمدخل اختبار أداء وصحة:
+- الحل: solve_fast و solve_with_budget (solve الأصلية) مقارنة بالحل المخزّن لكل لغز
+- التعرف: رسم كل لغز كصورة ثم اكتشاف الشبكة والقص والتنبؤ، ودقة الخلايا مقابل اللغز
+
+التشغيل من جذر المستودع:
+    python -m generator --count 500 --out corpus.jsonl
+    python -m benchmarks.bench_corpus corpus.jsonl --ocr 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import render_grid
+from generator import read_corpus
+from solver import SolveTimeout, solve_fast, solve_with_budget
+
+
+def bench_solver(name, fn, puzzles, solutions, budget):
+    times, wrong = [], 0
+    for puzzle, solution in zip(puzzles, solutions):
+        b = puzzle.astype(int)
+        t0 = time.perf_counter()
+        try:
+            solved, _ = fn(b, time_budget=budget)
+        except SolveTimeout:
+            solved = False
+        times.append(time.perf_counter() - t0)
+        wrong += not (solved and (b == solution).all())
+    times = np.array(times) * 1000
+    print(f"{name:18s} {len(times):6d} {np.median(times):10.3f} {np.percentile(times, 99):10.3f} {wrong:7d}")
+
+
+def bench_ocr(puzzles):
+    from inference_server import load_model
+    from pipeline import PipelineContext, extract_digits_multi, find_board_robust, grid_size, warp_image
+
+    model = load_model()
+    if model is None:
+        print("ocr: لا يوجد نموذج (model.h5 أو SUDOKU_MODEL_PATH)")
+        return
+    n = puzzles.shape[1]
+    # النموذج يعرف 0..9 فقط
+    shown = np.where(puzzles <= 9, puzzles, 0)
+    t0 = time.perf_counter()
+    warps, found = [], []
+    for k, puzzle in enumerate(shown):
+        img = render_grid(puzzle, size=grid_size(n), margin=30)
+        pts, _ = find_board_robust(PipelineContext(color=img))
+        if pts is not None:
+            warps.append(warp_image(img, pts, grid_size(n))[0])
+            found.append(k)
+    boards, _, _ = extract_digits_multi(warps, model, n=n) if warps else ([], None, None)
+    elapsed = time.perf_counter() - t0
+    cells = np.mean([(b == shown[k]).mean() for k, b in zip(found, boards)]) if boards else 0.0
+    exact = sum((b == shown[k]).all() for k, b in zip(found, boards))
+    print(
+        f"ocr: {len(found)}/{len(shown)} شبكة مكتشفة، دقة الخلايا {cells:.4f}، "
+        f"لوحات مطابقة {exact}، {elapsed / len(shown) * 1000:.1f} ms/لغز"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('corpus', help='ملف ‎.jsonl‎ أو ‎.npz‎ من generator.py')
+    parser.add_argument('--limit', type=int, default=None, help='أول N لغز فقط')
+    parser.add_argument('--budget', type=float, default=5.0, help='مهلة كل لغز بالثواني')
+    parser.add_argument('--backtrack', type=int, default=50,
+                        help='عدد الألغاز لـ solve_with_budget (بطيئة)')
+    parser.add_argument('--ocr', type=int, default=0, help='عدد الألغاز لمسار التعرف')
+    args = parser.parse_args()
+
+    puzzles, solutions = read_corpus(args.corpus)
+    puzzles, solutions = puzzles[:args.limit], solutions[:args.limit]
+    print(f"{len(puzzles)} لغز {puzzles.shape[1]}×{puzzles.shape[1]}")
+    print(f"{'solver':18s} {'boards':>6s} {'median ms':>10s} {'p99 ms':>10s} {'wrong':>7s}")
+    bench_solver('solve_fast', solve_fast, puzzles, solutions, args.budget)
+    if args.backtrack:
+        k = args.backtrack
+        bench_solver('solve_with_budget', solve_with_budget, puzzles[:k], solutions[:k], args.budget)
+    if args.ocr:
+        bench_ocr(puzzles[:args.ocr])
+
+
+if __name__ == '__main__':
+    main()
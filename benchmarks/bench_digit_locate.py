@@ -0,0 +1,54 @@
+"""
+مقارنة طريقتي تحديد الأرقام في collect_cell_canvases:
+- cells: threshold وكنتورات لكل خلية على حدة (81 × 3 مرة)
+- board: إزالة خطوط الشبكة مورفولوجياً و connectedComponentsWithStats مرة لكل نسخة threshold
+
+يقيس الزمن ومطابقة الخلايا المكتشفة للوحة الأصلية، مع إزاحة الصورة المقوّمة
+بعدة بكسلات لمحاكاة خطأ التقويم (خطوط الشبكة تدخل منطقة الخلية).
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_digit_locate --shifts 0 4 8
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, render_grid
+from pipeline import find_board_robust, warp_image, collect_cell_canvases
+
+
+def detection_report(found):
+    expected = SAMPLE_PUZZLE.reshape(-1) > 0
+    got = np.zeros(81, dtype=bool)
+    got[[i * 9 + j for i, j in found]] = True
+    return int((got & ~expected).sum()), int((~got & expected).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--shifts', type=int, nargs='+', default=[0, 4, 8])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    img = render_grid()
+    pts, _ = find_board_robust(img)
+    warped, _ = warp_image(img, pts)
+
+    print(f"{'shift':>5s} {'method':>6s} {'ms':>8s} {'extra':>6s} {'missed':>6s}")
+    for shift in args.shifts:
+        m = np.float32([[1, 0, shift], [0, 1, shift]])
+        shifted = cv2.warpAffine(warped, m, (450, 450), borderValue=(255, 255, 255))
+        for method in ('cells', 'board'):
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found, _ = collect_cell_canvases(shifted, method=method)
+                best = min(best, time.perf_counter() - start)
+            extra, missed = detection_report(found)
+            print(f"{shift:5d} {method:>6s} {best * 1000:8.2f} {extra:6d} {missed:6d}")
+
+
+if __name__ == '__main__':
+    main()
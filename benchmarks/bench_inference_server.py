@@ -0,0 +1,76 @@
+"""
+مقارنة إنتاجية التنبؤ تحت حمل متزامن:
+- كل جلسة تستدعي model.predict بدفعتها الخاصة
+- كل الجلسات تمر عبر BatchingPredictor المشترك
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_inference_server --sessions 50
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from inference_server import BatchingPredictor
+
+
+def make_batches(sessions, canvases, seed=0):
+    """دفعات عشوائية بحجم دفعة لوحة نموذجية (خلايا × threshold × TTA)"""
+    rng = np.random.default_rng(seed)
+    return [
+        rng.random((canvases, 28, 28, 1), dtype=np.float32)
+        for _ in range(sessions)
+    ]
+
+
+def run_concurrent(predict, batches):
+    """تشغيل كل الدفعات في خيوط متزامنة وإرجاع الزمن الكلي"""
+    barrier = threading.Barrier(len(batches))
+
+    def worker(batch):
+        barrier.wait()
+        predict(batch, verbose=0)
+
+    threads = [threading.Thread(target=worker, args=(b,)) for b in batches]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='model.h5')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--canvases', type=int, default=270)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    batches = make_batches(args.sessions, args.canvases)
+    model.predict(batches[0], verbose=0)  # تسخين
+
+    predictor = BatchingPredictor(model, max_wait_ms=args.wait_ms)
+    predictor.predict(batches[0])
+
+    for name, predict in (
+        ('per-session model.predict', model.predict),
+        ('BatchingPredictor', predictor.predict),
+    ):
+        best = min(run_concurrent(predict, batches) for _ in range(args.rounds))
+        print(
+            f"{name:28s} {best:7.2f}s  "
+            f"{args.sessions / best:7.1f} boards/s  "
+            f"{args.sessions * args.canvases / best:9.0f} canvases/s"
+        )
+    s = predictor.stats()
+    print(f"avg requests per server batch: {s['avg_requests_per_batch']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+زمن الحل للوحة واحدة: solve_with_budget (Python) مقابل solve_with_jit (نواة numba)
+على نسخ مكافئة من ألغاز بصعوبات مختلفة، مع التحقق من صحة الحلول،
+وزمن تحميل النواة في عملية جديدة: ترجمة باردة مقابل ذاكرة الترجمة على القرص.
+
+التشغيل من جذر المستودع (يحتاج numba):
+    python -m benchmarks.bench_jit_solver --boards 50
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench_batch_solver import PUZZLES, is_solution, parse
+from benchmarks.synthetic import puzzle_variants
+from solver import SolveTimeout, load_jit, solve_with_budget, solve_with_jit
+
+STARTUP = (
+    "import time; t = time.perf_counter(); import numpy as np, solver; "
+    "solver.solve_fast(np.zeros((9, 9), dtype=int)); "
+    "print(time.perf_counter() - t)"
+)
+
+
+def startup_time():
+    out = subprocess.run([sys.executable, '-c', STARTUP], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def clear_cache():
+    for path in glob.glob(os.path.join(os.path.dirname(load_jit().__file__), '__pycache__', 'solver_jit.*.nb*')):
+        os.remove(path)
+
+
+def run(fn, boards, budget):
+    times, nodes, failed = [], 0, 0
+    for puzzle in boards:
+        b = puzzle.copy()
+        t0 = time.perf_counter()
+        try:
+            solved, n = fn(b, time_budget=budget)
+        except SolveTimeout:
+            solved, n = False, 0
+        times.append(time.perf_counter() - t0)
+        nodes += n
+        failed += not (solved and is_solution(b, puzzle))
+    return np.median(times) * 1000, nodes / len(boards), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=50)
+    parser.add_argument('--budget', type=float, default=20.0,
+                        help='مهلة محرك Python لكل لوحة بالثواني')
+    args = parser.parse_args()
+
+    if load_jit() is None:
+        sys.exit("numba غير مثبتة: pip install numba")
+
+    clear_cache()
+    cold = startup_time()
+    warm = startup_time()
+    print(f"تحميل النواة في عملية جديدة: ترجمة {cold:.2f}s، من القرص {warm:.2f}s")
+
+    print(f"{'puzzle':8s} {'engine':8s} {'median ms':>10s} {'nodes':>9s} {'failed':>7s}")
+    for name, puzzle in PUZZLES.items():
+        boards = puzzle_variants(parse(puzzle), args.boards, seed=1)
+        for engine, fn in (('python', solve_with_budget), ('jit', solve_with_jit)):
+            # محرك Python بطيء جداً على الألغاز الصعبة: عينة أصغر
+            sample = boards if engine == 'jit' else boards[:max(3, args.boards // 10)]
+            ms, nodes, failed = run(fn, sample, args.budget)
+            print(f"{name:8s} {engine:8s} {ms:10.3f} {nodes:9.0f} {failed:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+وضع الكاميرا المباشر على فيديو اصطناعي: شبكة تتحرك بحركة يد بسيطة (إزاحة ودوران)
+يقارن الزمن لكل إطار بين find_board_robust لكل إطار و GridTracker،
+مع خطأ الأركان مقابل الحقيقة وعدد مرات الاكتشاف والتصنيف.
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_live_tracking --frames 150
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import render_grid
+from live_tracker import GridTracker
+from pipeline import PipelineContext, find_board_robust, order_points
+
+FRAME = (480, 640)
+
+
+def make_video(frames, grid_px=300, seed=0):
+    """إطارات BGR مع أركان الشبكة الحقيقية لكل إطار"""
+    rng = np.random.default_rng(seed)
+    grid = cv2.resize(render_grid(), (grid_px, grid_px))
+    noise = rng.integers(150, 220, FRAME + (3,), dtype=np.uint8)
+    background = cv2.GaussianBlur(noise, (0, 0), 3)
+    src = np.float32([[0, 0], [grid_px - 1, 0], [grid_px - 1, grid_px - 1], [0, grid_px - 1]])
+    for t in range(frames):
+        angle = 6 * np.sin(t / 25.0)
+        dx, dy = 60 * np.sin(t / 40.0), 30 * np.cos(t / 33.0)
+        M = cv2.getRotationMatrix2D((grid_px / 2, grid_px / 2), angle, 1.0)
+        M[:, 2] += (FRAME[1] - grid_px) / 2 + dx, (FRAME[0] - grid_px) / 2 + dy
+        frame = background.copy()
+        warped = cv2.warpAffine(grid, M, FRAME[::-1], borderValue=(0, 0, 0))
+        mask = cv2.warpAffine(np.full((grid_px, grid_px), 255, np.uint8), M, FRAME[::-1])
+        np.copyto(frame, warped, where=(mask > 0)[..., None])
+        frame = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+        corners = cv2.transform(src[None], M)[0]
+        yield frame, corners
+
+
+def corner_error(found, truth):
+    if found is None:
+        return None
+    # الحدود الخارجية المكتشفة قد تكون أكبر ببضعة بكسلات (سماكة الخط)
+    return float(np.abs(order_points(found) - order_points(truth)).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=150)
+    args = parser.parse_args()
+    video = list(make_video(args.frames))
+
+    start = time.perf_counter()
+    errors = []
+    for frame, truth in video:
+        pts, _ = find_board_robust(PipelineContext(color=frame))
+        errors.append(corner_error(pts, truth))
+    per_frame = (time.perf_counter() - start) / len(video)
+    found = [e for e in errors if e is not None]
+    print(f"detect every frame: {per_frame * 1000:6.2f} ms/frame ({1 / per_frame:5.1f} fps), "
+          f"found {len(found)}/{len(video)}, max corner error {max(found):.1f}px")
+
+    calls = []
+
+    def recognise(warped):
+        calls.append(1)
+        return None, None
+
+    tracker = GridTracker(recognise)
+    errors = []
+    start = time.perf_counter()
+    for frame, truth in video:
+        tracker.process(frame)
+        errors.append(corner_error(tracker.corners, truth))
+    per_frame = (time.perf_counter() - start) / len(video)
+    tracker.close()
+    found = [e for e in errors if e is not None]
+    print(f"GridTracker:        {per_frame * 1000:6.2f} ms/frame ({1 / per_frame:5.1f} fps), "
+          f"found {len(found)}/{len(video)}, max corner error {max(found):.1f}px")
+    print(f"counters: {tracker.counters}")
+
+
+if __name__ == '__main__':
+    main()
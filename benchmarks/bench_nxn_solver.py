@@ -0,0 +1,80 @@
+"""
+زمن الحل حسب حجم اللوحة (4×4 حتى 25×25): solve_bitset (أقنعة بتات + انتشار القيود)
+مقابل solve_with_budget (التراجع البسيط) على ألغاز بنسبة خلايا فارغة محددة،
+مع التحقق من صحة كل الحلول.
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_nxn_solver --boards 10 --holes 0.6
+"""
+import argparse
+import time
+
+import numpy as np
+
+from solver import BOX_SHAPES, SolveTimeout, box_shape, solve_bitset, solve_with_budget
+
+
+def full_grid(n, rng):
+    """لوحة كاملة صحيحة: نمط دوري ثم إعادة ترقيم وتبديل صفوف وأعمدة داخل النطاقات"""
+    br, bc = box_shape(n)
+    grid = np.array([[(bc * (r % br) + r // br + c) % n for c in range(n)] for r in range(n)]) + 1
+    grid = np.concatenate([[0], rng.permutation(n) + 1])[grid]
+    rows = np.concatenate([band * br + rng.permutation(br) for band in rng.permutation(n // br)])
+    cols = np.concatenate([stack * bc + rng.permutation(bc) for stack in rng.permutation(n // bc)])
+    return grid[rows][:, cols]
+
+
+def is_solution(board, puzzle):
+    n = len(board)
+    br, bc = box_shape(n)
+    full = set(range(1, n + 1))
+    return (
+        (board[puzzle > 0] == puzzle[puzzle > 0]).all()
+        and all(set(board[i]) == full and set(board[:, i]) == full for i in range(n))
+        and all(
+            set(board[r:r + br, c:c + bc].ravel()) == full
+            for r in range(0, n, br) for c in range(0, n, bc)
+        )
+    )
+
+
+def run(fn, puzzles, budget):
+    times, failed = [], 0
+    for puzzle in puzzles:
+        b = puzzle.copy()
+        t0 = time.perf_counter()
+        try:
+            solved, _ = fn(b, time_budget=budget)
+        except SolveTimeout:
+            solved = False
+        times.append(time.perf_counter() - t0)
+        failed += not (solved and is_solution(b, puzzle))
+    return np.median(times) * 1000, max(times) * 1000, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=10)
+    parser.add_argument('--holes', type=float, default=0.6, help='نسبة الخلايا الفارغة')
+    parser.add_argument('--budget', type=float, default=10.0, help='مهلة كل لوحة بالثواني')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':6s} {'engine':10s} {'median ms':>10s} {'max ms':>10s} {'failed':>7s}")
+    for n in BOX_SHAPES:
+        puzzles = []
+        for _ in range(args.boards):
+            puzzle = full_grid(n, rng)
+            puzzle[rng.random((n, n)) < args.holes] = 0
+            puzzles.append(puzzle)
+        engines = [('bitset', solve_bitset)]
+        # التراجع البسيط ميؤوس منه بعد 9×9
+        if n <= 9:
+            engines.append(('backtrack', solve_with_budget))
+        for name, fn in engines:
+            med, worst, failed = run(fn, puzzles, args.budget)
+            print(f"{n:<6d} {name:10s} {med:10.2f} {worst:10.2f} {failed:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+زمن رسم الحل وإعادته إلى الصورة الأصلية (draw_solution_on_warped + overlay_solution_on_original)
+على صور بأحجام مختلفة، مقارنةً بالتطبيق المرجعي السابق (putText لكل خلية
+ثم warpPerspective لصورة وقناع بحجم الصورة كاملة)، مع التحقق من تطابق الناتج:
+أكبر فرق داخل الشبكة، وأكبر فرق على شريط الحافة (المرجع يقصّ القناع عند > 0 فيرسم
+بكسلات داكنة، والجديد يمزجها بنسبة التغطية).
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_overlay --sizes 1500 4000
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, render_grid
+from pipeline import draw_solution_on_warped, order_points, overlay_solution_on_original
+from solver import solve
+
+
+def reference_draw(warped_img, solved, original):
+    result = warped_img.copy()
+    h, w = result.shape[:2]
+    ch, cw = h // 9, w // 9
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    for i in range(9):
+        for j in range(9):
+            if original[i, j] == 0 and solved[i, j] != 0:
+                txt = str(solved[i, j])
+                sz = cv2.getTextSize(txt, font, 1.2, 2)[0]
+                tx = j * cw + (cw - sz[0]) // 2
+                ty = i * ch + (ch + sz[1]) // 2
+                cv2.rectangle(result, (tx - 4, ty - sz[1] - 4), (tx + sz[0] + 4, ty + 4), (255, 255, 255), -1)
+                cv2.putText(result, txt, (tx, ty), font, 1.2, (0, 0, 255), 2)
+    return result
+
+
+def reference_overlay(original_img, solved_warped, pts, size=450):
+    src = np.float32([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]])
+    M_inv = cv2.getPerspectiveTransform(src, order_points(pts))
+    h, w = original_img.shape[:2]
+    warped_back = cv2.warpPerspective(solved_warped, M_inv, (w, h))
+    mask = cv2.warpPerspective(np.full((size, size), 255, np.uint8), M_inv, (w, h))
+    return np.where(cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR) > 0, warped_back, original_img)
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1500, 4000])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    solved = SAMPLE_PUZZLE.copy()
+    solve(solved)
+    warped = cv2.resize(render_grid(), (450, 450))
+    for width in args.sizes:
+        height = width * 3 // 4
+        photo = np.full((height, width, 3), 200, np.uint8)
+        # شبكة مائلة قليلاً تشغل ~30% من عرض الصورة
+        side = width * 0.3
+        cx, cy = width / 2, height / 2
+        pts = np.float32([
+            [cx - side / 2, cy - side / 2 + 10], [cx + side / 2, cy - side / 2],
+            [cx + side / 2 + 15, cy + side / 2], [cx - side / 2, cy + side / 2 - 5],
+        ])
+        old_t, old = timed(lambda: reference_overlay(
+            photo, reference_draw(warped, solved, SAMPLE_PUZZLE), pts), args.repeat)
+        new_t, new = timed(lambda: overlay_solution_on_original(
+            photo, draw_solution_on_warped(warped, solved, SAMPLE_PUZZLE), pts), args.repeat)
+        delta = np.abs(old.astype(np.int16) - new).max(axis=2)
+        # تغطية الشبكة في الصورة: 255 داخلها، وقيم جزئية على شريط الحافة
+        src = np.float32([[0, 0], [449, 0], [449, 449], [0, 449]])
+        M = cv2.getPerspectiveTransform(src, order_points(pts))
+        cover = cv2.warpPerspective(np.full((450, 450), 255, np.uint8), M, (width, height))
+        edge = (cover > 0) & (cover < 255)
+        print(f"{width}x{height}: reference {old_t * 1000:7.2f} ms  atlas+roi {new_t * 1000:6.2f} ms  "
+              f"x{old_t / new_t:4.1f}  differing pixels {int(np.count_nonzero(delta))} "
+              f"(max inside {int(delta[cover == 255].max())}, edge band {int(edge.sum())} px, "
+              f"outside {int(delta[cover == 0].max())})")
+
+
+if __name__ == '__main__':
+    main()
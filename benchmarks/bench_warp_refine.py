@@ -0,0 +1,47 @@
+"""
+أثر refine_warp (تصحيح انحناء الشبكة) على اكتشاف الأرقام في صفحات منحنية اصطناعية،
+لكل من طريقتي collect_cell_canvases، مع زمن مرحلة التصحيح نفسها.
+
+التشغيل من جذر المستودع:
+    python -m benchmarks.bench_warp_refine --bend 0 10 18 22
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, bend_page, render_grid
+from pipeline import find_board_robust, warp_image, refine_warp, collect_cell_canvases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bend', type=int, nargs='+', default=[0, 10, 18, 22])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    expected = SAMPLE_PUZZLE > 0
+    print(f"{'bend':>4s} {'refine ms':>9s} {'mesh':>5s}  {'method':>6s} {'refine':>6s} {'extra':>5s} {'missed':>6s}")
+    for amount in args.bend:
+        img = bend_page(render_grid(), amount)
+        pts, _ = find_board_robust(img)
+        warped, _ = warp_image(img, pts)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            _, mesh = refine_warp(warped)
+            best = min(best, time.perf_counter() - start)
+        for method in ('cells', 'board'):
+            for refine in (False, True):
+                found, _ = collect_cell_canvases(warped, method=method, refine=refine)
+                got = np.zeros((9, 9), dtype=bool)
+                for i, j in found:
+                    got[i, j] = True
+                print(
+                    f"{amount:4d} {best * 1000:9.2f} {str(mesh is not None):>5s}  {method:>6s} "
+                    f"{str(refine):>6s} {int((got & ~expected).sum()):5d} {int((~got & expected).sum()):6d}"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+اختبار حمل لواجهة HTTP (api.py): طلبات متزامنة من عدة عملاء بمكتبة Python القياسية فقط،
+يطبع الطلبات في الثانية وزمن الاستجابة (p50 / p95 / p99 / max) لكل مستوى تزامن.
+
+الصور تُغيَّر ببكسل عشوائي لكل طلب حتى لا تخدمها ذاكرة النتائج (إلا مع --same-image).
+
+الخادم يجب أن يعمل مسبقاً:
+    uvicorn api:app --port 8000
+    python -m benchmarks.load_test_api --endpoint image --concurrency 1 4 16
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SAMPLE_PUZZLE, render_grid
+
+
+def make_payloads(endpoint, count, same_image, seed=0):
+    """(المسار, البيانات, نوع المحتوى) لكل طلب"""
+    rng = np.random.default_rng(seed)
+    base = render_grid()
+    payloads = []
+    for k in range(count):
+        if endpoint == 'board':
+            board = SAMPLE_PUZZLE.copy()
+            # إخفاء رقمين عشوائيين في كل طلب ليتجاوز الذاكرة المؤقتة
+            if not same_image:
+                board.flat[rng.choice(np.flatnonzero(board), 2, replace=False)] = 0
+            payloads.append(('/solve-board', json.dumps({'board': board.tolist()}).encode(), 'application/json'))
+            continue
+        img = base.copy()
+        if not same_image:
+            img[0, 0] = rng.integers(0, 256, 3)
+        png = cv2.imencode('.png', img)[1].tobytes()
+        payloads.append(('/solve-image', png, 'image/png'))
+    return payloads
+
+
+def run(url, payloads, concurrency):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    cursor = iter(payloads)
+
+    def client():
+        while True:
+            with lock:
+                item = next(cursor, None)
+            if item is None:
+                return
+            path, data, ctype = item
+            req = urllib.request.Request(url + path, data=data, headers={'Content-Type': ctype})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=120) as resp:
+                    resp.read()
+                ok = True
+            except (urllib.error.URLError, OSError) as e:
+                ok = False
+                with lock:
+                    errors.append(str(e))
+            elapsed = time.perf_counter() - start
+            if ok:
+                with lock:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, np.array(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--endpoint', choices=['image', 'board'], default='image')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=64, help='عدد الطلبات لكل مستوى تزامن')
+    parser.add_argument('--same-image', action='store_true', help='نفس الطلب دائماً (قياس الذاكرة المؤقتة)')
+    args = parser.parse_args()
+
+    # طلب تمهيدي: تحميل النموذج وتسخين المسارات
+    run(args.url, make_payloads(args.endpoint, 1, True), 1)
+
+    print(f"{'clients':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} {'errors':>6s}")
+    for level, concurrency in enumerate(args.concurrency, start=1):
+        payloads = make_payloads(args.endpoint, args.requests, args.same_image, seed=int(time.time()) + level)
+        total, lat, errors = run(args.url, payloads, concurrency)
+        if len(lat) == 0:
+            print(f"{concurrency:7d} all requests failed: {errors[:1]}")
+            continue
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) * 1000
+        print(
+            f"{concurrency:7d} {len(lat) / total:8.1f} {p50:8.1f} {p95:8.1f} {p99:8.1f} "
+            f"{lat.max() * 1000:8.1f} {len(errors):6d}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+اختبار حمل: إنتاجية استخراج الأرقام لكل نواة تحت 1 و 4 و 16 جلسة متزامنة
+بإعدادات التشغيل الحالية (runtime_config).
+
+كل جلسة خيط يكرر: تجهيز خلايا لوحة كاملة + تنبؤ (كما في التطبيق).
+لمقارنة إعدادات مختلفة شغّل السكربت بمتغيرات بيئة مختلفة، مثلاً:
+    SUDOKU_TF_INTRA_OP_THREADS=1 SUDOKU_TF_INTER_OP_THREADS=1 \\
+        python -m benchmarks.load_test_sessions --sessions 1 4 16
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import runtime_config
+runtime_config.configure()  # يجب أن يسبق استيراد TensorFlow
+import tensorflow as tf
+
+from benchmarks.synthetic import render_grid
+from inference_server import BatchingPredictor
+from pipeline import find_board_robust, warp_image, collect_cell_canvases, predict_cell_canvases
+
+
+def run_sessions(sessions, duration, warped, predictor):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def session():
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            cell_data, _ = collect_cell_canvases(warped)
+            predict_cell_canvases([cell_data], predictor)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(latencies) / (time.perf_counter() - start), np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default='model.h5')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--no-batching', action='store_true',
+                        help='كل جلسة تستدعي model.predict مباشرة')
+    args = parser.parse_args()
+
+    settings = runtime_config.effective_settings()
+    cores = settings['cpu_affinity'] or settings['cpu_count']
+    print(
+        f"cores={cores} intra_op={settings['tf_intra_op_threads']} "
+        f"inter_op={settings['tf_inter_op_threads']} "
+        f"opencv={settings.get('opencv_threads')} "
+        f"omp={settings['env']['OMP_NUM_THREADS']}"
+    )
+
+    model = tf.keras.models.load_model(args.model)
+    predictor = model if args.no_batching else BatchingPredictor(model)
+    img = render_grid()
+    pts, _ = find_board_robust(img)
+    warped, _ = warp_image(img, pts)
+    run_sessions(1, 1.0, warped, predictor)  # تسخين
+
+    print(f"{'sessions':>8s} {'boards/s':>9s} {'per core':>9s} {'p50 ms':>8s} {'p95 ms':>8s}")
+    for n in args.sessions:
+        rate, lat = run_sessions(n, args.duration, warped, predictor)
+        print(
+            f"{n:8d} {rate:9.2f} {rate / cores:9.2f} "
+            f"{np.percentile(lat, 50) * 1000:8.1f} {np.percentile(lat, 95) * 1000:8.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
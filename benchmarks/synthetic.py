@@ -0,0 +1,85 @@
+"""
+صور سودوكو اصطناعية لاختبارات الأداء (بدون الحاجة لصور حقيقية)
+"""
+import cv2
+import numpy as np
+
+from solver import box_shape
+
+SAMPLE_PUZZLE = np.array([
+    [5, 3, 0, 0, 7, 0, 0, 0, 0],
+    [6, 0, 0, 1, 9, 5, 0, 0, 0],
+    [0, 9, 8, 0, 0, 0, 0, 6, 0],
+    [8, 0, 0, 0, 6, 0, 0, 0, 3],
+    [4, 0, 0, 8, 0, 3, 0, 0, 1],
+    [7, 0, 0, 0, 2, 0, 0, 0, 6],
+    [0, 6, 0, 0, 0, 0, 2, 8, 0],
+    [0, 0, 0, 4, 1, 9, 0, 0, 5],
+    [0, 0, 0, 0, 8, 0, 0, 7, 9],
+])
+
+
+def render_grid(board=SAMPLE_PUZZLE, size=450, margin=10):
+    """رسم شبكة بخطوط سميكة لحدود المربعات (حسب box_shape) وأرقام مطبوعة، صورة BGR"""
+    n = len(board)
+    br, bc = box_shape(n)
+    img = np.full((size + 2 * margin, size + 2 * margin, 3), 255, np.uint8)
+    cs = size / n
+    for k in range(n + 1):
+        p = int(margin + k * cs)
+        cv2.line(img, (margin, p), (margin + size, p), (0, 0, 0), 4 if k % br == 0 else 1)
+        cv2.line(img, (p, margin), (p, margin + size), (0, 0, 0), 4 if k % bc == 0 else 1)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    fs = cs / 60
+    for i in range(n):
+        for j in range(n):
+            v = int(board[i][j])
+            if v:
+                txt = str(v)
+                tw, th = cv2.getTextSize(txt, font, fs, 2)[0]
+                org = (
+                    int(margin + j * cs + (cs - tw) / 2),
+                    int(margin + i * cs + (cs + th) / 2)
+                )
+                cv2.putText(img, txt, org, font, fs, (0, 0, 0), 2)
+    return img
+
+
+def render_page(count=4, grid_px=300, page=(1400, 1000)):
+    """صفحة بيضاء تحتوي عدة شبكات (لاختبار وضع الشبكات المتعددة)"""
+    img = np.full(page + (3,), 255, np.uint8)
+    grid = cv2.resize(render_grid(), (grid_px, grid_px))
+    gap = 60
+    per_row = max((page[1] - gap) // (grid_px + gap), 1)
+    for k in range(count):
+        r, c = divmod(k, per_row)
+        y, x = gap + r * (grid_px + gap), gap + c * (grid_px + gap)
+        img[y:y + grid_px, x:x + grid_px] = grid
+    return img
+
+
+def bend_page(img, amount, pad=40):
+    """محاكاة صفحة منحنية: إزاحة جيبية للصفوف والأعمدة بحد أقصى amount بكسل"""
+    img = cv2.copyMakeBorder(img, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=(255, 255, 255))
+    h, w = img.shape[:2]
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    map_y = yy + amount * np.sin(np.pi * xx / w)
+    map_x = xx + amount * 0.6 * np.sin(np.pi * yy / h)
+    return cv2.remap(img, map_x, map_y, cv2.INTER_LINEAR, borderValue=(255, 255, 255))
+
+
+def puzzle_variants(board, count, seed=0):
+    """
+    نسخ مكافئة من لغز (نفس الصعوبة وحل وحيد إن كان للأصل حل وحيد):
+    إعادة ترقيم الأرقام، تبديل الصفوف داخل كل نطاق والنطاقات نفسها، ونفس الشيء للأعمدة، ومنقول اختياري
+    """
+    rng = np.random.default_rng(seed)
+    board = np.asarray(board)
+    out = np.empty((count, 9, 9), dtype=board.dtype)
+    for k in range(count):
+        relabel = np.concatenate([[0], rng.permutation(9) + 1])
+        rows = np.concatenate([band * 3 + rng.permutation(3) for band in rng.permutation(3)])
+        cols = np.concatenate([stack * 3 + rng.permutation(3) for stack in rng.permutation(3)])
+        variant = relabel[board][rows][:, cols]
+        out[k] = variant.T if rng.random() < 0.5 else variant
+    return out
@@ -0,0 +1,349 @@
+"""
+تقطير نموذج الأرقام (model.h5، مدرّب على MNIST) إلى نموذج صغير للأرقام المطبوعة
+(بدون أي اعتماد على Streamlit)
+- لوحات اصطناعية مقوّمة: أرقام 1..9 بخطوط Hershey في OpenCV وخطوط TrueType المتوفرة على النظام
+  (عبر PIL إن وُجدت)، مع خطوط الشبكة وخطأ تصحيح بسيط وتمويه وضوضاء وتباين وضغط JPEG،
+  وخانات فارغة/مشوّشة للصنف 0
+- كل لوحة تمرّ بنفس مرحلة التطبيق (pipeline.collect_cell_canvases بطريقة CELL_METHOD:
+  'board' الافتراضية أو 'cells') فيتدرّب الطالب على نفس صور 28×28 التي يراها وقت التعرف
+- الهدف: مزيج من التسمية الصحيحة ومخرجات المعلّم المليّنة بدرجة حرارة T
+  (حين يخطئ المعلّم في رقم مطبوع تُستعمل التسمية الصحيحة بدلاً من مخرجه)
+- المخرجات: ملف ‎.h5‎ بنفس واجهة model.h5 (دخل 28×28×1 / 255، مخرج softmax لـ 0..9)
+  يُحمَّل بـ SUDOKU_MODEL_PATH، وملف ‎.json‎ بجانبه بالدقة وعدد المعاملات وزمن الدفعة
+
+التشغيل المباشر:
+    python -m distill --out model_small.h5
+    SUDOKU_MODEL_PATH=model_small.h5 streamlit run app.py
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from pipeline import collect_cell_canvases, grid_size, predict_cell_canvases
+from solver import box_shape
+
+HERSHEY_FONTS = [
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_PLAIN,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+    cv2.FONT_HERSHEY_COMPLEX_SMALL,
+    cv2.FONT_HERSHEY_SIMPLEX | cv2.FONT_ITALIC,
+    cv2.FONT_HERSHEY_COMPLEX | cv2.FONT_ITALIC,
+]
+
+# مجلدات الخطوط (SUDOKU_FONT_DIRS مفصولة بـ os.pathsep تُضاف قبلها)
+FONT_DIRS = [
+    '/usr/share/fonts',
+    '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'),
+    'C:/Windows/Fonts',
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+]
+
+# ==========================================
+# 1. تركيب الخلايا
+# ==========================================
+def find_ttf_fonts(dirs=None):
+    """مسارات خطوط TrueType/OpenType المتوفرة، أو [] إذا لم تُثبَّت PIL"""
+    try:
+        from PIL import ImageFont  # noqa: F401
+    except ImportError:
+        return []
+    if dirs is None:
+        extra = os.environ.get('SUDOKU_FONT_DIRS', '')
+        dirs = [d for d in extra.split(os.pathsep) if d] + FONT_DIRS
+    paths = []
+    for d in dirs:
+        for ext in ('ttf', 'otf', 'TTF', 'OTF'):
+            paths.extend(glob.glob(os.path.join(d, '**', f'*.{ext}'), recursive=True))
+    return sorted(set(paths))
+
+def _glyph(d, font, height, rng):
+    """قناع الرقم (أبيض على أسود، حواف ناعمة) مقصوصاً على حدوده الفعلية"""
+    if isinstance(font, str):
+        from PIL import Image, ImageDraw, ImageFont
+        # حجم الخط بالنقاط يقارب ارتفاع الرقم / 0.72 لمعظم الخطوط
+        ttf = ImageFont.truetype(font, max(int(height / 0.72), 8))
+        layer = Image.new('L', (height * 3, height * 3), 0)
+        ImageDraw.Draw(layer).text((height * 1.5, height * 1.5), str(d), fill=255, font=ttf, anchor='mm')
+        mask = np.asarray(layer)
+    else:
+        thick = int(rng.integers(1, max(2, height // 10) + 1))
+        scale = cv2.getFontScaleFromHeight(font, height, thick)
+        mask = np.zeros((height * 3, height * 3), np.uint8)
+        cv2.putText(mask, str(d), (height, height * 2), font, scale, 255, thick, cv2.LINE_AA)
+    x, y, w, h = cv2.boundingRect(mask)
+    return mask[y:y + h, x:x + w]
+
+def _draw_digit(cell, d, font, ink, rng):
+    """رسم الرقم d بالخط font (رقم Hershey أو مسار TTF) قرب مركز الخلية (في مكانها)"""
+    size = len(cell)
+    glyph = _glyph(d, font, int(size * rng.uniform(0.35, 0.55)), rng)
+    # الرقم داخل منطقة القص (هامش 15%) كما يُطبع في خانته
+    m = int(size * 0.15) + 3
+    h, w = glyph.shape
+    if h > size - 2 * m or w > size - 2 * m:
+        glyph = cv2.resize(glyph, (min(w, size - 2 * m), min(h, size - 2 * m)),
+                           interpolation=cv2.INTER_AREA)
+        h, w = glyph.shape
+    y = int(np.clip((size - h) / 2 + rng.normal(0, size * 0.03), m, size - m - h))
+    x = int(np.clip((size - w) / 2 + rng.normal(0, size * 0.03), m, size - m - w))
+    alpha = glyph.astype(np.float32) / 255.0
+    region = cell[y:y + h, x:x + w]
+    cell[y:y + h, x:x + w] = (region * (1 - alpha) + ink * alpha).astype(np.uint8)
+
+def render_board(digits, font, rng):
+    """
+    لوحة رمادية n×n كما تخرج من warp_image (ضلعها grid_size(n)) تحمل digits بالخط font،
+    مع خطوط شبكة رفيعة وسميكة للمربعات، وخطأ تصحيح منظور بسيط، وتمويه وضوضاء وضغط JPEG؛
+    الخانات الفارغة (0) قد تحمل بقعاً صغيرة
+    """
+    n = len(digits)
+    side = grid_size(n)
+    cell = side // n
+    bg = int(rng.integers(150, 256))
+    ink = int(rng.integers(0, max(bg - 90, 1)))
+    board = np.full((side, side), bg, np.uint8)
+    for i in range(n):
+        for j in range(n):
+            view = board[i * cell:(i + 1) * cell, j * cell:(j + 1) * cell]
+            if digits[i][j]:
+                _draw_digit(view, int(digits[i][j]), font, ink, rng)
+            else:
+                # بقع صغيرة تمثّل أوساخ الورق أو ضوضاء الكاميرا
+                for _ in range(int(rng.integers(0, 3))):
+                    p = tuple(int(v) for v in rng.integers(0, cell, 2))
+                    cv2.circle(view, p, int(rng.integers(1, max(2, cell // 12))), ink, -1)
+    # خطوط الشبكة: السميكة على حدود المربعات
+    br, bc = box_shape(n)
+    thin, thick = int(rng.integers(1, 3)), int(rng.integers(3, 6))
+    for k in range(n + 1):
+        pos = min(k * cell, side - 1)
+        cv2.line(board, (0, pos), (side, pos), ink, thick if k % br == 0 else thin)
+        cv2.line(board, (pos, 0), (pos, side), ink, thick if k % bc == 0 else thin)
+    # زوايا الشبكة المكتشفة ليست دقيقة تماماً: إزاحة عشوائية لكل زاوية
+    corners = np.float32([[0, 0], [side, 0], [side, side], [0, side]])
+    jitter = rng.normal(0, side * 0.006, (4, 2)).astype(np.float32)
+    M = cv2.getPerspectiveTransform(corners, corners + jitter)
+    board = cv2.warpPerspective(board, M, (side, side), borderMode=cv2.BORDER_REPLICATE)
+    # تمويه وضوضاء وضغط JPEG
+    if rng.random() < 0.7:
+        board = cv2.GaussianBlur(board, (3, 3), rng.uniform(0.3, 1.3))
+    noise = rng.normal(0, rng.uniform(0, 12), board.shape)
+    board = np.clip(board + noise, 0, 255).astype(np.uint8)
+    if rng.random() < 0.5:
+        quality = int(rng.integers(30, 95))
+        board = cv2.imdecode(cv2.imencode('.jpg', board, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], 0)
+    return board
+
+def synth_cells(count, fonts, seed=0, empty=0.15, use_tta=True, n=9, method=None):
+    """
+    (صور كل خلية أو None، الرقم الصحيح لكل خلية) من لوحات اصطناعية كاملة (خط واحد لكل لوحة)
+    تمرّ بنفس مرحلة التطبيق: pipeline.collect_cell_canvases بطريقة method
+    (الافتراضي pipeline.CELL_METHOD)
+    empty: نسبة الخانات الفارغة (الصنف 0)
+    """
+    rng = np.random.default_rng(seed)
+    cells, labels = [], []
+    while len(cells) < count:
+        digits = rng.integers(1, 10, (n, n)) * (rng.random((n, n)) >= empty)
+        board = render_board(digits, fonts[int(rng.integers(len(fonts)))], rng)
+        cell_data, _ = collect_cell_canvases(board, use_tta=use_tta, method=method, n=n)
+        for i in range(n):
+            for j in range(n):
+                cells.append(cell_data.get((i, j)))
+                labels.append(int(digits[i, j]))
+    return cells[:count], np.array(labels[:count])
+
+def flatten_cells(cells, labels):
+    """
+    (صور 28×28 uint8 (N, 28, 28)، تسمياتها (N,)): كل صور كل خلية (multi-threshold و TTA)؛
+    الخلايا التي لا يجد فيها التجهيز أي رقم لا تصل للنموذج فتُهمل، وما ينجو من الفارغة يُسمّى 0
+    """
+    images = [c for canvases in cells if canvases for c in canvases]
+    if not images:
+        return np.zeros((0, 28, 28), np.uint8), np.zeros(0, np.int64)
+    counts = [len(canvases) if canvases else 0 for canvases in cells]
+    return np.stack(images), np.repeat(labels, counts)
+
+# ==========================================
+# 2. الطالب والتقطير
+# ==========================================
+def to_batch(images):
+    """نفس تطبيع pipeline.predict_cell_canvases"""
+    return images.reshape(-1, 28, 28, 1).astype('float32') / 255.0
+
+def build_student(filters=(8, 16), dense=32):
+    """
+    CNN صغير بنفس دخل ومخرج model.h5 (الطبقة الأخيرة 'logits' قبل softmax منفصلة
+    لتدريب مخرج درجة الحرارة)
+    """
+    import tensorflow as tf
+    layers = tf.keras.layers
+    model = tf.keras.Sequential([tf.keras.Input((28, 28, 1))])
+    for f in filters:
+        model.add(layers.Conv2D(f, 3, activation='relu'))
+        model.add(layers.MaxPooling2D())
+    model.add(layers.Flatten())
+    if dense:
+        model.add(layers.Dense(dense, activation='relu'))
+    model.add(layers.Dense(10, name='logits'))
+    model.add(layers.Softmax())
+    return model
+
+def soft_targets(teacher_probs, labels, temperature):
+    """
+    توزيع المعلّم بدرجة حرارة T: ‎softmax(z / T) = p^(1/T) / Σ‎ دون الحاجة لـ logits المعلّم؛
+    العينات التي يخطئ فيها المعلّم تأخذ التسمية الصحيحة (one-hot)
+    """
+    p = np.power(np.clip(teacher_probs, 1e-12, 1.0), 1.0 / temperature)
+    p /= p.sum(axis=1, keepdims=True)
+    wrong = teacher_probs.argmax(axis=1) != labels
+    p[wrong] = np.eye(10, dtype=p.dtype)[labels[wrong]]
+    return p
+
+def distill(student, teacher, images, labels, temperature=4.0, alpha=0.3,
+            epochs=8, batch_size=128, seed=0):
+    """
+    تدريب الطالب على: alpha × CE(التسمية) + (1 - alpha) × T² × CE(هدف المعلّم، softmax(z / T))
+    يعيد (سجل التدريب، نسبة أخطاء المعلّم في البيانات)
+    """
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(seed)
+    x = to_batch(images)
+    teacher_probs = np.asarray(teacher.predict(x, batch_size=1024, verbose=0))
+    targets = soft_targets(teacher_probs, labels, temperature)
+    # نموذج تدريب فقط: مخرجان من نفس logits (العادي والمليّن)، والطالب يُحفظ وحده
+    logits = student.get_layer('logits').output
+    soft = tf.keras.layers.Softmax(name='soft')(tf.keras.layers.Rescaling(1.0 / temperature)(logits))
+    trainer = tf.keras.Model(student.inputs, [student.outputs[0], soft])
+    trainer.compile(
+        optimizer=tf.keras.optimizers.Adam(2e-3),
+        loss=['sparse_categorical_crossentropy', 'categorical_crossentropy'],
+        loss_weights=[alpha, (1 - alpha) * temperature ** 2],
+    )
+    history = trainer.fit(
+        x, [labels, targets], epochs=epochs, batch_size=batch_size,
+        shuffle=True, verbose=2,
+    )
+    return history.history, float((teacher_probs.argmax(axis=1) != labels).mean())
+
+# ==========================================
+# 3. القياس
+# ==========================================
+def accuracy(model, cells, labels):
+    """
+    (دقة الصور المفردة، دقة الخلايا بقرار التطبيق نفسه: متوسط صور الخلية في
+    pipeline.predict_cell_canvases مع عتبة الثقة)
+    """
+    images, image_labels = flatten_cells(cells, labels)
+    if not len(images):
+        return float('nan'), float('nan')
+    probs = np.asarray(model.predict(to_batch(images), batch_size=1024, verbose=0))
+    # كل خلية شبكة 1×1 مستقلة
+    grids = [{(0, 0): canvases} if canvases else {} for canvases in cells]
+    boards, _ = predict_cell_canvases(grids, model, n=1)
+    predicted = np.array([int(b[0, 0]) for b in boards])
+    return float((probs.argmax(axis=1) == image_labels).mean()), float((predicted == labels).mean())
+
+def batch_latency(model, sizes=(27, 81, 270), repeats=30):
+    """الوسيط بالميلي ثانية لـ predict_on_batch (نفس استدعاء BatchingPredictor) لكل حجم دفعة"""
+    out = {}
+    for n in sizes:
+        x = np.random.default_rng(0).random((n, 28, 28, 1), dtype=np.float32)
+        model.predict_on_batch(x)
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            model.predict_on_batch(x)
+            times.append(time.perf_counter() - t0)
+        out[n] = float(np.median(times) * 1000)
+    return out
+
+def report(models, test_sets, sizes=(27, 81, 270)):
+    """{اسم النموذج: {params، الدقة لكل مجموعة اختبار، زمن كل حجم دفعة}}"""
+    return {
+        name: {
+            'params': int(model.count_params()),
+            'accuracy': {
+                k: dict(zip(('image', 'cell'), accuracy(model, *data)))
+                for k, data in test_sets.items()
+            },
+            'batch_ms': batch_latency(model, sizes),
+        }
+        for name, model in models.items()
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="تقطير model.h5 إلى نموذج صغير للأرقام المطبوعة")
+    parser.add_argument('--teacher', default=None, help='الافتراضي SUDOKU_MODEL_PATH أو model.h5')
+    parser.add_argument('--out', default='model_small.h5')
+    parser.add_argument('--cells', type=int, default=12000, help='عدد خلايا التدريب الاصطناعية')
+    parser.add_argument('--test-cells', type=int, default=600)
+    parser.add_argument('--holdout', default='Serif',
+                        help='خطوط TTF التي يحتوي اسمها هذا النص تُستبعد من التدريب وتُقاس وحدها')
+    parser.add_argument('--filters', default='8,16')
+    parser.add_argument('--dense', type=int, default=32)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.3)
+    parser.add_argument('--epochs', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from inference_server import load_model
+    teacher = load_model(args.teacher)
+    if teacher is None:
+        raise SystemExit("لا يوجد نموذج معلّم (model.h5 أو SUDOKU_MODEL_PATH)")
+
+    ttf = find_ttf_fonts()
+    held = [p for p in ttf if args.holdout and args.holdout in os.path.basename(p)]
+    fonts = HERSHEY_FONTS + [p for p in ttf if p not in held]
+    print(f"{len(HERSHEY_FONTS)} خط Hershey، {len(ttf) - len(held)} خط TTF للتدريب، {len(held)} للاختبار فقط")
+
+    start = time.perf_counter()
+    images, labels = flatten_cells(*synth_cells(args.cells, fonts, seed=args.seed))
+    test_sets = {
+        'synthetic': synth_cells(args.test_cells, fonts, seed=args.seed + 1),
+        # نفس الخلايا بدون TTA (multi-threshold فقط)
+        'synthetic_no_tta': synth_cells(args.test_cells, fonts, seed=args.seed + 1, use_tta=False),
+    }
+    if held:
+        test_sets['held_out_fonts'] = synth_cells(args.test_cells, held, seed=args.seed + 2)
+    print(f"{len(images)} صورة تدريب من {args.cells} خلية في {time.perf_counter() - start:.1f} ثانية")
+
+    student = build_student(tuple(int(f) for f in args.filters.split(',')), args.dense)
+    _, teacher_errors = distill(
+        student, teacher, images, labels, args.temperature, args.alpha, args.epochs, seed=args.seed
+    )
+    student.compile(loss='sparse_categorical_crossentropy')
+    student.save(args.out)
+
+    metrics = report({'teacher': teacher, 'student': student}, test_sets)
+    metrics['training'] = {
+        'cells': args.cells, 'images': int(len(images)), 'fonts': len(fonts),
+        'held_out_fonts': [os.path.basename(p) for p in held],
+        'temperature': args.temperature, 'alpha': args.alpha, 'epochs': args.epochs,
+        'teacher_error_rate': teacher_errors,
+    }
+    with open(os.path.splitext(args.out)[0] + '.json', 'w') as f:
+        json.dump(metrics, f, indent=2, ensure_ascii=False)
+
+    columns = [f'{k}:{kind}' for k in test_sets for kind in ('image', 'cell')]
+    sizes = list(metrics['student']['batch_ms'])
+    print(f"{'model':8s} {'params':>8s} " + ' '.join(f'{c:>21s}' for c in columns)
+          + ' ' + ' '.join(f"{f'ms@{n}':>8s}" for n in sizes))
+    for name in ('teacher', 'student'):
+        m = metrics[name]
+        acc = [m['accuracy'][k][kind] for k in test_sets for kind in ('image', 'cell')]
+        print(f"{name:8s} {m['params']:8d} " + ' '.join(f'{a:21.4f}' for a in acc)
+              + ' ' + ' '.join(f"{m['batch_ms'][n]:8.2f}" for n in sizes))
+    print(f"-> {args.out}")
@@ -0,0 +1,204 @@
+"""
+مولّد ألغاز بحل وحيد مبني على محرك الحل (بدون أي اعتماد على Streamlit)
+- لوحة كاملة عشوائية ثم حذف الأرقام واحداً تلو الآخر مع الحفاظ على تفرّد الحل
+- نطاق بنيوي مستهدف (BANDS: عدد الأرقام والحاجة للبحث)، منفصل عن مستوى الصعوبة المقاس
+- التوليد موزّع على عدة عمليات، وكل لغز مرتبط ببذرته (قابل للإعادة)
+- كل سجل يحمل درجة الصعوبة المقاسة ومستواها (score / level) للفرز والتصفية
+- المخرجات ملف JSONL أو ‎.npz‎ مضغوط يصلح كمدخل لاختبارات الأداء (benchmarks.bench_corpus)
+
+التشغيل المباشر:
+    python -m generator --count 5000 --size 9 --band singles --out corpus.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from solver import box_shape, count_solutions, solve_bitset, solve_singles
+
+# النطاقات البنيوية (شروط التوليد، وليست مستويات solver.DIFFICULTY_LEVELS: المستوى المقاس
+# في حقل level من كل سجل هو ما يُفرز ويُصفّى به):
+# - dense: يُحل بالانتشار وحده ويتوقف الحذف عند نسبة الأرقام المعطاة min_clues
+# - singles: يُحل بالانتشار وحده بأقل عدد ممكن من الأرقام
+# - search: لغز أدنى (حذف أي رقم يكسر تفرّد الحل) لا يُحل دون بحث
+# - minimal: لغز أدنى بلا شرط
+BANDS = {
+    'dense': {'singles': True, 'min_clues': 0.45},
+    'singles': {'singles': True, 'min_clues': 0.0},
+    'search': {'singles': False, 'min_clues': 0.0},
+    'minimal': {'singles': None, 'min_clues': 0.0},
+}
+
+# محاولات لكل لغز قبل التخلي (search يرفض الألغاز التي يحلها الانتشار)
+MAX_ATTEMPTS = 50
+
+_SYMBOLS = '0123456789ABCDEFGHIJKLMNOP'
+
+# ==========================================
+# 1. الترميز
+# ==========================================
+def board_to_string(board):
+    """لوحة n×n -> نص بحرف لكل خلية (0 فارغة، 1..9 ثم A.. للقيم 10..25)"""
+    return ''.join(_SYMBOLS[v] for v in np.asarray(board).reshape(-1))
+
+def board_from_string(text):
+    n = int(round(len(text) ** 0.5))
+    return np.array([_SYMBOLS.index(ch) for ch in text.upper()], dtype=np.uint8).reshape(n, n)
+
+# ==========================================
+# 2. التوليد
+# ==========================================
+def random_grid(n, rng):
+    """
+    لوحة كاملة عشوائية: صف أول عشوائي يُكمَل بالحل، ثم إعادة ترقيم
+    وتبديل الصفوف داخل النطاقات والنطاقات نفسها (ونفس الشيء للأعمدة)
+    """
+    br, bc = box_shape(n)
+    grid = np.zeros((n, n), dtype=int)
+    grid[0] = rng.permutation(n) + 1
+    solve_bitset(grid)
+    relabel = np.concatenate([[0], rng.permutation(n) + 1])
+    rows = np.concatenate([band * br + rng.permutation(br) for band in rng.permutation(n // br)])
+    cols = np.concatenate([stack * bc + rng.permutation(bc) for stack in rng.permutation(n // bc)])
+    grid = relabel[grid][rows][:, cols]
+    if br == bc and rng.random() < 0.5:
+        grid = grid.T
+    return grid
+
+def dig(solution, rng, band='singles'):
+    """حذف الأرقام بترتيب عشوائي مع إبقاء حل وحيد وشرط النطاق، يعيد اللغز"""
+    rules = BANDS[band]
+    n = len(solution)
+    puzzle = solution.copy()
+    min_clues = int(rules['min_clues'] * n * n)
+    clues = n * n
+    for cell in rng.permutation(n * n):
+        if clues <= min_clues:
+            break
+        r, c = divmod(int(cell), n)
+        value = puzzle[r, c]
+        puzzle[r, c] = 0
+        if rules['singles']:
+            # الانتشار وحده يحسم كل الخلايا: الحل وحيد حتماً
+            keep = solve_singles(puzzle)[1]
+        else:
+            keep = count_solutions(puzzle, 2) == 1
+        if keep:
+            clues -= 1
+        else:
+            puzzle[r, c] = value
+    return puzzle
+
+def generate_puzzle(n=9, band='singles', seed=0):
+    """لغز واحد بحل وحيد في النطاق band من البذرة seed، يعيد سجلاً أو None"""
+    rng = np.random.default_rng(seed)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        solution = random_grid(n, rng)
+        puzzle = dig(solution, rng, band)
+        if BANDS[band]['singles'] is False and solve_singles(puzzle)[1]:
+            continue
+        stats = {}
+        solve_bitset(puzzle.copy(), stats=stats)
+        return {
+            'puzzle': board_to_string(puzzle),
+            'solution': board_to_string(solution),
+            'size': n,
+            'clues': int(np.count_nonzero(puzzle)),
+            'band': band,
+            'seed': int(seed),
+            'attempts': attempt,
+            # درجة الصعوبة المقاسة من الحل نفسه (solver.difficulty)
+            'score': stats['score'],
+            'level': stats['level'],
+        }
+    return None
+
+def _generate_job(args):
+    return generate_puzzle(*args)
+
+def generate_corpus(count, n=9, band='singles', workers=None, seed=0):
+    """
+    توليد count لغزاً على عدة عمليات (الافتراضي عدد الأنوية)، بالترتيب الذي تنتهي به
+    البذور seed, seed+1, ... فالمجموعة نفسها قابلة للإعادة
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = [(n, band, seed + k) for k in range(count)]
+    if workers == 1:
+        results = map(_generate_job, jobs)
+        for record in results:
+            if record is not None:
+                yield record
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for record in pool.imap_unordered(_generate_job, jobs, chunksize=16):
+            if record is not None:
+                yield record
+
+# ==========================================
+# 3. ملف المجموعة
+# ==========================================
+def write_corpus(path, records, n=9):
+    """JSONL (سجل لكل سطر) أو ‎.npz‎ (مصفوفات uint8)، يعيد عدد السجلات
+    n: حجم اللوحات لمصفوفات ‎.npz‎ الفارغة (حين لا ينجح أي لغز)"""
+    if path.endswith('.npz'):
+        records = list(records)
+        empty = np.zeros((0, n, n), dtype=np.uint8)
+        np.savez_compressed(
+            path,
+            puzzles=np.stack([board_from_string(r['puzzle']) for r in records]) if records else empty,
+            solutions=np.stack([board_from_string(r['solution']) for r in records]) if records else empty,
+            seeds=np.array([r['seed'] for r in records], dtype=np.int64),
+            bands=np.array([r['band'] for r in records], dtype=str),
+            scores=np.array([r['score'] for r in records], dtype=np.float64),
+        )
+        return len(records)
+    written = 0
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+            written += 1
+    return written
+
+def read_corpus(path):
+    """(الألغاز (N, n, n)، الحلول (N, n, n)) من ملف JSONL أو ‎.npz‎"""
+    if path.endswith('.npz'):
+        data = np.load(path)
+        return data['puzzles'], data['solutions']
+    puzzles, solutions = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                puzzles.append(board_from_string(record['puzzle']))
+                solutions.append(board_from_string(record['solution']))
+    if not puzzles:
+        return np.zeros((0, 0, 0), dtype=np.uint8), np.zeros((0, 0, 0), dtype=np.uint8)
+    return np.stack(puzzles), np.stack(solutions)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="توليد مجموعة ألغاز سودوكو بحل وحيد")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=9)
+    parser.add_argument('--band', choices=list(BANDS), default='singles')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='corpus.jsonl', help='‎.jsonl‎ أو ‎.npz‎')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = write_corpus(
+        args.out,
+        generate_corpus(args.count, args.size, args.band, args.workers, args.seed),
+        n=args.size
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{written} لغز في {elapsed:.1f} ثانية ({written / elapsed * 60:.0f} لغز/دقيقة) -> {args.out}")
+    if written < args.count:
+        # بذور لم تُنتج لغزاً في النطاق خلال MAX_ATTEMPTS محاولة (مثل search على 4×4)
+        print(f"تعذّر توليد {args.count - written} من {args.count} لغزاً في النطاق {args.band} "
+              f"({args.size}×{args.size}) بعد {MAX_ATTEMPTS} محاولة لكل لغز", file=sys.stderr)
@@ -0,0 +1,228 @@
+"""
+محرك التلميحات: خطوات منطقية كما يحلها الإنسان (بدون أي اعتماد على Streamlit)
+- التقنيات تُجرّب بترتيب كلفتها (TECHNIQUES) وتُطبّق أول خطوة ممكنة فقط
+- solve_steps مولّد (generator): طلب تلميح واحد = next() = عمل خطوة واحدة فقط
+- كل خطوة قاموس: التقنية، الأرقام المثبتة، المرشحات المحذوفة، والخلايا المعنية
+- عند عدم وجود تقنية مناسبة: خطوة 'reveal' تكشف خلية واحدة من الحل
+  (حل جاهز من المستدعي إن وُجد، وإلا solve_fast بمهلة time_budget)
+"""
+import numpy as np
+
+from solver import solve_fast, unit_tables
+
+# التقنية -> (الاسم المعروض، الصعوبة التقريبية على مقياس Sudoku Explainer) بترتيب التجربة
+TECHNIQUES = {
+    'hidden_single': ("رقم وحيد مخفي", 1.2),
+    'naked_single': ("رقم وحيد ظاهر", 2.3),
+    'pointing': ("مؤشر المربع", 2.6),
+    'box_line': ("حصر صف/عمود في مربع", 2.8),
+    'naked_pair': ("زوج ظاهر", 3.0),
+    'x_wing': ("X-Wing", 3.2),
+    'hidden_pair': ("زوج مخفي", 3.4),
+    'reveal': ("كشف خلية من الحل", 10.0),
+}
+
+def _bits(mask):
+    """أرقام قناع البتات (البت d-1 للرقم d)"""
+    digits = []
+    while mask:
+        low = mask & -mask
+        digits.append(low.bit_length())
+        mask ^= low
+    return digits
+
+class _Grid:
+    """حالة الحل المنطقي: القيم ومرشحات الخلايا الفارغة كأقنعة بتات"""
+
+    def __init__(self, board):
+        board = np.asarray(board)
+        self.n = len(board)
+        self.shape = board.shape
+        self.units, self.peers, self.cell_units = unit_tables(self.n)
+        self.values = board.reshape(-1).astype(int).tolist()
+        full = (1 << self.n) - 1
+        self.cands = [0] * (self.n * self.n)
+        for cell, v in enumerate(self.values):
+            if not v:
+                used = 0
+                for p in self.peers[cell]:
+                    if self.values[p]:
+                        used |= 1 << (self.values[p] - 1)
+                self.cands[cell] = full & ~used
+
+    def rc(self, cell):
+        return divmod(cell, self.n)
+
+    def place(self, cell, v):
+        self.values[cell] = v
+        self.cands[cell] = 0
+        bit = ~(1 << (v - 1))
+        for p in self.peers[cell]:
+            self.cands[p] &= bit
+
+    def apply(self, step):
+        for r, c, v in step['placements']:
+            self.place(r * self.n + c, v)
+        for r, c, v in step['eliminations']:
+            self.cands[r * self.n + c] &= ~(1 << (v - 1))
+
+    def step(self, technique, placements=(), eliminations=(), cells=(), digits=()):
+        return {
+            'technique': technique,
+            'name': TECHNIQUES[technique][0],
+            'placements': [self.rc(cell) + (v,) for cell, v in placements],
+            'eliminations': sorted(set(self.rc(cell) + (v,) for cell, v in eliminations)),
+            'cells': [self.rc(cell) for cell in cells],
+            'digits': list(digits),
+        }
+
+    def unit_positions(self, unit, bit):
+        return [cell for cell in unit if self.cands[cell] & bit]
+
+# ==========================================
+# 1. التقنيات (كل دالة تعيد أول خطوة تجدها أو None)
+# ==========================================
+def hidden_single(g):
+    for unit in g.units:
+        for d in range(1, g.n + 1):
+            cells = g.unit_positions(unit, 1 << (d - 1))
+            if len(cells) == 1:
+                return g.step('hidden_single', [(cells[0], d)], cells=unit, digits=[d])
+    return None
+
+def naked_single(g):
+    for cell, m in enumerate(g.cands):
+        if m and not m & (m - 1):
+            return g.step('naked_single', [(cell, m.bit_length())], cells=[cell])
+    return None
+
+def pointing(g):
+    """رقم مرشحاته في مربع كلها على صف (أو عمود) واحد: يُحذف من باقي الصف خارج المربع"""
+    n = g.n
+    for box in g.units[2 * n:]:
+        for d in range(1, n + 1):
+            bit = 1 << (d - 1)
+            cells = g.unit_positions(box, bit)
+            if len(cells) < 2:
+                continue
+            for axis, offset in ((0, 0), (1, n)):
+                lines = {g.rc(cell)[axis] for cell in cells}
+                if len(lines) == 1:
+                    line = g.units[offset + lines.pop()]
+                    out = [(cell, d) for cell in line if cell not in box and g.cands[cell] & bit]
+                    if out:
+                        return g.step('pointing', eliminations=out, cells=cells, digits=[d])
+    return None
+
+def box_line(g):
+    """رقم مرشحاته في صف (أو عمود) كلها داخل مربع واحد: يُحذف من باقي المربع"""
+    n = g.n
+    for line in g.units[:2 * n]:
+        for d in range(1, n + 1):
+            bit = 1 << (d - 1)
+            cells = g.unit_positions(line, bit)
+            if len(cells) < 2:
+                continue
+            boxes = {g.cell_units[cell][2] for cell in cells}
+            if len(boxes) == 1:
+                box = g.units[boxes.pop()]
+                out = [(cell, d) for cell in box if cell not in line and g.cands[cell] & bit]
+                if out:
+                    return g.step('box_line', eliminations=out, cells=cells, digits=[d])
+    return None
+
+def naked_pair(g):
+    for unit in g.units:
+        pairs = {}
+        for cell in unit:
+            m = g.cands[cell]
+            if m and bin(m).count('1') == 2:
+                pairs.setdefault(m, []).append(cell)
+        for m, cells in pairs.items():
+            if len(cells) != 2:
+                continue
+            out = [
+                (cell, d) for cell in unit if cell not in cells
+                for d in _bits(g.cands[cell] & m)
+            ]
+            if out:
+                return g.step('naked_pair', eliminations=out, cells=cells, digits=_bits(m))
+    return None
+
+def hidden_pair(g):
+    for unit in g.units:
+        where = {}
+        for d in range(1, g.n + 1):
+            cells = g.unit_positions(unit, 1 << (d - 1))
+            if len(cells) == 2:
+                where.setdefault(tuple(cells), []).append(d)
+        for cells, digits in where.items():
+            if len(digits) != 2:
+                continue
+            keep = (1 << (digits[0] - 1)) | (1 << (digits[1] - 1))
+            out = [(cell, d) for cell in cells for d in _bits(g.cands[cell] & ~keep)]
+            if out:
+                return g.step('hidden_pair', eliminations=out, cells=list(cells), digits=digits)
+    return None
+
+def x_wing(g):
+    """رقم في صفين يقع فقط في نفس العمودين: يُحذف من العمودين في باقي الصفوف (وبالعكس)"""
+    n = g.n
+    for base, cover in ((0, n), (n, 0)):
+        for d in range(1, n + 1):
+            bit = 1 << (d - 1)
+            seen = {}
+            for k in range(n):
+                cells = g.unit_positions(g.units[base + k], bit)
+                if len(cells) != 2:
+                    continue
+                # موضع الخلية في الاتجاه الآخر (العمود لخطوط الصفوف والعكس)
+                key = tuple(g.rc(cell)[0 if base else 1] for cell in cells)
+                if key in seen:
+                    corners = seen[key] + cells
+                    out = [
+                        (cell, d) for line in key for cell in g.units[cover + line]
+                        if cell not in corners and g.cands[cell] & bit
+                    ]
+                    if out:
+                        return g.step('x_wing', eliminations=out, cells=corners, digits=[d])
+                else:
+                    seen[key] = cells
+    return None
+
+_TECHNIQUE_FUNCS = [hidden_single, naked_single, pointing, box_line, naked_pair, x_wing, hidden_pair]
+
+# ==========================================
+# 2. المولّد
+# ==========================================
+def solve_steps(board, solution=None, time_budget=None):
+    """
+    خطوات الحل المنطقي واحدة تلو الأخرى حتى اكتمال اللوحة (board لا تُعدَّل)
+    كل next() يجرّب التقنيات بالترتيب ويطبّق أول خطوة فقط
+    solution: حل كامل للوحة معروف مسبقاً تُكشف منه خطوات 'reveal' دون أي بحث
+    time_budget: مهلة البحث عن الحل عند أول 'reveal' بدونه (SolveTimeout عند تجاوزها)
+    """
+    g = _Grid(board)
+    if solution is not None:
+        solution = np.asarray(solution).reshape(-1)
+    while 0 in g.values:
+        for technique in _TECHNIQUE_FUNCS:
+            step = technique(g)
+            if step is not None:
+                break
+        else:
+            # لا تقنية مناسبة: كشف الخلية الأقل مرشحات من الحل الكامل (يُحسب مرة واحدة)
+            if solution is None:
+                solution = np.array(g.values).reshape(g.shape)
+                if not solve_fast(solution, time_budget=time_budget)[0]:
+                    return
+                solution = solution.reshape(-1)
+            empty = [cell for cell, v in enumerate(g.values) if not v]
+            cell = min(empty, key=lambda k: bin(g.cands[k]).count('1'))
+            step = g.step('reveal', [(cell, int(solution[cell]))], cells=[cell])
+        g.apply(step)
+        yield step
+
+def next_hint(board):
+    """أول خطوة للوحة، أو None إذا كانت كاملة أو بلا حل"""
+    return next(solve_steps(board), None)
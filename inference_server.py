@@ -0,0 +1,110 @@
+"""
+خدمة تنبؤ محلية مشتركة بين الجلسات مع تجميع ديناميكي للدفعات (micro-batching)
+- كل جلسة تضع دفعتها في طابور وتنتظر نتيجتها
+- خيط واحد يجمع الطلبات المتزامنة لبضعة ميلي ثوانٍ ثم يشغّل model.predict مرة واحدة
+- النتائج تُقسَّم وتُعاد لكل طالب بنفس الترتيب
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+def load_model(path=None):
+    """تحميل نموذج الأرقام (المسار من SUDOKU_MODEL_PATH، افتراضياً model.h5)، أو None إذا تعذّر"""
+    import tensorflow as tf
+    try:
+        return tf.keras.models.load_model(path or os.environ.get('SUDOKU_MODEL_PATH', 'model.h5'))
+    except Exception:
+        return None
+
+
+class BatchingPredictor:
+    """بديل متوافق مع model.predict يجمع طلبات الجلسات في دفعات مشتركة"""
+
+    def __init__(self, model, max_wait_ms=5.0, max_batch=4096):
+        self.model = model
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._images = 0
+        self._thread = threading.Thread(
+            target=self._loop,
+            name="sudoku-inference",
+            daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, model):
+        return cls(
+            model,
+            max_wait_ms=float(os.environ.get('SUDOKU_BATCH_WAIT_MS', 5)),
+            max_batch=int(os.environ.get('SUDOKU_MAX_BATCH', 4096)),
+        )
+
+    def predict(self, batch, verbose=0):
+        """نفس واجهة model.predict: يحجب حتى تجهز نتيجة هذه الدفعة"""
+        if len(batch) == 0:
+            return np.zeros((0,) + self.model.output_shape[1:], dtype=np.float32)
+        fut = Future()
+        self._queue.put((batch, fut))
+        return fut.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'batches': self._batches,
+                'images': self._images,
+                'avg_requests_per_batch': self._requests / max(self._batches, 1),
+            }
+
+    # ────── حلقة الخادم ──────
+    def _collect(self):
+        """انتظار أول طلب ثم تجميع ما يصل خلال max_wait"""
+        items = [self._queue.get()]
+        size = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            try:
+                if len(items) == 1:
+                    batch = items[0][0]
+                else:
+                    batch = np.concatenate([b for b, _ in items])
+                # predict_on_batch: بلا كلفة إعداد predict الثابتة (~50 ms) فيتناسب الزمن مع حجم الدفعة
+                predictions = np.asarray(self.model.predict_on_batch(batch))
+            except Exception as e:
+                for _, fut in items:
+                    fut.set_exception(e)
+                continue
+
+            offset = 0
+            for b, fut in items:
+                fut.set_result(predictions[offset:offset + len(b)])
+                offset += len(b)
+
+            with self._lock:
+                self._requests += len(items)
+                self._batches += 1
+                self._images += len(batch)
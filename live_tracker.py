@@ -0,0 +1,260 @@
+"""
+وضع الكاميرا المباشر: تتبّع الشبكة بين الإطارات بدل إعادة اكتشافها
+- الاكتشاف الكامل (find_board_robust) فقط عند البداية أو عند انحراف التتبع
+- تتبّع نقاط داخل الشبكة بـ Lucas-Kanade ثم homography تنقل الأركان الأربعة
+- التعرف على الأرقام والحل فقط عندما تستقر الشبكة، في خيط خلفي
+- النتائج محفوظة لكل هوية شبكة فلا يُعاد التصنيف لنفس اللغز
+(بدون أي اعتماد على Streamlit)
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from pipeline import (
+    PipelineContext,
+    find_board_robust,
+    order_points,
+    warp_image,
+    solution_layer,
+    paste_warped,
+)
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+)
+
+class GridTracker:
+    """
+    حالة وضع الكاميرا المباشر لجلسة واحدة
+    recognise(warped) -> (board, solved_board أو None) تُستدعى في خيط خلفي
+    """
+
+    def __init__(self, recognise, detect_width=640, detect_interval=3,
+                 stable_frames=5, stable_px=3.0, min_points=12, cache_size=8,
+                 retry_frames=30):
+        self.recognise = recognise
+        self.detect_width = detect_width
+        self.detect_interval = detect_interval
+        self.stable_frames = stable_frames
+        self.stable_px = stable_px
+        self.min_points = min_points
+        self.cache_size = cache_size
+        # لوحة لم تُحل (غالباً قراءة خاطئة) يُعاد تصنيفها بعد هذا العدد من الإطارات
+        self.retry_frames = retry_frames
+
+        self.corners = None
+        self.identity = None
+        # آخر أركان معروفة قبل فقدان التتبع (لمطابقة الهوية عند إعادة الاكتشاف)
+        self._last_corners = None
+        self.stable_count = 0
+        self._prev_gray = None
+        self._points = None
+        self._since_detect = detect_interval
+        self._ids = itertools.count(1)
+
+        self._lock = threading.Lock()
+        # هوية الشبكة -> {'board', 'solved', 'sprite', 'mask', 'retry_at'} بترتيب الاستخدام
+        self._results = OrderedDict()
+        self._pending = None
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sudoku-live")
+        self.counters = {'frames': 0, 'detections': 0, 'tracked': 0, 'lost': 0, 'recognitions': 0}
+
+    @classmethod
+    def from_env(cls, recognise):
+        return cls(
+            recognise,
+            detect_width=int(os.environ.get('SUDOKU_LIVE_DETECT_WIDTH', 640)),
+            stable_frames=int(os.environ.get('SUDOKU_LIVE_STABLE_FRAMES', 5)),
+            stable_px=float(os.environ.get('SUDOKU_LIVE_STABLE_PX', 3.0)),
+        )
+
+    # ────── الواجهة ──────
+    def process(self, frame):
+        """معالجة إطار BGR واحد، يعيد الإطار مع الشبكة أو الحل مرسوماً عليه"""
+        self.counters['frames'] += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        previous = self.corners
+
+        if self.corners is not None and not self._track(gray):
+            self.counters['lost'] += 1
+            self._reset_track()
+            # إعادة الاكتشاف فوراً في نفس الإطار
+            self._since_detect = self.detect_interval
+        if self.corners is None:
+            self._since_detect += 1
+            if self._since_detect >= self.detect_interval:
+                self._since_detect = 0
+                self._detect(frame, gray)
+
+        self._prev_gray = gray
+        self._update_stability(previous)
+        self._maybe_recognise(frame)
+        return self._draw(frame)
+
+    def result(self):
+        """نتيجة الشبكة المتتبعة حالياً (أو None)"""
+        with self._lock:
+            return self._results.get(self.identity)
+
+    def close(self):
+        """إيقاف خيط التعرف (الإطارات بعدها تُتتبّع فقط دون تعرف)"""
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ────── الاكتشاف والتتبع ──────
+    def _detect(self, frame, gray):
+        scale = min(1.0, self.detect_width / float(frame.shape[1]))
+        small = gray if scale == 1.0 else cv2.resize(
+            gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        pts, _ = find_board_robust(PipelineContext(gray=small))
+        self.counters['detections'] += 1
+        if pts is None:
+            return False
+        corners = order_points(pts) / scale
+        # إعادة اكتشاف نفس الشبكة بعد انحراف التتبع تحتفظ بهويتها ونتيجتها
+        last = self._last_corners
+        if self.identity is None or last is None or not self._same_grid(last, corners):
+            self.identity = next(self._ids)
+        self.corners = corners
+        self._seed_points(gray)
+        return True
+
+    def _seed_points(self, gray):
+        mask = np.zeros_like(gray)
+        cv2.fillConvexPoly(mask, self.corners.astype(np.int32), 255)
+        self._points = cv2.goodFeaturesToTrack(
+            gray, maxCorners=200, qualityLevel=0.01, minDistance=7, mask=mask
+        )
+
+    def _track(self, gray):
+        """نقل الأركان بـ optical flow، يعيد False إذا انحرف التتبع"""
+        if self._points is None or len(self._points) < self.min_points:
+            return False
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, self._points, None, **LK_PARAMS)
+        # فحص ذهاب وإياب: النقاط الموثوقة تعود إلى مكانها الأصلي
+        p0r, status_r, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev_gray, p1, None, **LK_PARAMS)
+        fb_error = np.abs(self._points - p0r).reshape(-1, 2).max(axis=1)
+        good = (status.ravel() == 1) & (status_r.ravel() == 1) & (fb_error < 1.0)
+        if good.sum() < self.min_points:
+            return False
+        H, inliers = cv2.findHomography(self._points[good], p1[good], cv2.RANSAC, 3.0)
+        if H is None or inliers.sum() < max(self.min_points, 0.5 * good.sum()):
+            return False
+
+        corners = cv2.perspectiveTransform(self.corners.reshape(-1, 1, 2), H).reshape(4, 2)
+        if not self._plausible(corners, gray.shape):
+            return False
+        self.corners = corners.astype(np.float32)
+        self._points = p1[good][inliers.ravel() == 1].reshape(-1, 1, 2)
+        if len(self._points) < 2 * self.min_points:
+            self._seed_points(gray)
+        self.counters['tracked'] += 1
+        return True
+
+    def _plausible(self, corners, shape):
+        """الشكل الرباعي محدب وبمساحة قريبة من السابقة وداخل الإطار"""
+        h, w = shape
+        if not cv2.isContourConvex(corners.astype(np.float32)):
+            return False
+        ratio = cv2.contourArea(corners.astype(np.float32)) / max(
+            cv2.contourArea(self.corners.astype(np.float32)), 1.0
+        )
+        if not 0.7 < ratio < 1.4:
+            return False
+        margin = 0.1 * max(h, w)
+        return bool(
+            (corners[:, 0] > -margin).all() and (corners[:, 0] < w + margin).all()
+            and (corners[:, 1] > -margin).all() and (corners[:, 1] < h + margin).all()
+        )
+
+    @staticmethod
+    def _same_grid(a, b, tolerance=0.15):
+        side = np.linalg.norm(a[0] - a[2]) / np.sqrt(2)
+        return np.abs(a - b).max() < tolerance * side
+
+    def _reset_track(self):
+        self._last_corners = self.corners
+        self.corners = None
+        self._points = None
+        self.stable_count = 0
+
+    def _update_stability(self, previous):
+        if self.corners is None or previous is None:
+            self.stable_count = 0
+        elif np.abs(self.corners - previous).max() < self.stable_px:
+            self.stable_count += 1
+        else:
+            self.stable_count = 0
+
+    # ────── التعرف في الخلفية ──────
+    def _maybe_recognise(self, frame):
+        if self.corners is None or self.stable_count < self.stable_frames:
+            return
+        with self._lock:
+            if self._pending is not None or self._closed:
+                return
+            entry = self._results.get(self.identity)
+            if entry is not None and (
+                entry['solved'] is not None or self.counters['frames'] < entry['retry_at']
+            ):
+                return
+            self._pending = self.identity
+        warped, _ = warp_image(frame, self.corners)
+        with self._lock:
+            # close() بين الفحص السابق وهنا: المجمّع متوقف أو سيتوقف فلا إرسال
+            if self._closed:
+                self._pending = None
+                return
+            self.counters['recognitions'] += 1
+            # الإرسال تحت القفل: close() لا يوقف المجمّع إلا بعد تحرير القفل
+            self._pool.submit(self._recognise, self.identity, warped)
+
+    def _recognise(self, identity, warped):
+        try:
+            board, solved = self.recognise(warped)
+        except Exception:
+            board, solved = None, None
+        entry = {
+            'board': board,
+            'solved': solved,
+            'sprite': None,
+            'mask': None,
+            'retry_at': self.counters['frames'] + self.retry_frames,
+        }
+        if solved is not None:
+            # طبقة الحل تُرسم مرة واحدة لكل شبكة ثم تُنقل فقط مع كل إطار
+            entry['sprite'], entry['mask'] = solution_layer(solved, board, *warped.shape[:2])
+        with self._lock:
+            self._results[identity] = entry
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+            self._pending = None
+
+    # ────── الرسم ──────
+    def _draw(self, frame):
+        if self.corners is None:
+            return frame
+        out = frame.copy()
+        entry = self.result()
+        if entry is not None and entry['sprite'] is not None:
+            size = entry['sprite'].shape[0]
+            src = np.float32([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]])
+            M = cv2.getPerspectiveTransform(src, self.corners)
+            paste_warped(out, entry['sprite'], M, entry['mask'])
+            color = (0, 200, 0)
+        elif self.stable_count >= self.stable_frames:
+            color = (0, 200, 255)
+        else:
+            color = (255, 200, 0)
+        cv2.polylines(out, [self.corners.astype(np.int32)], True, color, 2)
+        return out
@@ -0,0 +1,986 @@
+"""
+خط معالجة الصور لحلّال السودوكو (بدون أي اعتماد على Streamlit)
+- فك الصور وضبط حجمها
+- اكتشاف الشبكات وقصّها
+- تجهيز الخلايا والتنبؤ بالأرقام
+- رسم الحل على الصورة
+"""
+import functools
+import os
+
+import cv2
+import numpy as np
+import fitz  # PyMuPDF
+
+# طريقة تحديد الأرقام: 'board' (إزالة الخطوط مرة واحدة للوحة) أو 'cells' (كنتورات كل خلية)
+CELL_METHOD = os.environ.get('SUDOKU_CELL_METHOD', 'board')
+# تصحيح انحناء الشبكة قبل قص الخلايا (refine_warp): 'auto' يطبّقه فقط مع طريقة 'cells'
+# لأنها تقص الخلايا بمواضع ثابتة، بينما 'board' تسند الأرقام بمراكزها
+REFINE_WARP = os.environ.get('SUDOKU_REFINE_WARP', 'auto').lower()
+
+# ==========================================
+# 0. سياق المعالجة المشترك
+# ==========================================
+class PipelineContext:
+    """
+    سياق طلب واحد يحمل الصورة الملونة ونسخة رمادية مشتركة
+    - التحويل إلى الرمادي يتم مرة واحدة فقط عند أول استخدام
+    - المراحل تقرأ من هذه المصفوفات مباشرة (views) دون نسخ
+    """
+
+    def __init__(self, color=None, gray=None):
+        self.color = color
+        self._gray = gray
+
+    @classmethod
+    def of(cls, img):
+        """تغليف مصفوفة (ملونة أو رمادية) في سياق، أو إعادة السياق كما هو"""
+        if isinstance(img, cls):
+            return img
+        if img.ndim == 2:
+            return cls(gray=img)
+        return cls(color=img)
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+# ==========================================
+# 1. دوال معالجة الصور
+# ==========================================
+def resize_if_needed(img, max_size=1500, min_size=300):
+    """ضبط حجم الصورة تلقائياً"""
+    h, w = img.shape[:2]
+    if max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        img = cv2.resize(img, None, fx=scale, fy=scale)
+    elif max(h, w) < min_size:
+        scale = 600 / max(h, w)
+        img = cv2.resize(img, None, fx=scale, fy=scale)
+    return img
+
+# معاملات فك JPEG المصغّر (DCT scaling) من الأكبر تصغيراً إلى الأصغر
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+def jpeg_size(data):
+    """قراءة أبعاد JPEG (h, w) من الترويسة دون فك الصورة"""
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        # مقاطع SOFn تحمل الأبعاد (باستثناء DHT و JPG و DAC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h = int.from_bytes(data[i + 5:i + 7], 'big')
+            w = int.from_bytes(data[i + 7:i + 9], 'big')
+            return h, w
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+def decode_image(data, max_size=1500):
+    """فك الصورة مرة واحدة بأصغر دقة تكفي لـ max_size"""
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(data)
+    if size is not None:
+        for factor, reduced in REDUCED_DECODE_FLAGS:
+            if max(size) // factor >= max_size:
+                flag = reduced
+                break
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+
+def preprocess_image(img, clip_limit=2.0, block_size=11, c_val=2):
+    gray = PipelineContext.of(img).gray
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
+    enhanced = clahe.apply(gray)
+    blur = cv2.GaussianBlur(enhanced, (5, 5), 1)
+    return cv2.adaptiveThreshold(
+        blur,
+        255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY_INV,
+        block_size,
+        c_val
+    )
+
+def find_board(thresh_img):
+    contours, _ = cv2.findContours(
+        thresh_img,
+        cv2.RETR_EXTERNAL,
+        cv2.CHAIN_APPROX_SIMPLE
+    )
+    best = None
+    max_area = 0
+    for c in contours:
+        area = cv2.contourArea(c)
+        if area > 25000:
+            peri = cv2.arcLength(c, True)
+            approx = cv2.approxPolyDP(c, 0.02 * peri, True)
+            if len(approx) == 4 and area > max_area:
+                max_area = area
+                best = approx
+    return best
+
+def find_board_hough(img):
+    """اكتشاف الشبكة عبر خطوط Hough كخطة بديلة"""
+    try:
+        gray = PipelineContext.of(img).gray
+        edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+        lines = cv2.HoughLinesP(
+            edges,
+            1,
+            np.pi / 180,
+            threshold=100,
+            minLineLength=100,
+            maxLineGap=10
+        )
+        if lines is None:
+            return None
+        horizontal, vertical = [], []
+        for line in lines:
+            x1, y1, x2, y2 = line[0]
+            angle = np.degrees(np.arctan2(abs(y2 - y1), abs(x2 - x1)))
+            length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+            if angle < 15 and length > 80:
+                horizontal.append(line[0])
+            elif angle > 75 and length > 80:
+                vertical.append(line[0])
+        if len(horizontal) < 2 or len(vertical) < 2:
+            return None
+        h_arr = np.array(horizontal)
+        v_arr = np.array(vertical)
+        min_y = min(h_arr[:, 1].min(), h_arr[:, 3].min())
+        max_y = max(h_arr[:, 1].max(), h_arr[:, 3].max())
+        min_x = min(v_arr[:, 0].min(), v_arr[:, 2].min())
+        max_x = max(v_arr[:, 0].max(), v_arr[:, 2].max())
+        if (max_y - min_y) < 100 or (max_x - min_x) < 100:
+            return None
+        pts = np.array([
+            [[min_x, min_y]],
+            [[max_x, min_y]],
+            [[max_x, max_y]],
+            [[min_x, max_y]]
+        ], dtype=np.float32)
+        return pts
+    except:
+        return None
+
+# معاملات (clip, block, c) التي تُجرّب بالترتيب لإيجاد الشبكة
+ROBUST_PARAMS = [
+    (2.0, 11, 2),
+    (3.0, 11, 2),
+    (2.0, 15, 3),
+    (4.0, 11, 4),
+    (2.0, 7, 2),
+    (3.0, 15, 4),
+    (5.0, 11, 2),
+]
+
+def find_board_robust(img):
+    """محاولات متعددة بمعاملات مختلفة لإيجاد الشبكة"""
+    ctx = PipelineContext.of(img)
+    for clip, block, c in ROBUST_PARAMS:
+        thresh = preprocess_image(ctx, clip, block, c)
+        pts = find_board(thresh)
+        if pts is not None:
+            return pts, thresh
+    # خطة بديلة: Hough Lines
+    pts = find_board_hough(ctx)
+    if pts is not None:
+        thresh = preprocess_image(ctx)
+        return pts, thresh
+    return None, None
+
+def find_boards(thresh_img, max_boards=6, min_area=25000):
+    """إيجاد جميع الشبكات المرشحة في الصفحة مرتبة تنازلياً حسب المساحة"""
+    contours, _ = cv2.findContours(
+        thresh_img,
+        cv2.RETR_EXTERNAL,
+        cv2.CHAIN_APPROX_SIMPLE
+    )
+    candidates = []
+    for c in contours:
+        area = cv2.contourArea(c)
+        if area > min_area:
+            peri = cv2.arcLength(c, True)
+            approx = cv2.approxPolyDP(c, 0.02 * peri, True)
+            if len(approx) != 4:
+                continue
+            # شبكة السودوكو مربعة تقريباً (استبعاد أعمدة النص والصور)
+            _, _, w, h = cv2.boundingRect(approx)
+            if 0.6 < w / float(h) < 1.6:
+                candidates.append((area, approx))
+    candidates.sort(key=lambda t: t[0], reverse=True)
+    return dedupe_boards([a for _, a in candidates], max_boards)
+
+def dedupe_boards(candidates, max_boards=6, overlap=0.5):
+    """حذف المرشحات المتداخلة مع الإبقاء على الأكبر (القائمة مرتبة مسبقاً)"""
+    kept = []
+    for pts in candidates:
+        x, y, w, h = cv2.boundingRect(pts)
+        duplicate = False
+        for k in kept:
+            kx, ky, kw, kh = cv2.boundingRect(k)
+            iw = min(x + w, kx + kw) - max(x, kx)
+            ih = min(y + h, ky + kh) - max(y, ky)
+            if iw > 0 and ih > 0 and iw * ih > overlap * min(w * h, kw * kh):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(pts)
+            if len(kept) >= max_boards:
+                break
+    return kept
+
+def find_boards_robust(img, max_boards=6, min_area=25000):
+    """إيجاد كل الشبكات في الصفحة عبر جميع معاملات المعالجة مع إزالة التكرار"""
+    ctx = PipelineContext.of(img)
+    found = []
+    for clip, block, c in ROBUST_PARAMS:
+        thresh = preprocess_image(ctx, clip, block, c)
+        found = dedupe_boards(
+            sorted(
+                found + find_boards(thresh, max_boards, min_area),
+                key=cv2.contourArea,
+                reverse=True
+            ),
+            max_boards
+        )
+        if len(found) >= max_boards:
+            break
+    if not found:
+        # خطة بديلة: Hough Lines (شبكة واحدة فقط)
+        pts = find_board_hough(ctx)
+        if pts is not None:
+            found = [pts]
+    return found
+
+def order_points(pts):
+    pts = pts.reshape((4, 2)).astype(np.float32)
+    rect = np.zeros((4, 2), dtype=np.float32)
+    s = pts.sum(axis=1)
+    rect[0] = pts[np.argmin(s)]
+    rect[2] = pts[np.argmax(s)]
+    d = np.diff(pts, axis=1)
+    rect[1] = pts[np.argmin(d)]
+    rect[3] = pts[np.argmax(d)]
+    return rect
+
+# حجم الخلية في الصورة المقوّمة للوحات الكبيرة (12×12 وما فوق)
+CELL_PX = 50
+
+def grid_size(n=9):
+    """ضلع الصورة المقوّمة للوحة n×n: 450 كما كان، وخلايا بـ CELL_PX على الأقل للأكبر"""
+    return max(450, CELL_PX * n)
+
+def warp_image(img, pts, size=450):
+    src = order_points(pts)
+    dst = np.float32([
+        [0, 0],
+        [size - 1, 0],
+        [size - 1, size - 1],
+        [0, size - 1]
+    ])
+    M = cv2.getPerspectiveTransform(src, dst)
+    return cv2.warpPerspective(img, M, (size, size)), M
+
+def _line_offsets(mask, n, axis):
+    """
+    موضع كل خط من الخطوط n+1 عند n+1 نقطة على طوله (axis=0 أفقية، 1 عمودية)
+    - مركز ثقل استجابة القناع داخل نطاق حول الموضع الاسمي
+    - منحنى من الدرجة الثانية لكل خط (صفحات منحنية) يعوّض النقاط الضعيفة
+    """
+    if axis == 1:
+        mask = mask.T
+    size = mask.shape[0]
+    step = (size - 1) / n
+    band = int(step * 0.3)
+    half = int(step / 2)
+    nominal = np.arange(n + 1) * step
+    # نوافذ على طول الخط حول كل نقطة اسمية، تُجمع عبر cumsum دفعة واحدة
+    starts = np.clip(nominal.astype(int) - half, 0, size)
+    ends = np.clip(nominal.astype(int) + half + 1, 0, size)
+    positions = np.tile(nominal[:, None], (1, n + 1))
+    for k, p in enumerate(nominal):
+        lo, hi = max(int(p) - band, 0), min(int(p) + band + 1, size)
+        cumulative = np.zeros((hi - lo, size + 1))
+        np.cumsum(mask[lo:hi], axis=1, dtype=np.float64, out=cumulative[:, 1:])
+        profiles = cumulative[:, ends] - cumulative[:, starts]
+        peak = profiles.max(axis=0)
+        # الخط يجب أن يغطي معظم النافذة
+        ok = peak >= 0.5 * 255 * (ends - starts)
+        if not ok.any():
+            continue
+        weights = np.where(profiles >= 0.5 * peak, profiles, 0)
+        rows = np.arange(lo, hi)[:, None]
+        found = (rows * weights).sum(axis=0)[ok] / weights.sum(axis=0)[ok]
+        if len(found) >= 3:
+            positions[k] = np.polyval(np.polyfit(nominal[ok], found, 2), nominal)
+        else:
+            positions[k] = found.mean()
+    return positions
+
+def refine_warp(warped_img, n=9, max_shift=0.3):
+    """
+    تصحيح انحناء الشبكة بعد warp_image:
+    - اكتشاف الخطوط الأفقية والعمودية الـ n+1 في الصورة المقوّمة
+    - بناء شبكة (n+1)×(n+1) من نقاط التقاطع الفعلية
+    - remap خطي متقطع (لكل خلية) يعيد كل خط إلى موضعه الاسمي فيصبح قص الخلايا دقيقاً
+    يعيد (الصورة المصححة، نقاط الشبكة) أو الصورة كما هي إذا فشل الاكتشاف
+    """
+    ctx = PipelineContext.of(warped_img)
+    gray = ctx.gray
+    size = gray.shape[0]
+    step = (size - 1) / n
+    binary = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
+    )
+    horizontal, vertical = grid_line_masks(binary, n)
+    # ys[k, l]: ارتفاع الخط الأفقي k عند العمود l، و xs[l, k]: موضع الخط العمودي l عند الصف k
+    ys = _line_offsets(horizontal, n, axis=0)
+    xs = _line_offsets(vertical, n, axis=1)
+    mesh = np.dstack([xs.T, ys]).astype(np.float32)
+
+    nominal = np.arange(n + 1) * step
+    grid_x, grid_y = np.meshgrid(nominal, nominal)
+    shift = np.abs(mesh - np.dstack([grid_x, grid_y])).max()
+    if shift > max_shift * step or shift < 1.0:
+        # اكتشاف غير موثوق، أو الشبكة مستقيمة أصلاً فلا داعي لـ remap
+        return warped_img, None
+
+    # استيفاء ثنائي الخطية للشبكة إلى خريطة كثيفة لكل بكسل:
+    # warpAffine بمصفوفة (بكسل -> رقم الخط) يعطي استيفاءً يطابق نقاط الشبكة عند الخطوط
+    scale = np.float32([[1 / step, 0, 0], [0, 1 / step, 0]])
+    maps = cv2.warpAffine(
+        mesh, scale, (size, size),
+        flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE
+    )
+    src = ctx.color if ctx.color is not None else gray
+    refined = cv2.remap(
+        src, maps[..., 0], maps[..., 1], cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+    )
+    return refined, mesh
+
+def pixmap_to_bgr(pix):
+    """تحويل Pixmap إلى مصفوفة BGR مباشرة دون ترميز/فك PNG"""
+    rgb = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width, pix.n)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+def render_pdf_grids(data, max_boards=1, probe_dpi=72, target_px=450,
+                     max_dpi=300, fallback_dpi=200):
+    """
+    عرض صفحة PDF على مرحلتين:
+    - مسح سريع بدقة منخفضة لتحديد مواقع الشبكات
+    - عرض منطقة كل شبكة فقط بالدقة اللازمة لقصّ ~450px
+    يعيد (صورة المعاينة, قائمة صور الشبكات)
+    """
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        page = doc[0]
+        preview = pixmap_to_bgr(page.get_pixmap(dpi=probe_dpi, alpha=False))
+        # نفس الحد الفيزيائي للمساحة المعتمد سابقاً عند 200 DPI
+        min_area = 25000 * (probe_dpi / fallback_dpi) ** 2
+        found = find_boards_robust(
+            preview,
+            max_boards=max_boards,
+            min_area=min_area
+        )
+        if not found:
+            # لم تُكتشف شبكة في المسح السريع: عرض الصفحة كاملة كالسابق
+            full = page.get_pixmap(dpi=fallback_dpi, alpha=False)
+            return preview, [pixmap_to_bgr(full)]
+
+        to_pt = 72.0 / probe_dpi
+        clips = []
+        for pts in found:
+            x, y, w, h = cv2.boundingRect(pts)
+            pad = 0.05 * max(w, h)
+            rect = fitz.Rect(x - pad, y - pad, x + w + pad, y + h + pad) * to_pt
+            rect = rect & page.rect
+            # الدقة اللازمة ليصبح ضلع الشبكة ~target_px مع هامش 10% للمنظور
+            side_pt = max(w, h) * to_pt
+            dpi = int(np.clip(72.0 * target_px * 1.1 / side_pt, probe_dpi, max_dpi))
+            pix = page.get_pixmap(dpi=dpi, clip=rect, alpha=False)
+            clips.append(pixmap_to_bgr(pix))
+        return preview, clips
+    finally:
+        doc.close()
+
+# ==========================================
+# 2. استخراج الأرقام (تم التحديث لإزالة التشويش)
+# ==========================================
+def prepare_cell(cell):
+    """استخراج الرقم من الخلية وتصفيته وتجهيزه بمقاس 28×28"""
+    if cell is None or cell.size == 0:
+        return None
+        
+    # 1. إزالة التشويش النقطي الصغير باستخدام Morphological Opening
+    kernel = np.ones((2, 2), np.uint8)
+    cell = cv2.morphologyEx(cell, cv2.MORPH_OPEN, kernel)
+    
+    contours, _ = cv2.findContours(
+        cell,
+        cv2.RETR_EXTERNAL,
+        cv2.CHAIN_APPROX_SIMPLE
+    )
+    if not contours:
+        return None
+        
+    valid_contours = []
+    h_cell, w_cell = cell.shape
+    
+    # 2. فلترة الكنتورات بذكاء
+    for c in contours:
+        area = cv2.contourArea(c)
+        x, y, w, h = cv2.boundingRect(c)
+        
+        # استبعاد النقاط الصغيرة جداً (التشويش) والضخمة جداً
+        if area < 40 or area > (h_cell * w_cell * 0.8):
+            continue
+            
+        # استبعاد الكنتورات التي تلامس حواف الخلية (بقايا خطوط الشبكة)
+        if x < 2 or y < 2 or (x + w) > w_cell - 2 or (y + h) > h_cell - 2:
+            continue
+            
+        # التأكد من أن الأبعاد منطقية للرقم
+        aspect_ratio = w / float(h)
+        if 0.1 < aspect_ratio < 1.5: 
+            valid_contours.append(c)
+
+    if not valid_contours:
+        return None
+        
+    # اختيار الكنتور الأكبر مساحة من بين الصالحة
+    best_c = max(valid_contours, key=cv2.contourArea)
+    x, y, w, h = cv2.boundingRect(best_c)
+    
+    if w < 3 or h < 3:
+        return None
+        
+    digit = cell[y:y + h, x:x + w]
+    if digit.size == 0:
+        return None
+    return digit_to_canvas(digit)
+
+def digit_to_canvas(digit):
+    """توسيط الرقم في قماش 28x28 (أطول ضلع 20px كما في MNIST)"""
+    h, w = digit.shape
+    canvas = np.zeros((28, 28), dtype=np.uint8)
+    scale = 20.0 / max(w, h)
+    nw = max(int(w * scale), 1)
+    nh = max(int(h * scale), 1)
+    res = cv2.resize(digit, (nw, nh), interpolation=cv2.INTER_AREA)
+    
+    # تحسين وضوح الرقم بعد تغيير حجمه
+    _, res = cv2.threshold(res, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    
+    oy = (28 - nh) // 2
+    ox = (28 - nw) // 2
+    canvas[oy:oy + nh, ox:ox + nw] = res
+    return canvas
+
+def get_cell_multi_threshold(gray_cell):
+    """إنشاء نسخ متعددة بطرق threshold مختلفة"""
+    cells = []
+    try:
+        _, t1 = cv2.threshold(
+            gray_cell,
+            0,
+            255,
+            cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU
+        )
+        cells.append(t1)
+    except:
+        pass
+    try:
+        t2 = cv2.adaptiveThreshold(
+            gray_cell,
+            255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            11,
+            2
+        )
+        cells.append(t2)
+    except:
+        pass
+    try:
+        t3 = cv2.adaptiveThreshold(
+            gray_cell,
+            255,
+            cv2.ADAPTIVE_THRESH_MEAN_C,
+            cv2.THRESH_BINARY_INV,
+            11,
+            2
+        )
+        cells.append(t3)
+    except:
+        pass
+    return cells
+
+def augment_canvas(canvas):
+    """إنشاء نسخ معدّلة (TTA) من صورة 28×28"""
+    versions = [canvas]
+    # تدوير بسيط
+    for angle in [-5, 5]:
+        M = cv2.getRotationMatrix2D((14, 14), angle, 1.0)
+        rotated = cv2.warpAffine(canvas, M, (28, 28))
+        versions.append(rotated)
+    # إزاحة بسيطة
+    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+        M_s = np.float32([[1, 0, dx], [0, 1, dy]])
+        shifted = cv2.warpAffine(canvas, M_s, (28, 28))
+        versions.append(shifted)
+    return versions
+
+def board_binaries(gray):
+    """نفس نسخ threshold الثلاث (Otsu، Gaussian، Mean) لكن للوحة كاملة مرة واحدة"""
+    _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    gaussian = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2
+    )
+    mean = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 11, 2
+    )
+    return [otsu, gaussian, mean]
+
+def grid_line_masks(binary, n=9):
+    """
+    قناعا الخطوط الأفقية والعمودية:
+    - فتح مورفولوجي بنواة أفقية وأخرى عمودية بطول ~80% من الخلية يُبقي الخطوط فقط
+      (لا يوجد رقم بهذا الطول)
+    - توسيع عمودي/أفقي بسيط قبل الفتح ليلتقط الخطوط المائلة قليلاً
+    """
+    length = max(int(binary.shape[0] / n * 0.8), 10)
+    h_src = cv2.dilate(binary, np.ones((3, 1), np.uint8))
+    v_src = cv2.dilate(binary, np.ones((1, 3), np.uint8))
+    horizontal = cv2.morphologyEx(
+        h_src, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))
+    )
+    vertical = cv2.morphologyEx(
+        v_src, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length))
+    )
+    return horizontal, vertical
+
+def remove_grid_lines(binary, n=9):
+    """إزالة خطوط الشبكة من اللوحة كاملة مرة واحدة: طرح قناعي الخطوط (بعد توسيعهما) ثم إزالة التشويش النقطي"""
+    horizontal, vertical = grid_line_masks(binary, n)
+    lines = cv2.dilate(cv2.bitwise_or(horizontal, vertical), np.ones((3, 3), np.uint8))
+    clean = cv2.bitwise_and(binary, cv2.bitwise_not(lines))
+    return cv2.morphologyEx(clean, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+def locate_cell_digits(clean, n=9, margin=0.15, stride=None):
+    """
+    مرور connectedComponentsWithStats واحد على اللوحة النظيفة (أو شريط عدة نسخ منها)،
+    وإسناد أكبر مكوّن صالح لكل خلية حسب مركزه بعمليات NumPy متجهة
+    stride: عرض كل نسخة في الشريط مع الفاصل، يعيد {(v, i, j): canvas}
+    """
+    cs = clean.shape[0] / n
+    stride = stride or clean.shape[1]
+    # CCL_GRANA (BBDT) أسرع بنحو 3 مرات من الافتراضي على لوحة 450×450
+    _, _, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+        clean, 8, cv2.CV_32S, cv2.CCL_GRANA
+    )
+    # تجاهل الخلفية (label 0)
+    x, y, w, h, area = stats[1:].T
+    cx, cy = centroids[1:].T
+    v = (cx // stride).astype(int)
+    local_x = cx - v * stride
+    i = (cy // cs).astype(int)
+    j = (local_x // cs).astype(int)
+    fx, fy = local_x - j * cs, cy - i * cs
+
+    # نفس قواعد prepare_cell: حجم ونسبة أبعاد منطقية للرقم،
+    # والمركز داخل المنطقة الداخلية للخلية (بدل قص هامش 15%)
+    valid = (
+        (area >= 40) & (w >= 3) & (h >= 3) & (w <= cs * 0.9) & (h <= cs * 0.9)
+        & (w > 0.1 * h) & (w < 1.5 * h)
+        & (fx >= margin * cs) & (fx <= (1 - margin) * cs)
+        & (fy >= margin * cs) & (fy <= (1 - margin) * cs)
+        & (i < n) & (j < n)
+    )
+    idx = np.flatnonzero(valid)
+    keys = (v[idx] * n + i[idx]) * n + j[idx]
+    # ترتيب حسب الخلية ثم المساحة تنازلياً: أول مكوّن في كل خلية هو الأكبر
+    order = np.lexsort((-area[idx], keys))
+    keys, idx = keys[order], idx[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+
+    canvases = {}
+    for key, k in zip(keys[first].tolist(), idx[first].tolist()):
+        bx, by, bw, bh = stats[k + 1, :4]
+        vv, cell = divmod(key, n * n)
+        canvases[(vv,) + divmod(cell, n)] = digit_to_canvas(clean[by:by + bh, bx:bx + bw])
+    return canvases
+
+# فاصل فارغ بين نسخ threshold في الشريط: أوسع من أي توسيع مورفولوجي
+# حتى لا تتصل مكوّنات نسختين متجاورتين
+STRIP_GAP = 8
+
+def board_cell_canvases(gray, use_tta=True, n=9):
+    """
+    Multi-threshold على مستوى اللوحة: نسخ threshold الثلاث توضع جنباً إلى جنب في شريط واحد،
+    فتكفي إزالة خطوط واحدة ومرور connected components واحد لكل لوحة
+    """
+    binaries = board_binaries(gray)
+    height, width = gray.shape
+    stride = width + STRIP_GAP
+    strip = np.zeros((height, stride * len(binaries)), dtype=np.uint8)
+    for v, binary in enumerate(binaries):
+        strip[:, v * stride:v * stride + width] = binary
+    found = locate_cell_digits(remove_grid_lines(strip, n), n=n, stride=stride)
+
+    results = []
+    for i in range(n):
+        for j in range(n):
+            canvases = [found[v, i, j] for v in range(len(binaries)) if (v, i, j) in found]
+            if canvases and use_tta:
+                canvases.extend(augment_canvas(canvases[0])[1:])
+            results.append(canvases or None)
+    return results
+
+def prepare_cell_canvases(gray_cell, use_tta=True):
+    """Multi-threshold + TTA لخلية واحدة، يعيد قائمة الصور (الأولى للعرض) أو None"""
+    if gray_cell.size == 0:
+        return None
+    canvases = []
+    for tv in get_cell_multi_threshold(gray_cell):
+        c = prepare_cell(tv)
+        if c is not None:
+            canvases.append(c)
+    if not canvases:
+        return None
+    # TTA
+    if use_tta:
+        canvases.extend(augment_canvas(canvases[0])[1:])
+    return canvases
+
+def collect_cell_canvases(warped_img, use_tta=True, on_cell=None, method=None,
+                          refine=None, n=9):
+    """المرحلة 1: جمع صور 28×28 لجميع خلايا شبكة واحدة n×n
+    method: 'board' (الافتراضي CELL_METHOD) أو 'cells' لكنتورات كل خلية على حدة
+    refine: تصحيح مواضع خطوط الشبكة قبل القص (الافتراضي حسب REFINE_WARP)"""
+    method = CELL_METHOD if method is None else method
+    if refine is None:
+        refine = REFINE_WARP in ('1', 'true', 'yes', 'on') or (
+            REFINE_WARP == 'auto' and method == 'cells'
+        )
+    if refine:
+        warped_img, _ = refine_warp(warped_img, n)
+    gray = PipelineContext.of(warped_img).gray
+    debug_montage = np.zeros((n * 28, n * 28), dtype=np.uint8)
+
+    if method == 'board':
+        results = board_cell_canvases(gray, use_tta, n)
+    else:
+        cell_size = gray.shape[0] // n
+        # تم التحديث هنا إلى 15% لتجاوز خطوط الشبكة السميكة
+        m = int(cell_size * 0.15)
+        cells = [
+            gray[i * cell_size + m:(i + 1) * cell_size - m,
+                 j * cell_size + m:(j + 1) * cell_size - m]
+            for i in range(n)
+            for j in range(n)
+        ]
+        results = (prepare_cell_canvases(cell, use_tta) for cell in cells)
+
+    cell_data = {}
+    for k, canvases in enumerate(results):
+        i, j = divmod(k, n)
+        if canvases is not None:
+            debug_montage[i * 28:(i + 1) * 28, j * 28:(j + 1) * 28] = canvases[0]
+            cell_data[(i, j)] = canvases
+        if on_cell is not None:
+            on_cell(k)
+
+    return cell_data, debug_montage
+
+def predict_cell_canvases(grids_cell_data, model, conf_threshold=0.7, n=9,
+                          cascade=None, tiers=None):
+    """المرحلة 2: تنبؤ بدفعة واحدة لخلايا جميع الشبكات ⚡
+    (النموذج يعرف 0..9 فقط: القيم الأكبر في اللوحات الكبيرة تُدخل يدوياً)
+    cascade: مصنّف سريع (template_matcher.TemplateMatcher) يحسم الخلايا الواضحة أولاً
+    بعتبتيه الخاصتين، ولا يصل إلى model إلا ما لم يقبله
+    conf_threshold: أدنى احتمال softmax يُقبل به رقم النموذج (لا يُطبّق على تشابه القوالب)
+    tiers: قائمة تُضاف إليها لكل شبكة {'template': خلايا حسمها المصنّف السريع, 'cnn': خلايا النموذج}"""
+    boards = [np.zeros((n, n), dtype=int) for _ in grids_cell_data]
+    confidences = [np.zeros((n, n), dtype=float) for _ in grids_cell_data]
+    counts = [{'template': 0, 'cnn': 0} for _ in grids_cell_data]
+
+    all_images = []
+    owners = []
+    cells = []
+    for g, cell_data in enumerate(grids_cell_data):
+        for (i, j), canvases in cell_data.items():
+            for canvas in canvases:
+                all_images.append(canvas)
+                owners.append(len(cells))
+            cells.append((g, i, j))
+
+    if all_images:
+        batch = np.array(all_images).reshape(
+            -1, 28, 28, 1
+        ).astype('float32') / 255.0
+        owners = np.array(owners)
+        pending = np.ones(len(cells), dtype=bool)
+
+        if cascade is not None:
+            # صورة الخلية الأولى فقط (نسخ TTA لا تفيد مطابقة القوالب)
+            first = np.flatnonzero(np.diff(owners, prepend=-1))
+            # قرار القبول بعتبتي المصنّف نفسه (min_score / margin على التشابه)،
+            # و conf_threshold احتمال softmax للنموذج فقط
+            digits, scores, accepted = cascade.accept(cascade.scores(batch[first]))
+            for k in np.flatnonzero(accepted):
+                g, i, j = cells[k]
+                boards[g][i][j] = digits[k]
+                confidences[g][i][j] = scores[k]
+                counts[g]['template'] += 1
+            pending = ~accepted
+
+        if pending.any():
+            # صور الخلايا المصعّدة فقط (كل صور الخلية تبقى معاً)
+            rows = pending[owners]
+            predictions = model.predict(batch[rows], verbose=0)
+            remap = np.cumsum(pending) - 1
+            avg = _mean_by_cell(predictions, remap[owners[rows]], int(pending.sum()))
+            for k, pred in zip(np.flatnonzero(pending), avg):
+                g, i, j = cells[k]
+                counts[g]['cnn'] += 1
+                digit = int(np.argmax(pred))
+                conf = float(pred[digit])
+                if conf > conf_threshold and digit != 0:
+                    boards[g][i][j] = digit
+                    confidences[g][i][j] = conf
+
+    if tiers is not None:
+        tiers.extend(counts)
+    return boards, confidences
+
+def _mean_by_cell(preds, owners, count):
+    """متوسط صفوف preds لكل خلية (owners: فهرس خلية كل صف)"""
+    sums = np.zeros((count, preds.shape[1]), dtype=np.float64)
+    np.add.at(sums, owners, preds)
+    return sums / np.bincount(owners, minlength=count)[:, None]
+
+def extract_digits_multi(warped_imgs, model, use_tta=True, conf_threshold=0.7,
+                         on_progress=None, n=9, cascade=None, tiers=None):
+    """استخراج أرقام عدة شبكات n×n مع تنبؤ واحد مشترك لكل الشبكات
+    on_progress: دالة اختيارية تستقبل نسبة التقدم (0..1)
+    cascade / tiers: كما في predict_cell_canvases"""
+    total = max(len(warped_imgs) * n * n, 1)
+    grids_cell_data = []
+    montages = []
+    for g, warped in enumerate(warped_imgs):
+        on_cell = None
+        if on_progress is not None:
+            on_cell = lambda k, g=g: on_progress((g * n * n + k + 1) / total)
+        cell_data, montage = collect_cell_canvases(
+            warped,
+            use_tta=use_tta,
+            on_cell=on_cell,
+            n=n
+        )
+        grids_cell_data.append(cell_data)
+        montages.append(montage)
+
+    boards, confidences = predict_cell_canvases(
+        grids_cell_data,
+        model,
+        conf_threshold=conf_threshold,
+        n=n,
+        cascade=cascade,
+        tiers=tiers
+    )
+    return boards, confidences, montages
+
+# ==========================================
+# 3. رسم الحل على الصورة
+# ==========================================
+@functools.lru_cache(maxsize=8)
+def glyph_atlas(ch, cw, count=9, ink=(0, 0, 255), box=True, thick=2):
+    """
+    أطلس الأرقام: كل رقم 1..count مرسوم مرة واحدة في خلية ch×cw (خلفية بيضاء ونص أحمر)
+    مع قناع البكسلات المرسومة، والفهرس 0 خلية فارغة
+    ink: لون النص، box=False: النص وحده بلا خلفية بيضاء
+    """
+    tiles = np.zeros((count + 1, ch, cw, 3), dtype=np.uint8)
+    masks = np.zeros((count + 1, ch, cw), dtype=np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    pad = 4
+    for d in range(1, count + 1):
+        txt = str(d)
+        # 1.2 لخلايا 50 بكسل، ويُصغَّر الخط للأعداد ذات الخانتين أو الخلايا الأصغر
+        fs = 1.2
+        sz = cv2.getTextSize(txt, font, fs, thick)[0]
+        fs *= min(1.0, 0.7 * cw / sz[0], 0.7 * ch / sz[1])
+        sz = cv2.getTextSize(txt, font, fs, thick)[0]
+        tx = (cw - sz[0]) // 2
+        ty = (ch + sz[1]) // 2
+        for img, back, color in ((tiles[d], (255, 255, 255), ink), (masks[d], 255, 255)):
+            if box:
+                cv2.rectangle(img, (tx - pad, ty - sz[1] - pad), (tx + sz[0] + pad, ty + pad), back, -1)
+            cv2.putText(img, txt, (tx, ty), font, fs, color, thick)
+    return tiles, masks
+
+def solution_layer(solved, original, h=450, w=450):
+    """طبقة أرقام الحل (BGR) وقناعها بحجم الشبكة، مجمّعة من أطلس الأرقام بعملية واحدة"""
+    n = len(solved)
+    ch, cw = h // n, w // n
+    tiles, masks = glyph_atlas(ch, cw, max(n, 9))
+    digits = np.where(np.asarray(original) == 0, np.asarray(solved), 0).astype(int)
+    layer = np.zeros((h, w, 3), dtype=np.uint8)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    # (n, n, ch, cw) -> (n, ch, n, cw): كل صف خلايا يصبح شريطاً متصلاً من الصورة
+    layer[:n * ch, :n * cw] = tiles[digits].transpose(0, 2, 1, 3, 4).reshape(n * ch, n * cw, 3)
+    mask[:n * ch, :n * cw] = masks[digits].transpose(0, 2, 1, 3).reshape(n * ch, n * cw)
+    return layer, mask
+
+def draw_solution_on_warped(warped_img, solved, original):
+    result = warped_img.copy()
+    h, w = result.shape[:2]
+    layer, mask = solution_layer(solved, original, h, w)
+    # cv2.copyTo أسرع بكثير من np.copyto مع قناع مُذاع على القنوات
+    cv2.copyTo(layer, mask, result)
+    return result
+
+# لون أرقام المرشحات (BGR)
+PENCIL_INK = (170, 60, 0)
+
+@functools.lru_cache(maxsize=8)
+def pencil_atlas(ch, cw, n=9):
+    """
+    قناع كل مرشح d في خلية ch×cw: رقم صغير (من glyph_atlas) في موضعه الثابت
+    ضمن شبكة k×k داخل الخلية (3×3 للوحة 9×9)، مصفوفة (n, ch, cw)
+    """
+    k = int(np.ceil(np.sqrt(n)))
+    sh, sw = ch // k, cw // k
+    _, small = glyph_atlas(sh, sw, n, PENCIL_INK, False, 1)
+    masks = np.zeros((n, ch, cw), dtype=np.uint8)
+    for d in range(1, n + 1):
+        r, c = divmod(d - 1, k)
+        masks[d - 1, r * sh:(r + 1) * sh, c * sw:(c + 1) * sw] = small[d]
+    return masks
+
+def candidate_layer(cands, h=450, w=450):
+    """
+    طبقة المرشحات (BGR) وقناعها بحجم الشبكة من مصفوفة (n, n, n) المنطقية (solver.candidate_grid)
+    المواضع لا تتداخل: قناع كل خلية = ضرب مصفوفات واحد (الخلايا × المرشحات) @ (المرشحات × البكسلات)
+    """
+    n = len(cands)
+    ch, cw = h // n, w // n
+    masks = pencil_atlas(ch, cw, n).reshape(n, ch * cw)
+    cells = np.asarray(cands, dtype=np.float32).reshape(n * n, n) @ (masks > 0).astype(np.float32)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    # (n, n, ch, cw) -> (n, ch, n, cw) كما في solution_layer
+    mask[:n * ch, :n * cw] = (
+        (cells > 0).reshape(n, n, ch, cw).transpose(0, 2, 1, 3).reshape(n * ch, n * cw) * 255
+    )
+    layer = np.empty((h, w, 3), dtype=np.uint8)
+    layer[:] = PENCIL_INK
+    return layer, mask
+
+def draw_candidates_on_warped(warped_img, cands):
+    """المرشحات كأرقام صغيرة على الشبكة المقوّمة بدل الحل"""
+    result = warped_img.copy()
+    h, w = result.shape[:2]
+    layer, mask = candidate_layer(cands, h, w)
+    cv2.copyTo(layer, mask, result)
+    return result
+
+def shade_cells(img, cells, n, color, alpha=0.35):
+    """تظليل خلايا (r, c) من شبكة n×n مقوّمة بلون شفاف، يعيد صورة جديدة"""
+    if not cells:
+        return img.copy()
+    h, w = img.shape[:2]
+    ch, cw = h / n, w / n
+    layer = img.copy()
+    for r, c in set(cells):
+        cv2.rectangle(
+            layer,
+            (int(c * cw), int(r * ch)),
+            (int((c + 1) * cw) - 1, int((r + 1) * ch) - 1),
+            color, -1
+        )
+    return cv2.addWeighted(layer, alpha, img, 1 - alpha, 0)
+
+def draw_hint_on_warped(warped_img, board, step, placed=None):
+    """
+    خطوة تلميح على الشبكة المقوّمة: خلايا النمط بالأصفر، خلايا المرشحات المحذوفة بالأحمر،
+    والأرقام المثبتة (مع تلميحات سابقة في placed إن وُجدت) عبر draw_solution_on_warped
+    """
+    board = np.asarray(board)
+    n = len(board)
+    out = shade_cells(warped_img, step['cells'], n, (0, 220, 255))
+    out = shade_cells(out, [(r, c) for r, c, _ in step['eliminations']], n, (60, 60, 255))
+    placed = board.copy() if placed is None else np.array(placed)
+    for r, c, v in step['placements']:
+        placed[r, c] = v
+    return draw_solution_on_warped(out, placed, board)
+
+def paste_warped(dest, src, M, mask=None):
+    """
+    لصق صورة مقوّمة src في dest عبر المصفوفة M (في مكانها)
+    - التحويل يُحسب فقط داخل المستطيل المحيط بالشبكة بدل الإطار كاملاً
+    - mask: قناع src بقيم uint8 (الافتراضي الصورة كلها)
+    - البكسلات المغطاة جزئياً (حواف الشبكة والرموز) تُمزج بنسبة التغطية بدل قصّ القناع
+      عند > 0، ففروق التقريب في الاستيفاء لا تقلب بكسل الحافة بين الأصل ولون داكن
+    """
+    h, w = src.shape[:2]
+    quad = np.float32([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]]).reshape(-1, 1, 2)
+    quad = cv2.perspectiveTransform(quad, M).reshape(4, 2)
+    # هامش بكسلين: الاستيفاء الخطي يلمس البكسلات الملاصقة للحدود
+    x0, y0 = np.maximum(np.floor(quad.min(axis=0)).astype(int) - 2, 0)
+    x1, y1 = np.ceil(quad.max(axis=0)).astype(int) + 3
+    x1, y1 = min(x1, dest.shape[1]), min(y1, dest.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return dest
+    shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+    roi = (x1 - x0, y1 - y0)
+    T = shift @ M
+    # تكرار الحدود: لون الحافة لا يختلط بالأسود خارج src (التغطية يحملها القناع وحده)
+    warped = cv2.warpPerspective(src, T, roi, borderMode=cv2.BORDER_REPLICATE)
+    if mask is None:
+        mask = np.full((h, w), 255, dtype=np.uint8)
+    mask_warped = cv2.warpPerspective(mask, T, roi)
+    # الكتابة مباشرة في view المنطقة داخل dest: التغطية الكاملة نسخ مباشر
+    view = dest[y0:y1, x0:x1]
+    _, inner = cv2.threshold(mask_warped, 254, 255, cv2.THRESH_BINARY)
+    cv2.copyTo(warped, inner, view)
+    # التغطية الجزئية (شريط رفيع على الحواف فقط): مزج بنسبة التغطية
+    edge = cv2.findNonZero(cv2.bitwise_xor(mask_warped, inner))
+    if edge is not None:
+        xs, ys = edge.reshape(-1, 2).T
+        alpha = mask_warped[ys, xs].astype(np.float32) / 255.0
+        if view.ndim == 3:
+            alpha = alpha[:, None]
+        blended = view[ys, xs] * (1.0 - alpha) + warped[ys, xs] * alpha
+        view[ys, xs] = (blended + 0.5).astype(np.uint8)
+    return dest
+
+def overlay_solution_on_original(original_img, solved_warped, pts, size=None, mask=None):
+    """
+    إعادة الشبكة المقوّمة (أو طبقة أرقام مع mask) إلى منظور الصورة الأصلية
+    mask: قناع solved_warped (مثل solution_layer / candidate_layer): تُلصق البكسلات المرسومة
+    فقط فتبقى بقية الصورة بدقتها الكاملة
+    """
+    size = size or solved_warped.shape[0]
+    src = np.float32([
+        [0, 0],
+        [size - 1, 0],
+        [size - 1, size - 1],
+        [0, size - 1]
+    ])
+    dst = order_points(pts)
+    M_inv = cv2.getPerspectiveTransform(src, dst)
+    return paste_warped(original_img.copy(), solved_warped, M_inv, mask)
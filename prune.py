@@ -0,0 +1,193 @@
+"""
+تقليم بنيوي (قنوات/مرشحات) لنموذج الأرقام model.h5 مع ضبط دقيق لكل مستوى
+(بدون أي اعتماد على Streamlit)
+- لكل طبقة Conv2D / Dense مخفية تُحذف نسبة sparsity من المرشحات (أو الوحدات) ذات أصغر
+  معيار L1، وتُحذف معها مداخلها في الطبقة التالية (عبر Flatten: كل المواضع لكل قناة محذوفة)
+- النتيجة نموذج Sequential أضيق بنفس الطبقات والواجهة (دخل 28×28×1 / 255، مخرج softmax
+  لـ 0..9)، فيُحمَّل بـ SUDOKU_MODEL_PATH دون أي تغيير في الكود
+- الضبط الدقيق على خلايا الأرقام المطبوعة الاصطناعية نفسها (distill.synth_cells)
+- القياس: زمن predict_on_batch الفعلي على المعالج لأحجام دفعات extract_digits_batch
+  (~20..300 صورة)، ودقة الخلايا بقرار التطبيق، وعدد عمليات الضرب والجمع للمقارنة فقط
+- جدول Pareto (مستويات لا يتفوّق عليها غيرها في الزمن والدقة معاً)، ويُحفظ أسرع مستوى
+  دقته ضمن tolerance من المستوى 0 (نفس الضبط الدقيق بدون تقليم)
+
+التشغيل المباشر:
+    python -m prune --levels 0.25,0.5,0.75,0.9 --out model_pruned.h5
+    SUDOKU_MODEL_PATH=model_pruned.h5 streamlit run app.py
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from distill import (
+    HERSHEY_FONTS, accuracy, batch_latency, find_ttf_fonts, flatten_cells, synth_cells, to_batch,
+)
+
+# أحجام دفعات extract_digits_batch: ~30 خلية بدون TTA حتى ~300 مع TTA
+BATCH_SIZES = (20, 81, 150, 300)
+
+# ==========================================
+# 1. التقليم
+# ==========================================
+def _filter_norms(layer):
+    """معيار L1 لكل مرشح (Conv2D) أو وحدة (Dense): مجموع القيم المطلقة لأوزان دخله"""
+    kernel = layer.get_weights()[0]
+    return np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0)
+
+def prune_model(model, sparsity):
+    """
+    نموذج Sequential جديد بنسبة sparsity أقل من مرشحات كل Conv2D ووحدات كل Dense مخفية
+    (طبقة المخرج تبقى كاملة)؛ الأوزان الباقية تُنسخ كما هي
+    """
+    import tensorflow as tf
+    weighted = [l for l in model.layers if isinstance(l, (tf.keras.layers.Conv2D, tf.keras.layers.Dense))]
+    pruned = tf.keras.Sequential([tf.keras.Input(model.input_shape[1:])])
+    keep_in = None  # فهارس قنوات الدخل الباقية للطبقة الموزونة التالية
+    weights = []
+    for layer in model.layers:
+        config = layer.get_config()
+        if isinstance(layer, tf.keras.layers.Flatten):
+            # ترتيب Flatten (channels_last): الموضع ثم القناة
+            positions = int(np.prod(layer.input.shape[1:-1]))
+            channels = layer.input.shape[-1]
+            if keep_in is not None:
+                keep_in = (np.arange(positions)[:, None] * channels + keep_in).ravel()
+        elif layer in weighted:
+            kernel, bias = layer.get_weights()
+            if keep_in is not None:
+                kernel = kernel[..., keep_in, :]
+            if layer is weighted[-1]:
+                keep_out = np.arange(kernel.shape[-1])
+            else:
+                count = max(int(round(kernel.shape[-1] * (1 - sparsity))), 1)
+                keep_out = np.sort(np.argsort(_filter_norms(layer))[::-1][:count])
+            key = 'filters' if isinstance(layer, tf.keras.layers.Conv2D) else 'units'
+            config[key] = len(keep_out)
+            weights.append((len(pruned.layers), [kernel[..., keep_out], bias[keep_out]]))
+            keep_in = keep_out
+        pruned.add(layer.__class__.from_config(config))
+    for index, values in weights:
+        pruned.layers[index].set_weights(values)
+    return pruned
+
+def macs(model):
+    """عمليات الضرب والجمع لصورة واحدة (Conv2D و Dense فقط)"""
+    import tensorflow as tf
+    total = 0
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.Conv2D):
+            total += int(np.prod(layer.output.shape[1:3])) * int(np.prod(layer.kernel.shape))
+        elif isinstance(layer, tf.keras.layers.Dense):
+            total += int(np.prod(layer.kernel.shape))
+    return total
+
+def fine_tune(model, images, labels, epochs=3, batch_size=128, seed=0):
+    """ضبط دقيق بالتسميات الصحيحة (معدل تعلم أصغر من التدريب من الصفر)"""
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(seed)
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(5e-4),
+        loss='sparse_categorical_crossentropy',
+    )
+    model.fit(to_batch(images), labels, epochs=epochs, batch_size=batch_size, shuffle=True, verbose=0)
+    return model
+
+# ==========================================
+# 2. جدول Pareto
+# ==========================================
+def pareto_front(rows, latency_key, accuracy_key):
+    """علامة لكل صف: لا يوجد صف آخر أسرع أو مساوٍ وأدق أو مساوٍ مع تفوّق في أحدهما"""
+    front = []
+    for r in rows:
+        dominated = any(
+            o[latency_key] <= r[latency_key] and o[accuracy_key] >= r[accuracy_key]
+            and (o[latency_key] < r[latency_key] or o[accuracy_key] > r[accuracy_key])
+            for o in rows
+        )
+        front.append(not dominated)
+    return front
+
+def choose(rows, baseline_accuracy, tolerance, latency_key):
+    """أسرع مستوى تقليم دقته ضمن tolerance من baseline_accuracy، أو None"""
+    ok = [r for r in rows if r['sparsity'] > 0 and r['cell_acc'] >= baseline_accuracy - tolerance]
+    return min(ok, key=lambda r: r[latency_key]) if ok else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="تقليم بنيوي لـ model.h5 وجدول زمن/دقة")
+    parser.add_argument('--model', default=None, help='الافتراضي SUDOKU_MODEL_PATH أو model.h5')
+    parser.add_argument('--levels', default='0,0.25,0.5,0.75,0.9',
+                        help='نسب التقليم (0 = ضبط دقيق فقط بدون تقليم)')
+    parser.add_argument('--out', default='model_pruned.h5')
+    parser.add_argument('--cells', type=int, default=6000, help='خلايا الضبط الدقيق الاصطناعية')
+    parser.add_argument('--test-cells', type=int, default=600)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='أقصى انخفاض مقبول في دقة الخلايا لاختيار المستوى المحفوظ')
+    parser.add_argument('--batch', type=int, default=150,
+                        help='حجم الدفعة الذي يُختار المستوى ويُحسب Pareto على زمنه')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from inference_server import load_model
+    model_path = args.model or os.environ.get('SUDOKU_MODEL_PATH', 'model.h5')
+    base = load_model(model_path)
+    if base is None:
+        raise SystemExit(f"لا يوجد نموذج ({model_path})")
+
+    sizes = tuple(sorted(set(BATCH_SIZES) | {args.batch}))
+    fonts = HERSHEY_FONTS + find_ttf_fonts()
+    start = time.perf_counter()
+    images, labels = flatten_cells(*synth_cells(args.cells, fonts, seed=args.seed))
+    test_cells, test_labels = synth_cells(args.test_cells, fonts, seed=args.seed + 1)
+    print(f"{len(images)} صورة ضبط من {args.cells} خلية في {time.perf_counter() - start:.1f} ثانية")
+
+    latency_key = f'ms@{args.batch}'
+
+    def measure(name, sparsity, model):
+        _, cell_acc = accuracy(model, test_cells, test_labels)
+        row = {
+            'name': name, 'sparsity': sparsity, 'params': int(model.count_params()),
+            'macs': macs(model), 'cell_acc': cell_acc,
+        }
+        row.update({f'ms@{n}': ms for n, ms in batch_latency(model, sizes).items()})
+        return row
+
+    rows = [measure(os.path.basename(model_path), 0.0, base)]
+    models = {}
+    for level in (float(v) for v in args.levels.split(',')):
+        pruned = fine_tune(prune_model(base, level), images, labels, args.epochs, seed=args.seed)
+        models[level] = pruned
+        rows.append(measure(f'pruned {level:.0%}', level, pruned))
+        print(f"  {rows[-1]['name']}: {rows[-1]['params']} معامل، دقة {rows[-1]['cell_acc']:.4f}")
+
+    for row, front in zip(rows, pareto_front(rows, latency_key, 'cell_acc')):
+        row['pareto'] = front
+    print(f"{'model':14s} {'params':>8s} {'MACs':>9s} {'cell acc':>9s} "
+          + ' '.join(f"{f'ms@{n}':>8s}" for n in sizes) + '  pareto')
+    for r in rows:
+        print(f"{r['name']:14s} {r['params']:8d} {r['macs']:9d} {r['cell_acc']:9.4f} "
+              + ' '.join(f"{r[f'ms@{n}']:8.2f}" for n in sizes) + ('  *' if r['pareto'] else ''))
+
+    # المرجع: المستوى 0 بعد الضبط الدقيق إن وُجد (أثر التقليم وحده)، وإلا النموذج الأصلي
+    reference = next((r for r in rows[1:] if r['sparsity'] == 0), rows[0])
+    chosen = choose(rows, reference['cell_acc'], args.tolerance, latency_key)
+    if chosen is None:
+        print(f"لا يوجد مستوى تقليم ضمن {args.tolerance} من دقة {reference['name']}، لم يُحفظ شيء")
+    else:
+        model = models[chosen['sparsity']]
+        model.compile(loss='sparse_categorical_crossentropy')
+        model.save(args.out)
+        print(f"-> {args.out} ({chosen['name']})")
+    with open(os.path.splitext(args.out)[0] + '.json', 'w') as f:
+        json.dump({
+            'rows': rows,
+            'chosen': chosen and chosen['name'],
+            'reference': reference['name'],
+            'tolerance': args.tolerance,
+            'latency_key': latency_key,
+            'training': {'cells': args.cells, 'images': int(len(images)), 'epochs': args.epochs},
+        }, f, indent=2, ensure_ascii=False)
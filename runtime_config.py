@@ -0,0 +1,142 @@
+"""
+إعدادات التشغيل (الخيوط والذاكرة) لنشر عدة نسخ على نفس الخادم
+- تُقرأ من ملف TOML (SUDOKU_CONFIG، افتراضياً sudoku_config.toml) ثم متغيرات البيئة
+- يجب تطبيقها قبل استيراد TensorFlow: بعض القيم تُقرأ مرة واحدة عند التحميل
+- effective_settings() تعرض القيم الفعلية بعد التطبيق
+
+مثال sudoku_config.toml:
+    [runtime]
+    intra_op_threads = 2
+    inter_op_threads = 1
+    omp_threads = 2
+    opencv_threads = 1
+    onednn = true
+
+التشغيل المباشر يطبع الإعدادات الفعلية:
+    python -m runtime_config
+"""
+import os
+import sys
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# المفتاح -> (متغير البيئة الخاص بالتطبيق, النوع)
+SETTINGS = {
+    'intra_op_threads': ('SUDOKU_TF_INTRA_OP_THREADS', int),
+    'inter_op_threads': ('SUDOKU_TF_INTER_OP_THREADS', int),
+    'omp_threads': ('SUDOKU_OMP_THREADS', int),
+    'opencv_threads': ('SUDOKU_OPENCV_THREADS', int),
+    'onednn': ('SUDOKU_ONEDNN', bool),
+    'cpu_bfc_allocator': ('SUDOKU_TF_CPU_BFC_ALLOCATOR', bool),
+    'malloc_arena_max': ('SUDOKU_MALLOC_ARENA_MAX', int),
+}
+
+# متغيرات البيئة التي تُقرأ عند تحميل المكتبات (قبل استيراد TensorFlow)
+_ENV_AT_IMPORT = (
+    'OMP_NUM_THREADS',
+    'TF_NUM_INTRAOP_THREADS',
+    'TF_NUM_INTEROP_THREADS',
+    'TF_ENABLE_ONEDNN_OPTS',
+    'TF_CPU_ALLOCATOR_USE_BFC',
+    'MALLOC_ARENA_MAX',
+)
+
+_applied = None
+# قيمة MALLOC_ARENA_MAX كما كانت عند بدء العملية (glibc يقرؤها عند البدء فقط)
+_startup_arena_max = os.environ.get('MALLOC_ARENA_MAX')
+
+
+def _parse(value, kind):
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+    return kind(value)
+
+
+def load_runtime_config(path=None):
+    """دمج ملف الإعدادات مع متغيرات البيئة (البيئة لها الأولوية)، القيم غير المحددة None"""
+    config = {key: None for key in SETTINGS}
+    path = path or os.environ.get('SUDOKU_CONFIG', 'sudoku_config.toml')
+    if tomllib is not None and os.path.exists(path):
+        with open(path, 'rb') as f:
+            section = tomllib.load(f).get('runtime', {})
+        for key, value in section.items():
+            if key in SETTINGS:
+                config[key] = _parse(value, SETTINGS[key][1])
+    for key, (env, kind) in SETTINGS.items():
+        if os.environ.get(env, '') != '':
+            config[key] = _parse(os.environ[env], kind)
+    return config
+
+
+def apply_env(config):
+    """ضبط متغيرات البيئة التي تقرؤها TensorFlow و OpenMP عند التحميل"""
+    def put(name, value):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    put('OMP_NUM_THREADS', config['omp_threads'])
+    put('TF_NUM_INTRAOP_THREADS', config['intra_op_threads'])
+    put('TF_NUM_INTEROP_THREADS', config['inter_op_threads'])
+    if config['onednn'] is not None:
+        put('TF_ENABLE_ONEDNN_OPTS', int(config['onednn']))
+    if config['cpu_bfc_allocator'] is not None:
+        put('TF_CPU_ALLOCATOR_USE_BFC', str(config['cpu_bfc_allocator']).lower())
+    # يسري فقط على العمليات الفرعية؛ العملية الحالية تحتاجه قبل البدء
+    put('MALLOC_ARENA_MAX', config['malloc_arena_max'])
+
+
+def configure(path=None):
+    """
+    تحميل الإعدادات وتطبيقها مرة واحدة لكل عملية (آمن مع إعادة تشغيل سكربت Streamlit)
+    يجب استدعاؤها قبل import tensorflow
+    """
+    global _applied
+    if _applied is not None:
+        return _applied
+    if 'tensorflow' in sys.modules:
+        raise RuntimeError("runtime_config.configure() must run before importing TensorFlow")
+    config = load_runtime_config(path)
+    apply_env(config)
+
+    import cv2
+    if config['opencv_threads'] is not None:
+        cv2.setNumThreads(config['opencv_threads'])
+
+    import tensorflow as tf
+    if config['intra_op_threads'] is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(config['intra_op_threads'])
+    if config['inter_op_threads'] is not None:
+        tf.config.threading.set_inter_op_parallelism_threads(config['inter_op_threads'])
+
+    _applied = config
+    return config
+
+
+def effective_settings():
+    """القيم الفعلية بعد التطبيق (0 لدى TensorFlow = الافتراضي حسب عدد الأنوية)"""
+    report = {
+        'cpu_count': os.cpu_count(),
+        'cpu_affinity': len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None,
+        'requested': dict(_applied or {}),
+        'env': {name: os.environ.get(name) for name in _ENV_AT_IMPORT},
+        'malloc_arena_max_at_startup': _startup_arena_max,
+    }
+    if 'cv2' in sys.modules:
+        report['opencv_threads'] = sys.modules['cv2'].getNumThreads()
+    if 'tensorflow' in sys.modules:
+        tf = sys.modules['tensorflow']
+        report['tf_version'] = tf.__version__
+        report['tf_intra_op_threads'] = tf.config.threading.get_intra_op_parallelism_threads()
+        report['tf_inter_op_threads'] = tf.config.threading.get_inter_op_parallelism_threads()
+    return report
+
+
+if __name__ == '__main__':
+    configure()
+    for key, value in effective_settings().items():
+        print(f"{key:30s} {value}")
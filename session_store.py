@@ -0,0 +1,152 @@
+"""
+مخزن صور الجلسات بميزانية ذاكرة محدودة
+- الصور تُحفظ مضغوطة (PNG/JPEG bytes) بدل مصفوفات NumPy كاملة الدقة
+- ميزانية لكل جلسة وميزانية عامة مشتركة مع إخلاء الأقدم استخداماً (LRU)
+- مشترك بين كل الجلسات (عبر st.cache_resource) وآمن للخيوط
+- SessionReaper: موارد الجلسات المنتهية (صورها في المخزن مثلاً) تُحرَّر فور انتهائها
+  بدل انتظار إخلاء LRU
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+MB = 1024 * 1024
+
+
+class SessionImageStore:
+    def __init__(self, global_budget=256 * MB, session_budget=8 * MB):
+        self.global_budget = global_budget
+        self.session_budget = session_budget
+        self._lock = threading.Lock()
+        # (session_id, key) -> bytes بترتيب الاستخدام (الأقدم أولاً)
+        self._items = OrderedDict()
+        self._session_bytes = {}
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """قراءة الميزانيات من متغيرات البيئة (بالميغابايت)"""
+        return cls(
+            global_budget=int(float(os.environ.get('SUDOKU_GLOBAL_IMAGE_BUDGET_MB', 256)) * MB),
+            session_budget=int(float(os.environ.get('SUDOKU_SESSION_IMAGE_BUDGET_MB', 8)) * MB),
+        )
+
+    # ────── الكتابة ──────
+    def put(self, session_id, key, img, ext='.png', quality=90):
+        """ضغط صورة وتخزينها، يعيد False إذا تجاوزت ميزانية الجلسة وحدها"""
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality] if ext in ('.jpg', '.jpeg') else []
+        ok, buf = cv2.imencode(ext, img, params)
+        if not ok:
+            return False
+        return self.put_bytes(session_id, key, buf.tobytes())
+
+    def put_bytes(self, session_id, key, data):
+        size = len(data)
+        if size > min(self.session_budget, self.global_budget):
+            return False
+        with self._lock:
+            self._remove((session_id, key))
+            # إخلاء الأقدم من نفس الجلسة أولاً ثم من كل الجلسات
+            while self._session_bytes.get(session_id, 0) + size > self.session_budget:
+                self._evict_oldest(session_id)
+            while self._total() + size > self.global_budget:
+                self._evict_oldest()
+            self._items[(session_id, key)] = data
+            self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + size
+        return True
+
+    # ────── القراءة ──────
+    def get_bytes(self, session_id, key):
+        with self._lock:
+            data = self._items.get((session_id, key))
+            if data is not None:
+                self._items.move_to_end((session_id, key))
+            return data
+
+    def get(self, session_id, key):
+        """فك الصورة المخزنة إلى مصفوفة BGR، أو None إذا أُخليت"""
+        data = self.get_bytes(session_id, key)
+        if data is None:
+            return None
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+    # ────── الحذف ──────
+    def drop(self, session_id, key=None):
+        """حذف صورة واحدة أو كل صور الجلسة"""
+        with self._lock:
+            if key is not None:
+                self._remove((session_id, key))
+                return
+            for item in [k for k in self._items if k[0] == session_id]:
+                self._remove(item)
+
+    def stats(self):
+        """إحصائيات الاستهلاك لعرضها في لوحة الإدارة"""
+        with self._lock:
+            return {
+                'total_bytes': self._total(),
+                'global_budget': self.global_budget,
+                'session_budget': self.session_budget,
+                'items': len(self._items),
+                'sessions': dict(self._session_bytes),
+                'evictions': self.evictions,
+            }
+
+    # ────── دوال داخلية (تُستدعى والقفل محجوز) ──────
+    def _total(self):
+        return sum(self._session_bytes.values())
+
+    def _remove(self, item):
+        data = self._items.pop(item, None)
+        if data is None:
+            return
+        sid = item[0]
+        self._session_bytes[sid] -= len(data)
+        if self._session_bytes[sid] <= 0:
+            del self._session_bytes[sid]
+
+    def _evict_oldest(self, session_id=None):
+        for item in self._items:
+            if session_id is None or item[0] == session_id:
+                self._remove(item)
+                self.evictions += 1
+                return
+
+
+class SessionReaper:
+    """
+    تنظيف موارد الجلسات المنتهية: لكل جلسة دالة حياة (is_alive) ودوال تنظيف بأسماء،
+    و sweep تستدعي دوال الجلسات الميتة مرة واحدة ثم تنساها
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # session_id -> (is_alive، {الاسم: دالة التنظيف})
+        self._sessions = {}
+
+    def register(self, session_id, is_alive, name, cleanup):
+        """تسجيل (أو استبدال) دالة تنظيف للجلسة"""
+        with self._lock:
+            _, cleanups = self._sessions.setdefault(session_id, (is_alive, {}))
+            self._sessions[session_id] = (is_alive, cleanups)
+            cleanups[name] = cleanup
+
+    def unregister(self, session_id, name):
+        """إزالة دالة تنظيف (المورد حُرِّر يدوياً)، وتعيدها أو None"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry[1].pop(name, None) if entry else None
+
+    def sweep(self):
+        """تشغيل تنظيف كل جلسة لم تعد حية، يعيد عدد الجلسات المحرَّرة"""
+        with self._lock:
+            dead = [sid for sid, (is_alive, _) in self._sessions.items() if not is_alive()]
+            cleanups = [self._sessions.pop(sid)[1] for sid in dead]
+        # خارج القفل: التنظيف قد يأخذ أقفالاً أخرى (المخزن مثلاً)
+        for entry in cleanups:
+            for cleanup in entry.values():
+                cleanup()
+        return len(dead)
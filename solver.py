@@ -0,0 +1,764 @@
+"""
+محرك حل السودوكو (بدون أي اعتماد على Streamlit)
+- الحل بالتراجع (backtracking) والتحقق من صحة اللوحة
+- خدمة حل بمجمّع عمال مع مهلة زمنية وإلغاء تعاوني
+- لوحات بأحجام 4×4 حتى 25×25 (BOX_SHAPES) بمحرك أقنعة بتات وانتشار قيود
+- نواة مُترجمة اختيارية للوحات 9×9 (solver_jit، تحتاج numba) مع رجوع تلقائي لمحرك Python
+- حل دفعي لعدة لوحات معاً بمصفوفة مرشحين (N, 81, 9)
+- تقدير صعوبة اللغز من عدّادات الحل نفسه (stats) بلا تمريرة إضافية
+"""
+import functools
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# محرك لوحات 9×9: 'auto' (النواة المُترجمة إن وُجدت numba) أو 'jit' أو 'python' (solve_bitset)
+SOLVER_ENGINE = os.environ.get('SUDOKU_SOLVER_ENGINE', 'auto')
+
+# ==========================================
+# 1. محرك حل السودوكو
+# ==========================================
+# أحجام اللوحات المدعومة -> شكل المربع (صفوف، أعمدة)
+BOX_SHAPES = {4: (2, 2), 6: (2, 3), 9: (3, 3), 12: (3, 4), 16: (4, 4), 25: (5, 5)}
+
+def box_shape(n):
+    if n not in BOX_SHAPES:
+        raise ValueError(f"unsupported board size {n}x{n}")
+    return BOX_SHAPES[n]
+
+def is_valid(b, r, c, n):
+    if n in b[r, :] or n in b[:, c]:
+        return False
+    br, bc = box_shape(len(b))
+    sr, sc = (r // br) * br, (c // bc) * bc
+    if n in b[sr:sr + br, sc:sc + bc]:
+        return False
+    return True
+
+def solve(b):
+    size = len(b)
+    for r in range(size):
+        for c in range(size):
+            if b[r, c] == 0:
+                for n in range(1, size + 1):
+                    if is_valid(b, r, c, n):
+                        b[r, c] = n
+                        if solve(b):
+                            return True
+                        b[r, c] = 0
+                return False
+    return True
+
+def candidate_grid(board):
+    """
+    مرشحات كل الخلايا بتمريرة واحدة: مصفوفة منطقية (n, n, n) و [r, c, d-1] تعني أن d ممكن في (r, c)
+    الأرقام المستخدمة في كل صف وعمود ومربع بعمليات مصفوفات بدل is_valid لكل خلية ورقم؛
+    الخلايا المعطاة بلا مرشحات
+    """
+    board = np.asarray(board, dtype=int)
+    n = len(board)
+    br, bc = box_shape(n)
+    # ترميز one-hot للقيم (العمود 0 للخلايا الفارغة ويُحذف)
+    placed = np.eye(n + 1, dtype=bool)[board][..., 1:]
+    rows = placed.any(axis=1)
+    cols = placed.any(axis=0)
+    boxes = placed.reshape(n // br, br, n // bc, bc, n).any(axis=(1, 3))
+    used = rows[:, None] | cols[None] | boxes.repeat(br, axis=0).repeat(bc, axis=1)
+    return ~used & (board == 0)[..., None]
+
+def validate_board(board):
+    size = len(board)
+    if board.shape != (size, size) or size not in BOX_SHAPES:
+        return False, f"حجم اللوحة غير مدعوم {board.shape}"
+    for i in range(size):
+        for j in range(size):
+            v = board[i, j]
+            if v < 0 or v > size:
+                return False, f"قيمة غير صالحة {v} في الموقع [صف {i+1}, عمود {j+1}]"
+            if v != 0:
+                temp = board.copy()
+                temp[i, j] = 0
+                if not is_valid(temp, i, j, v):
+                    return False, f"تكرار الرقم {v} في الموقع [صف {i+1}, عمود {j+1}]"
+    return True, ""
+
+# ==========================================
+# 2. الحل بمهلة زمنية وإلغاء تعاوني
+# ==========================================
+class SolveTimeout(Exception):
+    def __init__(self, nodes):
+        super().__init__(f"time budget exceeded after {nodes} nodes")
+        self.nodes = nodes
+
+class SolveCancelled(Exception):
+    def __init__(self, nodes):
+        super().__init__(f"cancelled after {nodes} nodes")
+        self.nodes = nodes
+
+def _budget_check(time_budget, should_stop, on_progress):
+    """check(nodes): إبلاغ التقدم ثم رفع SolveCancelled / SolveTimeout عند الحاجة"""
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    def check(nodes):
+        if on_progress is not None:
+            on_progress(nodes)
+        if should_stop is not None and should_stop():
+            raise SolveCancelled(nodes)
+        if deadline is not None and time.monotonic() > deadline:
+            raise SolveTimeout(nodes)
+
+    return check
+
+def solve_with_budget(b, time_budget=None, should_stop=None, on_progress=None,
+                      check_every=2048):
+    """
+    نفس خوارزمية solve مع عدّ العقد المستكشفة
+    - كل check_every عقدة: فحص المهلة و should_stop() وإبلاغ on_progress(nodes)
+    - يعيد (تم الحل؟, عدد العقد) أو يرفع SolveTimeout / SolveCancelled
+    """
+    check = _budget_check(time_budget, should_stop, on_progress)
+    nodes = 0
+    size = len(b)
+
+    def rec():
+        nonlocal nodes
+        for r in range(size):
+            for c in range(size):
+                if b[r, c] == 0:
+                    for n in range(1, size + 1):
+                        if is_valid(b, r, c, n):
+                            b[r, c] = n
+                            nodes += 1
+                            if nodes % check_every == 0:
+                                check(nodes)
+                            if rec():
+                                return True
+                            b[r, c] = 0
+                    return False
+        return True
+
+    solved = rec()
+    if on_progress is not None:
+        on_progress(nodes)
+    return solved, nodes
+
+@functools.lru_cache(maxsize=None)
+def unit_tables(n):
+    """لوحة n×n مسطحة: (خلايا كل وحدة من الـ 3n وحدة، أقران كل خلية، وحدات كل خلية)"""
+    br, bc = box_shape(n)
+    units = [[r * n + c for c in range(n)] for r in range(n)]
+    units += [[r * n + c for r in range(n)] for c in range(n)]
+    units += [
+        [(r0 + r) * n + c0 + c for r in range(br) for c in range(bc)]
+        for r0 in range(0, n, br) for c0 in range(0, n, bc)
+    ]
+    peers = [set() for _ in range(n * n)]
+    cell_units = [[] for _ in range(n * n)]
+    for u, unit in enumerate(units):
+        for cell in unit:
+            peers[cell].update(unit)
+            cell_units[cell].append(u)
+    return units, [sorted(p - {cell}) for cell, p in enumerate(peers)], cell_units
+
+def _propagate(cands, todo, tables, full, counts=None):
+    """
+    حذف قيم الخلايا المثبتة (todo) من أقرانها ثم hidden singles حتى الاستقرار (في مكانها)
+    - hidden singles تُفحص فقط في الوحدات التي تغيّرت إحدى خلاياها
+    cands: قائمة أقنعة بتات لكل خلية (البت d-1 للرقم d)، يعيد False عند التناقض
+    counts: عدّادات [naked, hidden, guesses, backtracks] تُزاد بالخلايا المثبتة هنا
+    """
+    units, peers, cell_units = tables
+    dirty = set()
+    while True:
+        while todo:
+            cell = todo.pop()
+            bit = cands[cell]
+            dirty.update(cell_units[cell])
+            for p in peers[cell]:
+                m = cands[p]
+                if m & bit:
+                    m &= ~bit
+                    if not m:
+                        return False
+                    cands[p] = m
+                    dirty.update(cell_units[p])
+                    if not m & (m - 1):
+                        todo.append(p)
+                        if counts is not None:
+                            counts[0] += 1
+        for u in dirty:
+            unit = units[u]
+            once = twice = 0
+            for cell in unit:
+                m = cands[cell]
+                twice |= once & m
+                once |= m
+            if once != full:
+                return False
+            hidden = once & ~twice
+            if hidden:
+                for cell in unit:
+                    m = cands[cell] & hidden
+                    if m and m != cands[cell]:
+                        if m & (m - 1):
+                            return False
+                        cands[cell] = m
+                        todo.append(cell)
+                        if counts is not None:
+                            counts[1] += 1
+        dirty.clear()
+        if not todo:
+            return True
+
+def _unit_pair(cands, units):
+    """أول (بت الرقم، [خليتان]) لرقم غير مثبت يظهر في خليتين فقط من وحدة، أو None"""
+    for unit in units:
+        once = twice = thrice = fixed = 0
+        for cell in unit:
+            m = cands[cell]
+            if not m & (m - 1):
+                fixed |= m
+            thrice |= twice & m
+            twice |= once & m
+            once |= m
+        pairs = twice & ~thrice & ~fixed
+        if pairs:
+            bit = pairs & -pairs
+            return bit, [cell for cell in unit if cands[cell] & bit]
+    return None
+
+def _branch(cands, tables):
+    """
+    أبناء عقدة منتشرة كـ (المرشحات، الخلية، البت)، أو None إذا كانت محلولة:
+    التفرّع على الخلية الأقل مرشحات، أو على رقم له خانتان في وحدة إن كان أضيق
+    """
+    best, best_count = None, len(cands) + 1
+    for i, m in enumerate(cands):
+        if m & (m - 1):
+            count = bin(m).count('1')
+            if count < best_count:
+                best, best_count = i, count
+                if count == 2:
+                    break
+    if best is None:
+        return None
+    if best_count > 2:
+        pair = _unit_pair(cands, tables[0])
+        if pair is not None:
+            return [(cands, c, pair[0]) for c in pair[1]]
+    m = cands[best]
+    children = []
+    while m:
+        children.append((cands, best, m & -m))
+        m &= m - 1
+    return children
+
+def _search(cands, tables, full, count_node, rng=None, limit=None, counts=None):
+    """
+    بحث عمقي من مرشحات منتشرة (التفرّع حسب _branch)
+    rng: ترتيب عشوائي للأبناء (لإعادة البدء)، limit: أقصى عدد عقد قبل التخلي
+    counts: عدّادات [naked, hidden, guesses, backtracks] كما في _propagate
+    يعيد المرشحات المحلولة، أو None إذا لا حل، أو False عند بلوغ limit
+    """
+    nodes = 0
+    # كل عنصر: (مرشحات الأب، الخلية، البت) يُنشر عند إخراجه من المكدس
+    stack = [(cands, None, 0)]
+    while stack:
+        cands, cell, bit = stack.pop()
+        if cell is not None:
+            cands = cands[:]
+            cands[cell] = bit
+            nodes += 1
+            count_node()
+            if limit is not None and nodes > limit:
+                return False
+            if not _propagate(cands, [cell], tables, full, counts):
+                if counts is not None:
+                    counts[3] += 1
+                continue
+        children = _branch(cands, tables)
+        if children is None:
+            return cands
+        if counts is not None and len(children) > 1:
+            counts[2] += 1
+        if rng is not None:
+            rng.shuffle(children)
+        # الترتيب العكسي: الابن الأول يُجرّب أولاً
+        stack.extend(reversed(children))
+    return None
+
+def solve_bitset(b, time_budget=None, should_stop=None, on_progress=None,
+                 check_every=64, restart_nodes=2000, stats=None, check=None):
+    """
+    محرك لأي حجم مدعوم (4×4 حتى 25×25): مرشحات كأقنعة بتات، انتشار القيود
+    (naked + hidden singles) بعد كل تثبيت، والتفرّع على الخلية الأقل مرشحات
+    - بحث بترتيب ثابت حتى restart_nodes عقدة، ثم إعادة بدء بترتيب عشوائي
+      وحدّ يتضاعف (زمن البحث في اللوحات الكبيرة ذو ذيل ثقيل)
+    - نفس واجهة solve_with_budget؛ الحل يُكتب في b عند النجاح
+    - stats: قاموس يُملأ بعدّادات الحل ودرجة الصعوبة (انظر solve_stats)؛ التخمينات
+      والتراجعات من المحاولة الأخيرة فقط، و nodes مجموع كل المحاولات؛ هذه العدّادات هي
+      المرجع لدرجة الصعوبة في كل المسارات (grade_board)
+    - check: دالة _budget_check جاهزة بدل time_budget / should_stop / on_progress
+    """
+    n = len(b)
+    tables = unit_tables(n)
+    full = (1 << n) - 1
+    if check is None:
+        check = _budget_check(time_budget, should_stop, on_progress)
+    flat = np.asarray(b).reshape(-1).tolist()
+    cands = [1 << (v - 1) if v else full for v in flat]
+    nodes = 0
+    counts = [0, 0, 0, 0]
+
+    def count_node():
+        nonlocal nodes
+        nodes += 1
+        if nodes % check_every == 0:
+            check(nodes)
+
+    solution = None
+    if _propagate(cands, [i for i, v in enumerate(flat) if v], tables, full, counts):
+        rng, limit = None, restart_nodes
+        given = counts
+        while True:
+            # عدّادات كل محاولة تبدأ من انتشار المعطيات: الدرجة من المحاولة الأخيرة وحدها
+            counts = given[:]
+            solution = _search(cands, tables, full, count_node, rng, limit, counts)
+            if solution is not False:
+                break
+            rng = rng or random.Random(0)
+            limit *= 2
+
+    if solution is not None:
+        b[...] = np.array([m.bit_length() for m in solution]).reshape(b.shape)
+    if stats is not None:
+        stats.update(solve_stats(nodes, *counts, n=n))
+    if on_progress is not None:
+        on_progress(nodes)
+    return solution is not None, nodes
+
+def solve_singles(b):
+    """
+    انتشار القيود وحده (naked + hidden singles) بلا بحث
+    يعيد (اللوحة بعد الانتشار بأصفار للخلايا غير المحسومة، هل حُلّت كاملة؟)
+    أو (None, False) عند التناقض
+    """
+    b = np.asarray(b)
+    n = len(b)
+    full = (1 << n) - 1
+    flat = b.reshape(-1).tolist()
+    cands = [1 << (v - 1) if v else full for v in flat]
+    if not _propagate(cands, [i for i, v in enumerate(flat) if v], unit_tables(n), full):
+        return None, False
+    values = [m.bit_length() if not m & (m - 1) else 0 for m in cands]
+    return np.array(values).reshape(b.shape), all(values)
+
+def count_solutions(b, limit=2):
+    """
+    عدد حلول اللوحة متوقفاً عند limit (2 يكفي لفحص تفرّد الحل)
+    بالنواة المُترجمة للوحات 9×9 إذا توفرت، وإلا ببحث البتات الكامل
+    """
+    b = np.asarray(b)
+    n = len(b)
+    if n == 9 and load_jit() is not None:
+        return _count_jit(b, limit)
+    tables = unit_tables(n)
+    full = (1 << n) - 1
+    flat = b.reshape(-1).tolist()
+    cands = [1 << (v - 1) if v else full for v in flat]
+    if not _propagate(cands, [i for i, v in enumerate(flat) if v], tables, full):
+        return 0
+    count = 0
+    stack = [(cands, None, 0)]
+    while stack:
+        cands, cell, bit = stack.pop()
+        if cell is not None:
+            cands = cands[:]
+            cands[cell] = bit
+            if not _propagate(cands, [cell], tables, full):
+                continue
+        children = _branch(cands, tables)
+        if children is None:
+            count += 1
+            if count >= limit:
+                break
+        else:
+            stack.extend(children)
+    return count
+
+def _count_jit(b, limit):
+    """تعداد الحلول بالنواة: بعد كل حل يُزال آخر رقم مثبت ويُستأنف البحث منه"""
+    kernel = load_jit()
+    flat = np.array(b, dtype=np.uint8).reshape(81)
+    if not kernel.givens_consistent(flat):
+        return 0
+    cell_at, tried, state, counts = kernel.new_state()
+    count = 0
+    while count < limit:
+        status, _ = kernel.search(flat, cell_at, tried, state, counts, 1 << 30)
+        if status != kernel.SOLVED:
+            break
+        count += 1
+        if state[0] < 0:
+            # لوحة كاملة بلا خلايا فارغة: حل واحد فقط
+            break
+        flat[cell_at[state[0]]] = 0
+    return count
+
+_jit = None
+
+def load_jit():
+    """وحدة النواة المُترجمة solver_jit أو None (numba غير مثبتة أو SUDOKU_SOLVER_ENGINE=python)"""
+    global _jit
+    if _jit is None:
+        _jit = False
+        if SOLVER_ENGINE != 'python':
+            try:
+                import solver_jit
+                _jit = solver_jit
+            except ImportError:
+                if SOLVER_ENGINE == 'jit':
+                    raise
+    return _jit or None
+
+def solve_with_jit(b, time_budget=None, should_stop=None, on_progress=None,
+                   check_every=2048, stats=None):
+    """
+    نفس واجهة solve_with_budget بالنواة المُترجمة على نسخة uint8 مسطحة
+    - البحث يُستأنف على دفعات من check_every عقدة، وبينها فحص المهلة والإلغاء
+    - الحل يُنسخ إلى b فقط عند النجاح
+    - stats: درجة الصعوبة المرجعية (grade_board) ضمن نفس المهلة، فتطابق المحركات الأخرى؛
+      عدّادات النواة نفسها تُستعمل فقط إن لم يكتمل التقدير قبل المهلة
+    """
+    kernel = load_jit()
+    check = _budget_check(time_budget, should_stop, on_progress)
+    # نفس الموعد النهائي للتقدير دون إبلاغ عقده كتقدم للحل
+    grade_check = _budget_check(time_budget, should_stop, None)
+    given = np.array(b, copy=True)
+    flat = np.array(b, dtype=np.uint8).reshape(81)
+    if not kernel.givens_consistent(flat):
+        return False, 0
+    cell_at, tried, state, counts = kernel.new_state()
+    nodes = 0
+    while True:
+        status, n = kernel.search(flat, cell_at, tried, state, counts, check_every)
+        nodes += n
+        if status != kernel.RUNNING:
+            break
+        check(nodes)
+    if status == kernel.SOLVED:
+        b[...] = flat.reshape(b.shape)
+    if stats is not None:
+        stats.update(solve_stats(nodes, *counts.tolist()))
+        if status == kernel.SOLVED:
+            try:
+                stats.update(grade_board(given, check=grade_check))
+            except SolveTimeout:
+                pass
+    if on_progress is not None:
+        on_progress(nodes)
+    return status == kernel.SOLVED, nodes
+
+def solve_fast(b, **kwargs):
+    """النواة المُترجمة للوحات 9×9 إذا توفرت، وإلا محرك البتات solve_bitset لأي حجم"""
+    if len(b) == 9 and load_jit() is not None:
+        return solve_with_jit(b, **kwargs)
+    return solve_bitset(b, **kwargs)
+
+class SolveJob:
+    """مهمة حل واحدة: الحالة 'running' ثم 'solved' أو 'unsolvable'
+    أو 'timeout' أو 'cancelled' أو 'error'"""
+
+    def __init__(self, board, is_alive=None):
+        self.original = board.copy()
+        self.board = board.copy()
+        self.is_alive = is_alive
+        self.status = 'running'
+        self.nodes = 0
+        self.elapsed = 0.0
+        # عدّادات الحل ودرجة الصعوبة (solve_stats) بعد النجاح
+        self.stats = {}
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def should_stop(self):
+        if self._cancel.is_set():
+            return True
+        # الجلسة أُغلقت: لا أحد ينتظر النتيجة
+        return self.is_alive is not None and not self.is_alive()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+class SolveService:
+    """مجمّع خيوط مشترك لحل الألغاز بمهلة زمنية لكل طلب"""
+
+    def __init__(self, workers=2, time_budget=10.0):
+        self.time_budget = time_budget
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="sudoku-solve"
+        )
+        # تحميل النواة (من ذاكرة الترجمة على القرص) قبل أول طلب
+        self._pool.submit(self._warm_up)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.environ.get('SUDOKU_SOLVE_WORKERS', 2)),
+            time_budget=float(os.environ.get('SUDOKU_SOLVE_TIME_BUDGET', 10)),
+        )
+
+    @staticmethod
+    def _warm_up():
+        try:
+            solve_fast(np.zeros((9, 9), dtype=int))
+        except Exception:
+            pass
+
+    def submit(self, board, is_alive=None):
+        """إرسال لوحة للحل دون انتظار؛ is_alive: دالة تعيد False عند انتهاء الجلسة"""
+        job = SolveJob(np.asarray(board), is_alive=is_alive)
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        start = time.monotonic()
+        try:
+            # مهمة أُلغيت وهي في الطابور لا تستهلك أي وقت معالج
+            if job.should_stop():
+                raise SolveCancelled(0)
+            solved, job.nodes = solve_fast(
+                job.board,
+                time_budget=self.time_budget,
+                should_stop=job.should_stop,
+                on_progress=lambda n: setattr(job, 'nodes', n),
+                stats=job.stats
+            )
+            job.status = 'solved' if solved else 'unsolvable'
+        except SolveTimeout as e:
+            job.nodes = e.nodes
+            job.status = 'timeout'
+        except SolveCancelled as e:
+            job.nodes = e.nodes
+            job.status = 'cancelled'
+        except Exception:
+            job.status = 'error'
+        finally:
+            job.elapsed = time.monotonic() - start
+            job._done.set()
+
+# ==========================================
+# 3. الحل الدفعي: انتشار القيود على N لوحة معاً
+# ==========================================
+# حالة كل لوحة في ناتج solve_batch
+UNSOLVABLE, PROPAGATED, SEARCHED, TIMEOUT, CANCELLED = 0, 1, 2, 3, 4
+
+_CELLS = np.arange(81)
+_ROWS, _COLS = np.divmod(_CELLS, 9)
+_BOXES = (_ROWS // 3) * 3 + _COLS // 3
+# الوحدات الـ 27 (صفوف، أعمدة، مربعات) كمصفوفة انتماء (27, 81)
+UNITS = np.zeros((27, 81), dtype=np.float32)
+UNITS[_ROWS, _CELLS] = 1
+UNITS[9 + _COLS, _CELLS] = 1
+UNITS[18 + _BOXES, _CELLS] = 1
+# أقران كل خلية (نفس الصف أو العمود أو المربع، دون الخلية نفسها)
+PEERS = ((UNITS.T @ UNITS) > 0).astype(np.float32)
+np.fill_diagonal(PEERS, 0)
+
+def _cell_matmul(mat, x):
+    """mat (R, K) @ x (M, K, 9) لكل اللوحات بضرب مصفوفات واحد (R, K) @ (K, M·9)"""
+    m, k, d = x.shape
+    flat = x.transpose(1, 0, 2).reshape(k, m * d).astype(np.float32)
+    return (mat @ flat).reshape(len(mat), m, d).transpose(1, 0, 2)
+
+def boards_to_candidates(boards):
+    """(N, 9, 9) -> مصفوفة مرشحين منطقية (N, 81, 9)"""
+    flat = np.asarray(boards, dtype=int).reshape(-1, 81)
+    cands = np.ones(flat.shape + (9,), dtype=bool)
+    given = flat > 0
+    cands[given] = np.eye(9, dtype=bool)[flat[given] - 1]
+    return cands
+
+def candidates_to_boards(cands):
+    """الخلايا ذات المرشح الوحيد تأخذ قيمتها والباقي 0"""
+    boards = cands.argmax(axis=2) + 1
+    boards[cands.sum(axis=2) != 1] = 0
+    return boards.reshape(-1, 9, 9)
+
+def propagate_batch(cands, hidden_counts=None):
+    """
+    تطبيق الحذف (naked singles) و hidden singles على كل اللوحات حتى الاستقرار
+    - اللوحات التي استقرت تخرج من المجموعة العاملة في كل دورة
+    - hidden_counts: مصفوفة (N,) تُزاد بعدد الخلايا التي ثبّتتها hidden singles لكل لوحة
+    - يعيد (المرشحات، قناع اللوحات المتناقضة)
+    """
+    cands = cands.copy()
+    active = np.arange(len(cands))
+    while len(active):
+        work = cands[active]
+        before = work.sum(axis=(1, 2))
+        # حذف القيم المثبتة من مرشحات أقرانها
+        fixed = work.sum(axis=2) == 1
+        single = work & fixed[..., None]
+        work &= ~(_cell_matmul(PEERS, single) > 0)
+        # رقم له خلية واحدة ممكنة في وحدة ما يُثبَّت فيها
+        unique = (_cell_matmul(UNITS, work) == 1).astype(np.float32)
+        hidden = work & (_cell_matmul(UNITS.T, unique) > 0)
+        if hidden_counts is not None:
+            # تُحسب فقط حين لم يثبّت الحذف وحده أي خلية جديدة: وإلا قد تكون naked single لاحقاً
+            stalled = ((work.sum(axis=2) == 1) == fixed).all(axis=1)
+            forced = hidden.any(axis=2) & (work.sum(axis=2) > 1)
+            hidden_counts[active[stalled]] += forced[stalled].sum(axis=1)
+        work = np.where(hidden.any(axis=2)[..., None], hidden, work)
+        cands[active] = work
+        active = active[work.sum(axis=(1, 2)) != before]
+
+    counts = cands.sum(axis=2)
+    dead = (counts == 0).any(axis=1)
+    # رقم لا مكان له في وحدة، أو خلية أُجبرت على رقمين
+    dead |= (_cell_matmul(UNITS, cands) == 0).any(axis=(1, 2))
+    single = cands & (counts == 1)[..., None]
+    dead |= (_cell_matmul(PEERS, single) * single > 0).any(axis=(1, 2))
+    return cands, dead
+
+def search_candidates(cands, stats=None, time_budget=None, should_stop=None, check=None):
+    """
+    بحث عمقي للوحة واحدة لم يحلها الانتشار:
+    التفرّع على الخلية الأقل مرشحات، وأبناء كل عقدة تُنشر معاً كدفعة صغيرة
+    stats: قاموس تُزاد فيه 'guesses' (نقاط التفرّع) و 'backtracks' (الأبناء المتناقضة)
+    time_budget / should_stop: كما في solve_with_budget، تُفحص قبل كل تفرّع
+    (check: دالة _budget_check جاهزة بدلهما لمشاركة مهلة واحدة بين عدة لوحات)
+    يعيد (المرشحات المحلولة أو None، عدد العقد) أو يرفع SolveTimeout / SolveCancelled
+    """
+    if check is None:
+        check = _budget_check(time_budget, should_stop, None)
+    stack = [cands]
+    nodes = 0
+    while stack:
+        check(nodes)
+        node = stack.pop()
+        counts = node.sum(axis=1)
+        if (counts == 1).all():
+            return node, nodes
+        cell = np.where(counts > 1, counts, 10).argmin()
+        digits = np.flatnonzero(node[cell])
+        children = np.repeat(node[None], len(digits), axis=0)
+        children[:, cell] = False
+        children[np.arange(len(digits)), cell, digits] = True
+        children, dead = propagate_batch(children)
+        nodes += len(digits)
+        if stats is not None:
+            stats['guesses'] = stats.get('guesses', 0) + 1
+            stats['backtracks'] = stats.get('backtracks', 0) + int(dead.sum())
+        # الترتيب العكسي: الرقم الأصغر يُجرّب أولاً
+        stack.extend(children[~dead][::-1])
+    return None, nodes
+
+def solve_batch(boards, search=True, stats=None, time_budget=None, should_stop=None):
+    """
+    حل N لوحة معاً: انتشار القيود للكل بعمليات مصفوفات، ثم بحث لكل لوحة بقيت ناقصة
+    stats: قائمة تُضاف إليها عدّادات الحل ودرجة الصعوبة لكل لوحة بالترتيب (grade_board
+    للوحات المحلولة ضمن نفس المهلة، وعدّادات هذا المحرك لغيرها أو إن انتهت المهلة قبل التقدير)
+    time_budget: مهلة واحدة بالثواني لبحث كل اللوحات معاً؛ اللوحات التي لم يكتمل بحثها
+    قبلها تأخذ TIMEOUT، و should_stop() توقف البحث المتبقي بحالة CANCELLED
+    يعيد (الحلول (N, 9, 9) بأصفار لغير المحلولة، الحالة لكل لوحة
+    UNSOLVABLE / PROPAGATED / SEARCHED / TIMEOUT / CANCELLED)
+    """
+    start = boards_to_candidates(boards)
+    hidden = np.zeros(len(start), dtype=int)
+    cands, dead = propagate_batch(start, hidden)
+    # الخلايا التي ثبّتها الانتشار ولم تثبّتها hidden singles: naked singles
+    naked = (cands.sum(axis=2) == 1).sum(axis=1) - (start.sum(axis=2) == 1).sum(axis=1) - hidden
+    solved = ~dead & (cands.sum(axis=2) == 1).all(axis=1)
+    status = np.where(solved, PROPAGATED, UNSOLVABLE).astype(np.int8)
+    searches = {}
+    check = _budget_check(time_budget, should_stop, None)
+    if search:
+        for idx in np.flatnonzero(~dead & ~solved):
+            found = searches[idx] = {}
+            try:
+                result, found['nodes'] = search_candidates(cands[idx], found, check=check)
+            except SolveTimeout as e:
+                found['nodes'], status[idx] = e.nodes, TIMEOUT
+                continue
+            except SolveCancelled as e:
+                found['nodes'], status[idx] = e.nodes, CANCELLED
+                continue
+            if result is not None:
+                cands[idx] = result
+                status[idx] = SEARCHED
+    if stats is not None:
+        for idx in range(len(cands)):
+            found = searches.get(idx, {})
+            entry = solve_stats(
+                found.get('nodes', 0), int(naked[idx]), int(hidden[idx]),
+                found.get('guesses', 0), found.get('backtracks', 0)
+            )
+            if status[idx] in (PROPAGATED, SEARCHED):
+                try:
+                    entry = grade_board(boards[idx], check=check)
+                except (SolveTimeout, SolveCancelled):
+                    pass
+            stats.append(entry)
+    solutions = candidates_to_boards(cands)
+    solutions[~np.isin(status, (PROPAGATED, SEARCHED))] = 0
+    return solutions, status
+
+# ==========================================
+# 4. تقدير الصعوبة من عدّادات الحل
+# ==========================================
+# الدرجة من عدّادات solve_bitset وحده (grade_board) أياً كان المحرك الذي حل اللوحة:
+# عدّادات النواة المُترجمة والحل الدفعي تختلف عنه للوحة نفسها
+# أصعب تقنية احتاجها الحل -> الدرجة الأساسية
+TECHNIQUE_SCORES = {'naked_single': 1.0, 'hidden_single': 2.0, 'search': 3.0}
+# المستويات بالترتيب مع الحد الأعلى للدرجة في كل منها
+DIFFICULTY_LEVELS = (('easy', 1.5), ('medium', 2.5), ('hard', 6.0), ('expert', math.inf))
+
+def difficulty(naked=0, hidden=0, guesses=0, backtracks=0, n=9):
+    """
+    (الدرجة، المستوى، أصعب تقنية) من عدّادات حلٍّ واحد للوحة n×n:
+    درجة التقنية + (log2 لعدد نقاط التخمين + نصف log2 لعدد التراجعات) × n / 9
+    (التخمين في 4×4 أسهل بكثير منه في 16×16، والحدود كما هي للوحة 9×9)
+    """
+    if guesses:
+        technique = 'search'
+    elif hidden:
+        technique = 'hidden_single'
+    else:
+        technique = 'naked_single'
+    search = math.log2(1 + guesses) + 0.5 * math.log2(1 + backtracks)
+    score = TECHNIQUE_SCORES[technique] + search * n / 9
+    level = next(name for name, limit in DIFFICULTY_LEVELS if score < limit)
+    return round(score, 2), level, technique
+
+def solve_stats(nodes, naked, hidden, guesses, backtracks, n=9):
+    """قاموس عدّادات الحل مع الدرجة والمستوى وأصعب تقنية (يُخزَّن في السجل ونتائج الدفعات)"""
+    score, level, technique = difficulty(naked, hidden, guesses, backtracks, n)
+    return {
+        'nodes': int(nodes), 'naked': int(naked), 'hidden': int(hidden),
+        'guesses': int(guesses), 'backtracks': int(backtracks),
+        'technique': technique, 'score': score, 'level': level,
+    }
+
+def grade_board(b, time_budget=None, should_stop=None, check=None):
+    """
+    العدّادات ودرجة الصعوبة المرجعية للوحة (قبل الحل): solve_bitset بترتيب ثابت على نسخة منها،
+    فالنواة والحل الدفعي و solve_bitset تعطي نفس المستوى للوحة نفسها
+    يرفع SolveTimeout / SolveCancelled كما في solve_bitset
+    """
+    stats = {}
+    solve_bitset(np.array(b, copy=True), time_budget=time_budget, should_stop=should_stop,
+                 stats=stats, check=check)
+    return stats
@@ -0,0 +1,181 @@
+"""
+نواة حل مُترجمة بـ Numba (اختيارية: الاستيراد يفشل بـ ImportError إذا لم تُثبَّت numba)
+- اللوحة مصفوفة uint8 مسطحة (81) وجداول فهارس ثابتة للوحدات والأقران
+- أقنعة بتات لكل صف وعمود ومربع؛ في كل عمق: naked single، ثم hidden single،
+  ثم التفرّع على الخلية الأقل مرشحات، مع عدّ كل نوع (لتقدير الصعوبة)
+- حالة البحث (المكدس) في مصفوفات يملكها المستدعي فيمكن استئنافه على دفعات
+  بعدد عقد محدود، لتبقى المهلة والإلغاء في Python (solver.solve_with_jit)
+- الترجمة تُحفظ على القرص (cache=True) في __pycache__ بجانب هذا الملف،
+  أو في NUMBA_CACHE_DIR إذا كان المجلد غير قابل للكتابة
+"""
+import numba
+import numpy as np
+
+# نتيجة search
+UNSOLVABLE, SOLVED, RUNNING = 0, 1, 2
+
+_CELLS = np.arange(81)
+# وحدات كل خلية: (الصف، العمود، المربع)
+CELL_UNITS = np.stack(
+    [_CELLS // 9, _CELLS % 9, (_CELLS // 27) * 3 + (_CELLS % 9) // 3], axis=1
+).astype(np.int8)
+# خلايا كل وحدة من الوحدات الـ 27 (الصفوف ثم الأعمدة ثم المربعات)
+UNIT_CELLS = np.array(
+    [[c for c in range(81) if CELL_UNITS[c, u // 9] == u % 9] for u in range(27)],
+    dtype=np.int8
+)
+# الأقران العشرون لكل خلية
+PEER_INDEX = np.array([
+    [p for p in range(81) if p != c and (CELL_UNITS[p] == CELL_UNITS[c]).any()]
+    for c in range(81)
+], dtype=np.int16)
+
+ALL_DIGITS = 0x3FE  # البتات 1..9
+
+# مواضع العدّادات التراكمية في مصفوفة counts
+NAKED, HIDDEN, GUESSES, BACKTRACKS = 0, 1, 2, 3
+
+
+def new_state():
+    """
+    مصفوفات حالة البحث: الخلية في كل عمق، الأرقام المستبعدة فيه، [العمق، اختيار خلية؟]،
+    والعدّادات (naked singles، hidden singles، نقاط التخمين، التراجعات)
+    """
+    return (
+        np.zeros(81, np.int16), np.zeros(81, np.int32),
+        np.array([-1, 1], np.int32), np.zeros(4, np.int64),
+    )
+
+
+@numba.njit(cache=True)
+def givens_consistent(board):
+    """لا يتكرر أي رقم معطى بين الأقران"""
+    for c in range(81):
+        v = board[c]
+        if v > 9:
+            return False
+        if v:
+            for k in range(20):
+                if board[PEER_INDEX[c, k]] == v:
+                    return False
+    return True
+
+
+@numba.njit(cache=True)
+def _avail(used, cell):
+    return ALL_DIGITS & ~(
+        used[CELL_UNITS[cell, 0]] | used[9 + CELL_UNITS[cell, 1]] | used[18 + CELL_UNITS[cell, 2]]
+    )
+
+
+@numba.njit(cache=True)
+def search(board, cell_at, tried, state, counts, max_nodes):
+    """
+    متابعة البحث من الحالة المحفوظة حتى الحل أو الاستنفاد أو max_nodes عقدة
+    يعيد (SOLVED / UNSOLVABLE / RUNNING، عدد العقد في هذا الاستدعاء)
+    """
+    used = np.zeros(27, np.int32)
+    for c in range(81):
+        if board[c]:
+            bit = 1 << board[c]
+            for u in range(3):
+                used[CELL_UNITS[c, u] + 9 * u] |= bit
+
+    depth = state[0]
+    choose = state[1]
+    nodes = 0
+    while nodes < max_nodes:
+        if choose:
+            # الخلية الفارغة الأقل مرشحات
+            best = -1
+            best_count = 10
+            for c in range(81):
+                if board[c] == 0:
+                    avail = _avail(used, c)
+                    count = 0
+                    while avail:
+                        avail &= avail - 1
+                        count += 1
+                    if count < best_count:
+                        best = c
+                        best_count = count
+                        if count <= 1:
+                            break
+            if best < 0:
+                state[0] = depth
+                state[1] = 0
+                return SOLVED, nodes
+            # tried: الأرقام المستبعدة في هذا العمق (المجرّبة أو غير الممكنة)
+            excluded = 0
+            if best_count == 1:
+                counts[NAKED] += 1
+            elif best_count > 1:
+                # رقم له موضع واحد في وحدة (hidden single)، أو رقم بلا موضع (طريق مسدود)
+                hidden_cell = -1
+                hidden_bit = 0
+                for u in range(27):
+                    once = 0
+                    twice = 0
+                    for k in range(9):
+                        c = UNIT_CELLS[u, k]
+                        if board[c] == 0:
+                            m = _avail(used, c)
+                            twice |= once & m
+                            once |= m
+                    if (once | used[u]) != ALL_DIGITS:
+                        hidden_cell = -2
+                        break
+                    single = once & ~twice
+                    if single:
+                        hidden_bit = single & -single
+                        for k in range(9):
+                            c = UNIT_CELLS[u, k]
+                            if board[c] == 0 and _avail(used, c) & hidden_bit:
+                                hidden_cell = c
+                                break
+                        break
+                if hidden_cell == -2:
+                    # أي تعيين هنا سيفشل: خلية بلا خيارات تفرض التراجع
+                    excluded = ALL_DIGITS
+                elif hidden_cell >= 0:
+                    counts[HIDDEN] += 1
+                    best = hidden_cell
+                    excluded = ALL_DIGITS & ~hidden_bit
+                else:
+                    counts[GUESSES] += 1
+            depth += 1
+            cell_at[depth] = best
+            tried[depth] = excluded
+            choose = 0
+
+        cell = cell_at[depth]
+        avail = _avail(used, cell) & ~tried[depth]
+        if avail == 0:
+            # تراجع: إزالة رقم العمق السابق ليُجرَّب التالي
+            counts[BACKTRACKS] += 1
+            depth -= 1
+            if depth < 0:
+                state[0] = depth
+                state[1] = 0
+                return UNSOLVABLE, nodes
+            prev = cell_at[depth]
+            bit = 1 << board[prev]
+            for u in range(3):
+                used[CELL_UNITS[prev, u] + 9 * u] &= ~bit
+            board[prev] = 0
+            continue
+
+        bit = avail & -avail
+        v = 0
+        while (1 << v) != bit:
+            v += 1
+        tried[depth] |= bit
+        board[cell] = v
+        for u in range(3):
+            used[CELL_UNITS[cell, u] + 9 * u] |= bit
+        nodes += 1
+        choose = 1
+
+    state[0] = depth
+    state[1] = choose
+    return RUNNING, nodes
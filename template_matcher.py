@@ -0,0 +1,100 @@
+"""
+مصنّف قوالب سريع للأرقام المطبوعة: الطبقة الأولى في تسلسل التعرف قبل CNN
+- قوالب 28×28 للأرقام 1..9 تُرسم مرة واحدة بخطوط Hershey في OpenCV بعدة سماكات
+  وتمرّ بنفس توسيط الخلايا (pipeline.digit_to_canvas)
+- الميزات: البكسلات بعد تنعيم خفيف + مدرّج اتجاهات التدرج (HOG مبسّط بـ numpy) لكل 7×7،
+  والتشابه ارتباط مُطبَّع بين كل صورة وكل قالب بضرب مصفوفات واحد للدفعة كاملة
+- الخلية تُقبل فقط إذا كان أفضل تشابه >= min_score ويتفوّق على الرقم التالي بـ margin،
+  وإلا تُصعَّد إلى النموذج الكامل (pipeline.predict_cell_canvases)
+"""
+import os
+
+import cv2
+import numpy as np
+
+from pipeline import digit_to_canvas
+
+FONTS = [
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_PLAIN,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+    cv2.FONT_HERSHEY_SIMPLEX | cv2.FONT_ITALIC,
+]
+THICKNESS = (1, 2, 3, 4)
+
+
+def render_digit(d, font, thick, height=40):
+    """رقم أبيض على أسود بارتفاع height تقريباً، موسَّط في قماش 28×28 كالخلايا المقصوصة"""
+    scale = cv2.getFontScaleFromHeight(font, height, thick)
+    (w, h), base = cv2.getTextSize(str(d), font, scale, thick)
+    img = np.zeros((h + base + 20, w + 20), dtype=np.uint8)
+    cv2.putText(img, str(d), (10, h + 10), font, scale, 255, thick)
+    x, y, w, h = cv2.boundingRect(img)
+    return digit_to_canvas(img[y:y + h, x:x + w])
+
+
+def _unit(x):
+    """طرح المتوسط والقسمة على الطول: الضرب الداخلي = معامل الارتباط"""
+    x = x.reshape(len(x), -1)
+    x = x - x.mean(axis=1, keepdims=True)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-6)
+
+
+def _hog(x, bins=9, cell=7):
+    """مدرّج اتجاهات التدرج (0..π) موزوناً بالمقدار لكل خلية cell×cell، (N, 16·bins)"""
+    padded = np.pad(x, ((0, 0), (1, 1), (1, 1))).astype(np.float32)
+    gx = padded[:, 1:-1, 2:] - padded[:, 1:-1, :-2]
+    gy = padded[:, 2:, 1:-1] - padded[:, :-2, 1:-1]
+    mag = np.hypot(gx, gy)
+    angle = np.mod(np.arctan2(gy, gx), np.pi)
+    idx = np.minimum((angle * (bins / np.pi)).astype(int), bins - 1)
+    # فهرس مسطح (صورة، صف خلايا، عمود خلايا، اتجاه) لكل بكسل ثم bincount واحد للدفعة
+    k = 28 // cell
+    rows = (np.arange(28) // cell)[:, None] * k + np.arange(28) // cell
+    flat = (np.arange(len(x))[:, None, None] * (k * k) + rows) * bins + idx
+    hist = np.bincount(flat.ravel(), weights=mag.ravel(), minlength=len(x) * k * k * bins)
+    return np.sqrt(hist.reshape(len(x), -1))
+
+
+def _features(x):
+    """متجه واحد بطول 1: البكسلات المنعّمة و HOG بوزن متساوٍ"""
+    x = np.asarray(x, dtype=np.float32).reshape(-1, 28, 28)
+    blurred = np.stack([cv2.GaussianBlur(img, (5, 5), 1.0) for img in x])
+    return np.concatenate([_unit(blurred), _unit(_hog(x))], axis=1) / np.sqrt(2)
+
+
+class TemplateMatcher:
+    """مصنّف الأرقام بالقوالب مع قرار القبول أو التصعيد لكل خلية"""
+
+    def __init__(self, min_score=0.8, margin=0.05):
+        self.min_score = min_score
+        self.margin = margin
+        canvases = [
+            render_digit(d, font, thick)
+            for d in range(1, 10) for font in FONTS for thick in THICKNESS
+        ]
+        self.templates = _features(canvases)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_score=float(os.environ.get('SUDOKU_CASCADE_MIN_SCORE', 0.8)),
+            margin=float(os.environ.get('SUDOKU_CASCADE_MARGIN', 0.05)),
+        )
+
+    def scores(self, batch):
+        """(N, 10): أفضل تشابه لكل رقم 1..9 في دفعة صور 28×28 (العمود 0 دائماً 0)"""
+        sims = _features(batch) @ self.templates.T
+        out = np.zeros((len(sims), 10), dtype=np.float32)
+        # القوالب مرتبة حسب الرقم: أفضل قالب لكل رقم بإعادة تشكيل واحدة
+        out[:, 1:] = sims.reshape(len(sims), 9, -1).max(axis=2)
+        return out
+
+    def accept(self, cell_scores):
+        """(الرقم، التشابه، قناع القبول) لمتوسط درجات كل خلية"""
+        top2 = np.sort(cell_scores, axis=1)[:, -2:]
+        digits = cell_scores.argmax(axis=1)
+        best = top2[:, 1]
+        return digits, best, (best >= self.min_score) & (best - top2[:, 0] >= self.margin)
@@ -0,0 +1,86 @@
+"""
+اختبارات حدود حجم الطلب في واجهة HTTP (استدعاء ASGI مباشر بلا خادم ولا نموذج)
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('starlette')
+import api  # noqa: E402
+
+
+def call(path, body, headers=(), chunk=None):
+    """(الحالة، JSON الرد، عدد البايتات التي قرأها التطبيق) لطلب POST"""
+    chunk = chunk or max(len(body), 1)
+    parts = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b'']
+    read = 0
+    sent = {}
+
+    async def receive():
+        nonlocal read
+        part = parts.pop(0) if parts else b''
+        read += len(part)
+        return {'type': 'http.request', 'body': part, 'more_body': bool(parts)}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            sent['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            sent['body'] = sent.get('body', b'') + message.get('body', b'')
+
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+        'headers': [(k.encode(), v.encode()) for k, v in headers],
+    }
+    asyncio.run(api.app(scope, receive, send))
+    return sent['status'], json.loads(sent['body']), read
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setattr(api, 'MAX_UPLOAD_MB', 1 / 1024)  # 1 KB
+
+
+def test_content_length_rejected_before_reading(small_limit):
+    body = b'x' * 4096
+    status, result, read = call('/solve-image', body, [('content-length', str(len(body)))])
+    assert status == 413
+    assert read == 0
+    assert 'larger than' in result['error']
+
+
+def test_stream_aborts_once_limit_passed(small_limit):
+    # بلا Content-Length: القراءة تتوقف بعد تجاوز الحد وليس بعد الجسم كاملاً
+    status, _, read = call('/solve-image', b'x' * 64 * 1024, chunk=256)
+    assert status == 413
+    assert read <= 1024 + 256
+
+
+def test_batch_body_capped(small_limit):
+    body = json.dumps({'boards': [[[0] * 9] * 9] * 20}).encode()
+    status, _, read = call('/solve-batch', body, chunk=256)
+    assert status == 413
+    assert read < len(body)
+
+
+def test_multipart_upload_within_limit_is_parsed():
+    boundary = 'b0undary'
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="x.png"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + b'not an image' + f'\r\n--{boundary}--\r\n'.encode()
+
+    async def read():
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            return messages.pop(0)
+
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/solve-image', 'query_string': b'',
+            'headers': [(b'content-type', f'multipart/form-data; boundary={boundary}'.encode())],
+        }
+        return await api.read_upload(api.Request(scope, receive))
+
+    assert asyncio.run(read()) == b'not an image'
@@ -0,0 +1,121 @@
+"""
+اختبارات التعرف بطبقتين: مطابقة القوالب ثم CNN للخلايا غير المؤكدة فقط
+- قرار القبول بعتبتي المصنّف (min_score / margin) وحدهما، و conf_threshold للنموذج فقط
+- لوحة مطبوعة اصطناعية تمرّ بمرحلة الخلايا الفعلية (collect_cell_canvases)، ونموذج وهمي
+  يسجّل الخلايا التي وصلته
+"""
+import cv2
+import numpy as np
+import pytest
+
+from distill import render_board
+from pipeline import collect_cell_canvases, predict_cell_canvases
+from template_matcher import TemplateMatcher
+
+# النموذج الوهمي يتنبأ دائماً بالرقم 1 بهذه الثقة
+FAKE_DIGIT, FAKE_CONF = 1, 0.95
+
+
+class FakeModel:
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, batch, verbose=0):
+        self.rows += len(batch)
+        out = np.zeros((len(batch), 10), dtype=np.float32)
+        out[:, FAKE_DIGIT] = FAKE_CONF
+        out[:, 0] = 1 - FAKE_CONF
+        return out
+
+
+@pytest.fixture(scope='module')
+def printed():
+    """(أرقام اللوحة، صور خلاياها) لوحة مطبوعة بخط Hershey بنصف خانات فارغة"""
+    rng = np.random.default_rng(0)
+    digits = rng.integers(1, 10, (9, 9)) * (rng.random((9, 9)) > 0.5)
+    img = render_board(digits, cv2.FONT_HERSHEY_SIMPLEX, np.random.default_rng(1))
+    cells, _ = collect_cell_canvases(img, use_tta=False)
+    return digits, cells
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return TemplateMatcher()
+
+
+def run(cells, cascade, conf_threshold):
+    model, tiers = FakeModel(), []
+    boards, confidences = predict_cell_canvases(
+        [cells], model, conf_threshold=conf_threshold, cascade=cascade, tiers=tiers
+    )
+    return boards[0], confidences[0], tiers[0], model
+
+
+def rows_of(cells, keys):
+    """عدد الصور التي تصل للنموذج من هذه الخلايا (قد تكون للخلية أكثر من صورة)"""
+    return sum(len(cells[k]) for k in keys)
+
+
+def template_decisions(matcher, cells):
+    """{(i, j): الرقم} للخلايا التي يقبلها المصنّف وحده (الصورة الأولى لكل خلية)"""
+    keys = list(cells)
+    batch = np.array([cells[k][0] for k in keys]).reshape(-1, 28, 28, 1).astype('float32') / 255.0
+    digits, _, accepted = matcher.accept(matcher.scores(batch))
+    return {k: int(d) for k, d, ok in zip(keys, digits, accepted) if ok}
+
+
+def test_accept_rules(matcher):
+    scores = np.zeros((4, 10), dtype=np.float32)
+    scores[0, [3, 5]] = 0.95, 0.50   # واضح
+    scores[1, [3, 5]] = 0.95, 0.93   # الفارق أقل من margin
+    scores[2, [3, 5]] = 0.75, 0.10   # أقل من min_score
+    scores[3, [7, 2]] = 0.80, 0.75   # على الحدين تماماً
+    digits, best, accepted = matcher.accept(scores)
+    assert digits.tolist()[:1] == [3] and digits[3] == 7
+    assert best[0] == pytest.approx(0.95)
+    assert accepted.tolist() == [True, False, False, True]
+
+
+def test_tiers_and_predictions(printed, matcher):
+    digits, cells = printed
+    decided = template_decisions(matcher, cells)
+    board, confidences, tiers, model = run(cells, matcher, conf_threshold=0.9)
+    # أغلب الخلايا المطبوعة يحسمها المصنّف، والباقي فقط يصل للنموذج
+    assert len(decided) >= len(cells) // 2
+    assert tiers == {'template': len(decided), 'cnn': len(cells) - len(decided)}
+    assert model.rows == rows_of(cells, set(cells) - set(decided))
+    for (i, j), d in decided.items():
+        assert board[i, j] == d == digits[i, j]
+        assert confidences[i, j] >= matcher.min_score
+    for (i, j) in set(cells) - set(decided):
+        assert board[i, j] == FAKE_DIGIT
+        assert confidences[i, j] == pytest.approx(FAKE_CONF)
+
+
+def test_conf_threshold_not_applied_to_templates(printed, matcher):
+    # عتبة أعلى من ثقة النموذج: خلايا CNN تُرفض، وخلايا القوالب لا تتأثر
+    digits, cells = printed
+    decided = template_decisions(matcher, cells)
+    board, _, tiers, model = run(cells, matcher, conf_threshold=0.999)
+    assert tiers['template'] == len(decided)
+    assert model.rows == rows_of(cells, set(cells) - set(decided))
+    for (i, j), d in decided.items():
+        assert board[i, j] == d
+    for (i, j) in set(cells) - set(decided):
+        assert board[i, j] == 0
+
+
+@pytest.mark.parametrize('kwargs', [{'min_score': 1.01}, {'margin': 1.0}])
+def test_strict_matcher_escalates_everything(printed, kwargs):
+    _, cells = printed
+    board, _, tiers, model = run(cells, TemplateMatcher(**kwargs), conf_threshold=0.9)
+    assert tiers == {'template': 0, 'cnn': len(cells)}
+    assert model.rows == rows_of(cells, cells)
+    assert all(board[k] == FAKE_DIGIT for k in cells)
+
+
+def test_without_cascade_everything_goes_to_model(printed):
+    _, cells = printed
+    _, _, tiers, model = run(cells, None, conf_threshold=0.9)
+    assert tiers == {'template': 0, 'cnn': len(cells)}
+    assert model.rows == rows_of(cells, cells)
@@ -0,0 +1,53 @@
+"""
+اختبارات مولّد الألغاز: تفرّد الحل، النطاقات، وملفات المجموعة (بما فيها الفارغة)
+"""
+import numpy as np
+import pytest
+
+from generator import (
+    BANDS, board_from_string, generate_corpus, generate_puzzle, read_corpus, write_corpus,
+)
+from solver import DIFFICULTY_LEVELS, count_solutions, solve_singles
+
+
+def test_band_names_differ_from_difficulty_levels():
+    assert not set(BANDS) & {name for name, _ in DIFFICULTY_LEVELS}
+
+
+@pytest.mark.parametrize('band', list(BANDS))
+def test_generated_puzzle_is_unique_and_in_band(band):
+    record = generate_puzzle(9, band, seed=1)
+    puzzle = board_from_string(record['puzzle'])
+    solution = board_from_string(record['solution'])
+    assert count_solutions(puzzle) == 1
+    given = puzzle > 0
+    assert (puzzle[given] == solution[given]).all()
+    singles = solve_singles(puzzle)[1]
+    if BANDS[band]['singles'] is not None:
+        assert singles == BANDS[band]['singles']
+    assert record['band'] == band
+    assert record['level'] in {name for name, _ in DIFFICULTY_LEVELS}
+
+
+def test_impossible_band_yields_nothing():
+    # كل لغز أدنى 4×4 يُحل بالانتشار وحده
+    assert generate_puzzle(4, 'search', seed=0) is None
+    assert list(generate_corpus(3, n=4, band='search', workers=1)) == []
+
+
+@pytest.mark.parametrize('ext', ['npz', 'jsonl'])
+def test_empty_corpus_round_trip(tmp_path, ext):
+    path = str(tmp_path / f'empty.{ext}')
+    assert write_corpus(path, [], n=4) == 0
+    puzzles, solutions = read_corpus(path)
+    assert len(puzzles) == len(solutions) == 0
+
+
+@pytest.mark.parametrize('ext', ['npz', 'jsonl'])
+def test_corpus_round_trip(tmp_path, ext):
+    records = list(generate_corpus(3, n=6, band='singles', workers=1))
+    path = str(tmp_path / f'corpus.{ext}')
+    assert write_corpus(path, records, n=6) == 3
+    puzzles, solutions = read_corpus(path)
+    assert puzzles.shape == solutions.shape == (3, 6, 6)
+    assert {board_from_string(r['puzzle']).tobytes() for r in records} == {p.tobytes() for p in puzzles.astype(np.uint8)}
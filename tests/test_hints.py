@@ -0,0 +1,188 @@
+"""
+اختبارات محرك التلميحات: صحة كل خطوة مقابل الحل الوحيد، كل تقنية على حالة مرشحات معروفة،
+وخطوات 'reveal' من الحل المعروف أو ببحث محدود المهلة
+"""
+import numpy as np
+import pytest
+
+import hints
+from hints import _Grid, solve_steps
+from solver import SolveTimeout, count_solutions
+
+# (اللغز، الحل) بحل وحيد؛ التقنيات المذكورة تظهر في خطوات solve_steps لكل منها
+PUZZLES = {
+    # hidden/naked single، pointing، box_line، naked_pair
+    'lines': (
+        '600380070801000040004060000900835000000400800000091000700000000100900025406570080',
+        '692384571831759642574162938967835214315427896248691357759218463183946725426573189',
+    ),
+    # x_wing و reveal
+    'x_wing': (
+        '002009430010070500007008090000000000200001000704300180006007012000030009100200040',
+        None,
+    ),
+    # hidden_pair و reveal
+    'hidden_pair': (
+        '000002800300608000009014060060000004053400017000000000000900000010000503004023091',
+        None,
+    ),
+}
+
+
+def board(text):
+    return np.array([int(c) for c in text]).reshape(9, 9)
+
+
+def solution_of(name):
+    puzzle, solution = PUZZLES[name]
+    if solution is not None:
+        return board(solution)
+    b = board(puzzle)
+    assert hints.solve_fast(b)[0]
+    return b
+
+
+@pytest.mark.parametrize('name', list(PUZZLES))
+def test_every_step_agrees_with_unique_solution(name):
+    puzzle = board(PUZZLES[name][0])
+    assert count_solutions(puzzle) == 1
+    solution = solution_of(name)
+    current = puzzle.copy()
+    for step in solve_steps(puzzle):
+        for r, c, v in step['placements']:
+            assert current[r, c] == 0
+            assert solution[r, c] == v
+            current[r, c] = v
+        for r, c, v in step['eliminations']:
+            # لا تُحذف قيمة الحل من مرشحات خليتها أبداً
+            assert solution[r, c] != v
+    assert (current == solution).all()
+    # اللوحة الأصلية لا تُعدَّل
+    assert (puzzle == board(PUZZLES[name][0])).all()
+
+
+@pytest.mark.parametrize('name, techniques', [
+    ('lines', {'hidden_single', 'naked_single', 'pointing', 'box_line', 'naked_pair'}),
+    ('x_wing', {'x_wing', 'reveal'}),
+    ('hidden_pair', {'hidden_pair', 'reveal'}),
+])
+def test_techniques_appear_in_steps(name, techniques):
+    used = {step['technique'] for step in solve_steps(board(PUZZLES[name][0]))}
+    assert techniques <= used
+
+
+# ==========================================
+# كل تقنية على حالة مرشحات مصمّمة (لوحة فارغة ثم تقييد المرشحات)
+# ==========================================
+def empty_grid():
+    return _Grid(np.zeros((9, 9), dtype=int))
+
+
+def cell(r, c):
+    return r * 9 + c
+
+
+def remove(g, digit, cells):
+    for k in cells:
+        g.cands[k] &= ~(1 << (digit - 1))
+
+
+def test_hidden_single():
+    g = empty_grid()
+    remove(g, 5, [cell(0, c) for c in range(9) if c != 3])
+    step = hints.hidden_single(g)
+    assert step['technique'] == 'hidden_single'
+    assert step['placements'] == [(0, 3, 5)]
+
+
+def test_naked_single():
+    g = empty_grid()
+    g.cands[cell(1, 1)] = 1 << 6
+    step = hints.naked_single(g)
+    assert step['placements'] == [(1, 1, 7)]
+
+
+def test_pointing():
+    g = empty_grid()
+    # الرقم 4 في المربع الأول على الصف 0 فقط
+    remove(g, 4, [cell(r, c) for r in (1, 2) for c in range(3)] + [cell(0, 2)])
+    step = hints.pointing(g)
+    assert step['technique'] == 'pointing' and step['digits'] == [4]
+    assert step['eliminations'] == [(0, c, 4) for c in range(3, 9)]
+
+
+def test_box_line():
+    g = empty_grid()
+    # الرقم 6 في الصف 0 داخل المربع الأول فقط
+    remove(g, 6, [cell(0, c) for c in range(1, 9) if c != 2])
+    step = hints.box_line(g)
+    assert step['technique'] == 'box_line' and step['digits'] == [6]
+    assert step['eliminations'] == [(r, c, 6) for r in (1, 2) for c in range(3)]
+
+
+def test_naked_pair():
+    g = empty_grid()
+    g.cands[cell(0, 0)] = g.cands[cell(0, 1)] = 0b11
+    step = hints.naked_pair(g)
+    assert step['technique'] == 'naked_pair' and step['digits'] == [1, 2]
+    assert step['eliminations'] == [(0, c, d) for c in range(2, 9) for d in (1, 2)]
+
+
+def test_x_wing():
+    g = empty_grid()
+    # الرقم 3 في الصفين 0 و 4 فقط في العمودين 2 و 7
+    remove(g, 3, [cell(r, c) for r in (0, 4) for c in range(9) if c not in (2, 7)])
+    step = hints.x_wing(g)
+    assert step['technique'] == 'x_wing' and step['digits'] == [3]
+    assert step['eliminations'] == [(r, c, 3) for r in range(9) if r not in (0, 4) for c in (2, 7)]
+
+
+def test_hidden_pair():
+    g = empty_grid()
+    # الرقمان 8 و 9 في الصف 0 في الخليتين الأوليين فقط
+    for d in (8, 9):
+        remove(g, d, [cell(0, c) for c in range(2, 9)])
+    step = hints.hidden_pair(g)
+    assert step['technique'] == 'hidden_pair' and step['digits'] == [8, 9]
+    assert step['eliminations'] == [(0, c, d) for c in (0, 1) for d in range(1, 8)]
+
+
+# ==========================================
+# خطوات 'reveal'
+# ==========================================
+def test_reveal_uses_known_solution(monkeypatch):
+    def no_search(*args, **kwargs):
+        raise AssertionError("solve_fast called although the solution was given")
+
+    solution = solution_of('x_wing')
+    monkeypatch.setattr(hints, 'solve_fast', no_search)
+    steps = list(solve_steps(board(PUZZLES['x_wing'][0]), solution=solution))
+    reveals = [s for s in steps if s['technique'] == 'reveal']
+    assert reveals
+    for step in reveals:
+        (r, c, v), = step['placements']
+        assert solution[r, c] == v
+
+
+def test_reveal_search_is_bounded(monkeypatch):
+    budgets = []
+
+    def fake_solve(b, time_budget=None, **kwargs):
+        budgets.append(time_budget)
+        raise SolveTimeout(0)
+
+    monkeypatch.setattr(hints, 'solve_fast', fake_solve)
+    steps = solve_steps(board(PUZZLES['x_wing'][0]), time_budget=0.25)
+    with pytest.raises(SolveTimeout):
+        for _ in steps:
+            pass
+    assert budgets == [0.25]
+
+
+def test_reveal_search_finds_solution_within_budget():
+    solution = solution_of('hidden_pair')
+    steps = list(solve_steps(board(PUZZLES['hidden_pair'][0]), time_budget=5.0))
+    assert any(s['technique'] == 'reveal' for s in steps)
+    for step in steps:
+        for r, c, v in step['placements']:
+            assert solution[r, c] == v
@@ -0,0 +1,50 @@
+"""
+اختبارات خيط التعرف في GridTracker: الإغلاق أثناء إرسال التعرف لا يرفع ولا يترك طلباً معلقاً
+"""
+import numpy as np
+
+import live_tracker
+from live_tracker import GridTracker
+
+FRAME = np.zeros((480, 640, 3), np.uint8)
+CORNERS = np.float32([[100, 50], [500, 50], [500, 430], [100, 430]])
+
+
+def stable_tracker():
+    tracker = GridTracker(lambda warped: (None, None), stable_frames=1)
+    tracker.corners = CORNERS.copy()
+    tracker.stable_count = 1
+    tracker.identity = 1
+    return tracker
+
+
+def test_close_between_check_and_submit(monkeypatch):
+    tracker = stable_tracker()
+    real_warp = live_tracker.warp_image
+
+    def warp_then_close(frame, pts, *args):
+        # close() من خيط الواجهة بعد فحص _closed وقبل الإرسال
+        tracker.close()
+        return real_warp(frame, pts, *args)
+
+    monkeypatch.setattr(live_tracker, 'warp_image', warp_then_close)
+    tracker._maybe_recognise(FRAME)
+    assert tracker._pending is None
+    assert tracker.counters['recognitions'] == 0
+
+
+def test_closed_tracker_does_not_recognise():
+    tracker = stable_tracker()
+    tracker.close()
+    tracker.process(FRAME)
+    tracker._maybe_recognise(FRAME)
+    assert tracker.counters['recognitions'] == 0
+
+
+def test_recognition_runs_and_clears_pending():
+    tracker = stable_tracker()
+    tracker._maybe_recognise(FRAME)
+    tracker._pool.shutdown(wait=True)
+    assert tracker.counters['recognitions'] == 1
+    assert tracker._pending is None
+    assert tracker.result() is not None
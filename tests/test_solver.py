@@ -0,0 +1,233 @@
+"""
+اختبارات محركات الحل مقابل solve الأساسي (التشغيل من جذر المستودع: python -m pytest -q)
+- ألغاز ثابتة 4×4 و 9×9 و 16×16 يحلها solve بسرعة، ولغز بلا حل وآخر متعدد الحلول
+- solve_batch / propagate_batch، حالة نواة Numba القابلة للاستئناف، solve_bitset لأي حجم،
+  و count_solutions بالنواة وببحث البتات
+- درجة الصعوبة نفسها من كل المحركات، ومُقاسة بحجم اللوحة
+"""
+import numpy as np
+import pytest
+
+import solver
+from solver import (
+    BOX_SHAPES, CANCELLED, PROPAGATED, SEARCHED, TIMEOUT, UNSOLVABLE, SolveService,
+    boards_to_candidates, count_solutions, grade_board, load_jit, propagate_batch, solve,
+    solve_batch, solve_bitset, solve_with_jit,
+)
+
+# اللوحات مسطحة بأرقام أساس 36 (G = 16)، والصفر خانة فارغة
+EASY_9 = '827900500000200003300100608060400007000000050104050862040521739500000016091000285'
+SEARCH_9 = '280400067000090000073010009000500300000206050040000010000000070760020003430000800'
+# SEARCH_9 بعد حذف أول رقم: 25 حلاً
+MULTI_9 = '080400067000090000073010009000500300000206050040000010000000070760020003430000800'
+# الصف الأول 1..8 والخانة الباقية فيه لا تقبل 9 (موجود في عمودها)
+UNSOLVABLE_9 = '123456780' + '000000009' + '0' * 63
+PUZZLE_4 = '1000003000200004'
+PUZZLE_16 = (
+    '2083E10497B60AFG7E006090004001280F00732G810040B6B641D8CFE2AG05000A108EG003C9B075'
+    '350000001B80006C07000B49000502E0000B000C0000041D08E000F3040160D0100G26E0DC300B50'
+    'F30000D0B00700010D0000005E2F003401C09G0E050D004B820FC4A7091B0DG049D630B10GEAFC07'
+    '0000F20DC00003A9'
+)
+
+
+def board(text):
+    n = int(len(text) ** 0.5)
+    return np.array([int(c, 36) for c in text]).reshape(n, n)
+
+
+def baseline(text):
+    b = board(text)
+    assert solve(b)
+    return b
+
+
+def assert_valid_solution(puzzle, solution):
+    """كل صف وعمود ومربع تبديلة لـ 1..n، والأرقام المعطاة لم تتغير"""
+    n = len(puzzle)
+    br, bc = BOX_SHAPES[n]
+    digits = set(range(1, n + 1))
+    for k in range(n):
+        assert set(solution[k]) == digits
+        assert set(solution[:, k]) == digits
+        r, c = divmod(k, n // bc)
+        assert set(solution[r * br:(r + 1) * br, c * bc:(c + 1) * bc].ravel()) == digits
+    given = puzzle > 0
+    assert (solution[given] == puzzle[given]).all()
+
+
+@pytest.fixture
+def no_jit(monkeypatch):
+    """المسار البديل بدون النواة المُترجمة (كأن numba غير مثبتة)"""
+    monkeypatch.setattr(solver, '_jit', False)
+
+
+@pytest.fixture
+def kernel():
+    pytest.importorskip('numba')
+    if load_jit() is None:
+        pytest.skip("solver_jit غير متوفرة")
+    return load_jit()
+
+
+# ==========================================
+# solve_bitset لكل الأحجام
+# ==========================================
+@pytest.mark.parametrize('text', [PUZZLE_4, EASY_9, SEARCH_9, PUZZLE_16])
+def test_bitset_matches_baseline(text):
+    b = board(text)
+    stats = {}
+    solved, _ = solve_bitset(b, stats=stats)
+    assert solved
+    assert (b == baseline(text)).all()
+    assert stats['level'] in ('easy', 'medium', 'hard', 'expert')
+
+
+def test_bitset_unsolvable_leaves_board():
+    b = board(UNSOLVABLE_9)
+    assert solve_bitset(b) == (False, 0)
+    assert (b == board(UNSOLVABLE_9)).all()
+
+
+def test_bitset_multi_solution_is_valid():
+    b = board(MULTI_9)
+    assert solve_bitset(b)[0]
+    assert_valid_solution(board(MULTI_9), b)
+
+
+def test_bitset_restarts_grade_final_attempt():
+    # حد عقد صغير يفرض إعادة البدء: التخمينات لا تتجاوز عقد المحاولة الأخيرة
+    stats = {}
+    assert solve_bitset(board(SEARCH_9), restart_nodes=1, stats=stats)[0]
+    assert stats['guesses'] <= stats['nodes']
+    assert stats['backtracks'] < stats['nodes']
+
+
+# ==========================================
+# الحل الدفعي
+# ==========================================
+def test_solve_batch_matches_baseline():
+    boards = np.stack([board(t) for t in (EASY_9, SEARCH_9, UNSOLVABLE_9, MULTI_9)])
+    stats = []
+    solutions, status = solve_batch(boards, stats=stats)
+    assert status.tolist() == [PROPAGATED, SEARCHED, UNSOLVABLE, SEARCHED]
+    assert (solutions[0] == baseline(EASY_9)).all()
+    assert (solutions[1] == baseline(SEARCH_9)).all()
+    assert (solutions[2] == 0).all()
+    assert_valid_solution(boards[3], solutions[3])
+    assert stats[0]['guesses'] == 0 and stats[1]['guesses'] > 0
+
+
+def test_propagate_batch_marks_contradictions():
+    cands, dead = propagate_batch(boards_to_candidates(np.stack([board(EASY_9), board(UNSOLVABLE_9)])))
+    assert dead.tolist() == [False, True]
+    # EASY_9 تُحل بالانتشار وحده
+    assert (cands[0].sum(axis=1) == 1).all()
+    assert (cands[0].argmax(axis=1).reshape(9, 9) + 1 == baseline(EASY_9)).all()
+
+
+def test_solve_batch_without_search():
+    solutions, status = solve_batch(np.stack([board(EASY_9), board(SEARCH_9)]), search=False)
+    assert status.tolist() == [PROPAGATED, UNSOLVABLE]
+    assert (solutions[1] == 0).all()
+
+
+def test_solve_batch_budget_and_cancel():
+    boards = np.stack([board(EASY_9), board(SEARCH_9)])
+    solutions, status = solve_batch(boards, time_budget=-1)
+    assert status.tolist() == [PROPAGATED, TIMEOUT]
+    assert (solutions[1] == 0).all()
+    _, status = solve_batch(boards, should_stop=lambda: True)
+    assert status.tolist() == [PROPAGATED, CANCELLED]
+
+
+# ==========================================
+# نواة Numba
+# ==========================================
+@pytest.mark.parametrize('text', [EASY_9, SEARCH_9])
+def test_jit_matches_baseline(kernel, text):
+    b = board(text)
+    assert solve_with_jit(b)[0]
+    assert (b == baseline(text)).all()
+
+
+def test_jit_unsolvable(kernel):
+    b = board(UNSOLVABLE_9)
+    assert not solve_with_jit(b)[0]
+    assert (b == board(UNSOLVABLE_9)).all()
+
+
+def test_jit_resumable_state(kernel):
+    # البحث على دفعات من عقدة واحدة يصل لنفس الحل ونفس العدّادات كاستدعاء واحد
+    flat = np.array(board(SEARCH_9), dtype=np.uint8).reshape(81)
+    once = flat.copy()
+    cell_at, tried, state, counts = kernel.new_state()
+    status, total = kernel.search(once, cell_at, tried, state, counts, 1 << 30)
+    assert status == kernel.SOLVED
+
+    cell_at, tried, state, resumed = kernel.new_state()
+    nodes, calls = 0, 0
+    while True:
+        status, n = kernel.search(flat, cell_at, tried, state, resumed, 1)
+        nodes += n
+        calls += 1
+        if status != kernel.RUNNING:
+            break
+    assert status == kernel.SOLVED
+    assert calls > 1
+    assert nodes == total
+    assert (resumed == counts).all()
+    assert (flat.reshape(9, 9) == baseline(SEARCH_9)).all()
+
+
+# ==========================================
+# تعداد الحلول
+# ==========================================
+@pytest.mark.parametrize('engine', ['jit', 'bitset'])
+def test_count_solutions(request, engine):
+    request.getfixturevalue('kernel' if engine == 'jit' else 'no_jit')
+    assert count_solutions(board(SEARCH_9)) == 1
+    assert count_solutions(board(MULTI_9)) == 2
+    assert count_solutions(board(MULTI_9), limit=100) == 25
+    assert count_solutions(board(UNSOLVABLE_9)) == 0
+
+
+def test_count_solutions_nxn():
+    assert count_solutions(board(PUZZLE_4)) == 1
+    assert count_solutions(board(PUZZLE_16)) == 1
+    assert count_solutions(np.zeros((4, 4), dtype=int), limit=1000) == 288
+
+
+# ==========================================
+# درجة الصعوبة
+# ==========================================
+GRADE_KEYS = ('score', 'level', 'technique', 'guesses', 'backtracks')
+
+
+def grade_of(stats):
+    return {key: stats[key] for key in GRADE_KEYS}
+
+
+@pytest.mark.parametrize('text', [EASY_9, SEARCH_9, MULTI_9])
+def test_grade_same_for_every_engine(text):
+    expected = grade_of(grade_board(board(text)))
+    bitset = {}
+    solve_bitset(board(text), stats=bitset)
+    batch = []
+    solve_batch(board(text)[None], stats=batch)
+    job = SolveService(workers=1).submit(board(text))
+    job.wait()
+    assert grade_of(bitset) == expected
+    assert grade_of(batch[0]) == expected
+    assert job.status == 'solved' and grade_of(job.stats) == expected
+    if load_jit() is not None:
+        jit = {}
+        assert solve_with_jit(board(text), stats=jit)[0]
+        assert grade_of(jit) == expected
+
+
+def test_grade_scales_with_board_size():
+    # لوحة فارغة تحتاج تخميناً في كل الأحجام، لكن 4×4 ليست 'expert'
+    levels = {n: grade_board(np.zeros((n, n), dtype=int))['level'] for n in (4, 9, 16)}
+    assert levels == {4: 'hard', 9: 'expert', 16: 'expert'}
+    assert grade_board(board(PUZZLE_4))['level'] in ('easy', 'medium')